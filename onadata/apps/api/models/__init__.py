@@ -1,3 +1,6 @@
 from onadata.apps.api.models.organization_profile import OrganizationProfile  # flake8: noqa
 from onadata.apps.api.models.team import Team
 from onadata.apps.api.models.temp_token import TempToken
+
+# keeps the object permission snapshots up to date
+from onadata.libs.utils import permission_cache
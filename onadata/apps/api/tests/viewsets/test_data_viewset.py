@@ -7,6 +7,8 @@ from mock import patch
 from datetime import timedelta
 from django.utils import timezone
 from django.test import RequestFactory
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.test.utils import override_settings
 from django_digest.test import DigestAuth
 from django_digest.test import Client as DigestClient
@@ -476,6 +478,94 @@ class TestDataViewSet(TestBase):
             **self.extra)
         response = view(request, pk=formid)
 
+    def test_data_keyset_pagination(self):
+        self._make_submissions()
+        view = DataViewSet.as_view({'get': 'list'})
+        formid = self.xform.pk
+        ids = list(self.xform.instances.order_by('pk')
+                   .values_list('pk', flat=True))
+
+        request = self.factory.get(
+            '/', data={"after_id": 0, "page_size": 3}, **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([i['_id'] for i in response.data], ids[:3])
+        self.assertFalse(response.has_header('X-total'))
+        self.assertTrue(response.has_header('ETag'))
+        etag_data = response['Etag']
+        link = response['Link']
+        self.assertTrue(link.endswith('>; rel="next"'))
+        cursor = link[link.find('cursor=') + 7:link.find('>')]
+
+        # the next page follows the cursor of the previous one
+        request = self.factory.get(
+            '/', data={"cursor": cursor, "page_size": 3}, **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([i['_id'] for i in response.data], ids[3:])
+        self.assertFalse(response.has_header('Link'))
+        self.assertNotEqual(etag_data, response['Etag'])
+
+        request = self.factory.get(
+            '/', data={"after_id": ids[0], "limit": 2, "count": "true",
+                       "fields": '["_id"]'}, **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{'_id': i} for i in ids[1:3]])
+        self.assertEqual(int(response.get('X-total')), 4)
+
+        request = self.factory.get(
+            '/', data={"cursor": "invalid"}, **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 400)
+
+        request = self.factory.get(
+            '/', data={"after_id": 0, "sort": '{"_id": -1}'}, **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 400)
+
+    def test_data_conditional_get_uses_data_version(self):
+        self._make_submissions()
+        view = DataViewSet.as_view({'get': 'list'})
+        formid = self.xform.pk
+
+        request = self.factory.get('/', **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 200)
+        etag_data = response['Etag']
+        last_modified = response['Last-Modified']
+
+        # unchanged data is not read again
+        request = self.factory.get(
+            '/', HTTP_IF_NONE_MATCH=etag_data, **self.extra)
+        with CaptureQueriesContext(connection) as context:
+            response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Etag'], etag_data)
+        self.assertFalse([q for q in context.captured_queries
+                          if '"logger_instance"' in q['sql']])
+
+        request = self.factory.get(
+            '/', HTTP_IF_MODIFIED_SINCE=last_modified, **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 304)
+
+        # other parameters give another listing
+        request = self.factory.get(
+            '/', data={"page_size": 2}, HTTP_IF_NONE_MATCH=etag_data,
+            **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 200)
+
+        # deleting a submission changes the data version
+        self.xform.instances.first().delete()
+        request = self.factory.get(
+            '/', HTTP_IF_NONE_MATCH=etag_data, **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 3)
+        self.assertNotEqual(etag_data, response['Etag'])
+
     def test_sort_query_param_with_invalid_values(self):
         self._make_submissions()
         view = DataViewSet.as_view({'get': 'list'})
@@ -92,3 +92,18 @@ class TestLegacyExports(TestBase):
         self.assertEqual(headers['Content-Type'],
                          'application/vnd.google-earth.kml+xml')
         self.assertEqual(ext, '.kml')
+
+    def test_data_parquet_export(self):
+        self._make_submissions()
+        view = DataViewSet.as_view({
+            'get': 'list'
+        })
+        request = self.factory.get('/', **self.extra)
+        response = view(request, pk=self.xform.pk, format='parquet')
+        self.assertEqual(response.status_code, 200)
+        headers = dict(response.items())
+        filename = self._filename_from_disposition(
+            headers['Content-Disposition'])
+        basename, ext = os.path.splitext(filename)
+        self.assertEqual(headers['Content-Type'], 'application/zip')
+        self.assertEqual(ext, '.zip')
@@ -2,7 +2,9 @@ import os
 
 from django.utils import timezone
 from django.core.files.base import ContentFile
+from django.db import connection
 from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
 from mock import patch
 
 from onadata.apps.main.tests.test_base import TestBase
@@ -10,6 +12,7 @@ from onadata.apps.api.viewsets.stats_viewset import StatsViewSet
 from onadata.apps.api.viewsets.submissionstats_viewset import\
     SubmissionStatsViewSet
 from onadata.apps.logger.models import XForm
+from onadata.libs.data.statistics import get_all_stats
 from onadata.libs.utils.logger_tools import publish_xml_form, create_instance
 from onadata.libs.utils.user_auth import get_user_default_project
 
@@ -241,6 +244,27 @@ class TestStatsViewSet(TestBase):
         }
         self.assertDictContainsSubset(data, response.data)
 
+    def test_all_stats_single_scan_cached_per_data_version(self):
+        self._contributions_form_submissions()
+
+        def _instance_queries():
+            with CaptureQueriesContext(connection) as context:
+                data = get_all_stats(self.xform)
+
+            return data, [q for q in context.captured_queries
+                          if 'logger_instance' in q['sql']]
+
+        data, queries = _instance_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(data['amount']['median'], 1100.0)
+
+        # cached until the form's data changes
+        self.assertEqual(_instance_queries(), (data, []))
+
+        self.xform.instances.first().delete()
+        data, queries = _instance_queries()
+        self.assertEqual(len(queries), 1)
+
     def test_wrong_stat_function_api(self):
         self._contributions_form_submissions()
         view = StatsViewSet.as_view({'get': 'retrieve'})
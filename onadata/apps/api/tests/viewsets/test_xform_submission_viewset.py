@@ -373,3 +373,45 @@ class TestXFormSubmissionViewSet(TestAbstractViewSet, TransactionTestCase):
             settings.PROJECT_ROOT, 'libs', 'tests', "utils", 'fixtures',
             'tutorial', 'instances', 'uuid_NaN', 'submission.xml')
         self._make_submission(path)
+
+    def test_bulk_submission(self):
+        view = XFormSubmissionViewSet.as_view({'post': 'bulk'})
+        paths = [os.path.join(
+            self.main_directory, 'fixtures', 'transportation', 'instances',
+            s, s + '.xml') for s in self.surveys[:2]]
+        media_file = "1335783522563.jpg"
+        media_path = os.path.join(
+            self.main_directory, 'fixtures', 'transportation', 'instances',
+            self.surveys[0], media_file)
+        count = self.xform.instances.count()
+
+        with open(paths[0]) as sf1, open(paths[1]) as sf2, \
+                open(media_path) as f:
+            f = InMemoryUploadedFile(f, 'media_file', media_file, 'image/jpg',
+                                     os.path.getsize(media_path), None)
+            data = {'xml_submission_file': [sf1, sf2], 'media_file': f}
+            request = self.factory.post('/', data, **self.extra)
+            response = view(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['status'] for r in response.data], [201, 201])
+        self.assertEqual(self.xform.instances.count(), count + 2)
+        self.xform.refresh_from_db()
+        self.assertEqual(self.xform.num_of_submissions, count + 2)
+
+        instance = self.xform.instances.get(
+            uuid=response.data[0]['instanceID'][len('uuid:'):])
+        self.assertEqual(instance.json['_id'], instance.pk)
+        self.assertEqual(len(instance.json['_attachments']), 1)
+        self.assertEqual(instance.attachments.count(), 1)
+        self.assertTrue(instance.parsed_instance)
+
+        # resubmitting gives the same responses as single submissions
+        with open(paths[0]) as sf1:
+            request = self.factory.post(
+                '/', {'xml_submission_file': sf1}, **self.extra)
+            response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['status'], 202)
+        self.assertEqual(response.data[0]['error'], u'Duplicate submission')
+        self.assertEqual(self.xform.instances.count(), count + 2)
@@ -1,5 +1,7 @@
 import json
 import types
+from calendar import timegm
+from hashlib import md5
 
 from django.db.models import Q
 from django.db.models.query import QuerySet
@@ -7,6 +9,7 @@ from django.db.utils import DataError
 from django.conf import settings
 from django.http import Http404
 from django.http import StreamingHttpResponse
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
 from django.utils import six
 from django.utils.translation import ugettext as _
 from django.core.exceptions import PermissionDenied
@@ -27,6 +30,7 @@ from onadata.apps.logger.models.attachment import Attachment
 from onadata.apps.logger.models import OsmData
 from onadata.apps.logger.models.xform import XForm
 from onadata.apps.logger.models.instance import Instance
+from onadata.apps.logger.models.data_version import XFormDataVersion
 from onadata.apps.viewer.models.parsed_instance import get_etag_hash_from_query
 from onadata.apps.viewer.models.parsed_instance import get_sql_with_params
 from onadata.apps.viewer.models.parsed_instance import get_where_clause
@@ -39,6 +43,7 @@ from onadata.libs.mixins.authenticate_header_mixin import \
 from onadata.libs.mixins.cache_control_mixin import CacheControlMixin
 from onadata.libs.mixins.etags_mixin import ETagsMixin
 from onadata.libs.mixins.total_header_mixin import TotalHeaderMixin
+from onadata.libs.pagination import KeysetPagination
 from onadata.libs.pagination import StandardPageNumberPagination
 from onadata.libs.serializers.data_serializer import DataSerializer
 from onadata.libs.serializers.data_serializer import (
@@ -53,6 +58,8 @@ from onadata.libs.permissions import CAN_DELETE_SUBMISSION,\
 from onadata.libs.utils.viewer_tools import EnketoError
 from onadata.libs.utils.viewer_tools import get_enketo_edit_url
 from onadata.libs.utils.api_export_tools import custom_response_handler
+from onadata.libs.utils.common_tools import str_to_bool
+from onadata.libs.utils.model_tools import queryset_cursor_iterator
 from onadata.libs.data import parse_int
 from onadata.apps.api.permissions import ConnectViewsetPermissions
 from onadata.apps.api.tools import get_baseviewset_class
@@ -99,6 +106,7 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
         renderers.CSVRenderer,
         renderers.CSVZIPRenderer,
         renderers.SAVZIPRenderer,
+        renderers.ParquetRenderer,
         renderers.SurveyRenderer,
         renderers.GeoJsonRenderer,
         renderers.KMLRenderer,
@@ -115,6 +123,8 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
     extra_lookup_fields = None
     public_data_endpoint = 'public'
     pagination_class = StandardPageNumberPagination
+    etag_hash = None
+    last_modified = None
 
     queryset = XForm.objects.filter()
 
@@ -131,7 +141,7 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
             serializer_class = GeoJsonSerializer
         elif pk is not None and dataid is None \
                 and pk != self.public_data_endpoint:
-            if sort or fields:
+            if sort or fields or KeysetPagination.is_requested(self.request):
                 serializer_class = JsonDataSerializer
             else:
                 serializer_class = DataInstanceSerializer
@@ -355,6 +365,14 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
 
         if (export_type is None or export_type in ['json', 'jsonp', 'debug']) \
                 and hasattr(self, 'object_list'):
+            if lookup and not is_public_request and \
+                    not self._is_filtered(query):
+                self.set_data_version_etag(xform)
+                if self._is_not_modified():
+                    self.set_etag_header(None, self.etag_hash)
+
+                    return Response(status=status.HTTP_304_NOT_MODIFIED)
+
             return self._get_data(query, fields, sort, start, limit,
                                   is_public_request)
 
@@ -423,7 +441,10 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
             else:
                 self.total_count = self.object_list.count()
 
-            if isinstance(self.object_list, QuerySet):
+            if self.etag_hash is not None:
+                # derived from the form's data version
+                pass
+            elif isinstance(self.object_list, QuerySet):
                 self.etag_hash = get_etag_hash_from_query(self.object_list)
             else:
                 sql, params, records = get_sql_with_params(
@@ -436,7 +457,98 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
         except DataError, e:
             raise ParseError(unicode(e))
 
+    def _is_filtered(self, query):
+        params = self.request.query_params
+
+        return bool(query or params.get('tags') or params.get('not_tagged'))
+
+    def set_data_version_etag(self, xform):
+        """
+        Set the ETag and Last-Modified of an unfiltered data listing from
+        the form's data version, without reading its submissions.
+        """
+        version = XFormDataVersion.get_version(xform.pk)
+        if version is None:
+            return
+
+        data_version, self.last_modified = version
+        # the listing also depends on its parameters and the user's
+        # permissions
+        self.etag_hash = md5((u'%s:%s:%s:%s' % (
+            xform.pk, data_version, self.request.user.pk,
+            self.request.get_full_path()
+        )).encode('utf-8')).hexdigest()
+        self.headers['Last-Modified'] = http_date(
+            timegm(self.last_modified.utctimetuple()))
+
+    def _is_not_modified(self):
+        if self.etag_hash is None:
+            return False
+
+        if_none_match = self.request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            return self.etag_hash in parse_etags(if_none_match)
+
+        if_modified_since = parse_http_date_safe(
+            self.request.META.get('HTTP_IF_MODIFIED_SINCE'))
+        if if_modified_since is not None:
+            return timegm(self.last_modified.utctimetuple()) <= \
+                if_modified_since
+
+        return False
+
+    def set_keyset_page(self, query, fields):
+        """
+        Set self.object_list to the page of submissions after the requested
+        id, the total count is only computed when ?count=true.
+        """
+        try:
+            where, where_params = get_where_clause(query)
+            if fields and isinstance(fields, six.string_types):
+                fields = json.loads(fields)
+        except ValueError, e:
+            raise ParseError(unicode(e))
+
+        if where:
+            self.object_list = self.object_list.extra(where=where,
+                                                      params=where_params)
+        if str_to_bool(self.request.query_params.get('count')):
+            self.total_count = self.object_list.count()
+
+        paginator = KeysetPagination()
+        try:
+            page = paginator.paginate_queryset(
+                self.object_list.values_list('pk', 'json', 'date_modified'),
+                self.request, view=self)
+        except DataError, e:
+            raise ParseError(unicode(e))
+
+        if fields:
+            self.object_list = [dict([(f, row[1].get(f)) for f in fields])
+                                for row in page]
+        else:
+            self.object_list = [row[1] for row in page]
+
+        if self.etag_hash is None:
+            # the etag of a page only depends on the page's own rows
+            self.etag_hash = md5(u''.join([
+                u'%s%s' % (row[0], row[2].isoformat()) for row in page
+            ]) + json.dumps(fields)).hexdigest()
+
+        next_link = paginator.get_next_link()
+        if next_link:
+            self.headers['Link'] = u'<%s>; rel="next"' % next_link
+
     def _get_data(self, query, fields, sort, start, limit, is_public_request):
+        if not is_public_request and \
+                KeysetPagination.is_requested(self.request):
+            if sort or start:
+                raise ParseError(_(
+                    u"sort and start cannot be used with after_id or cursor"))
+            self.set_keyset_page(query, fields)
+
+            return self._get_response(len(self.object_list))
+
         self.set_object_list_and_total_count(
             query, fields, sort, start, limit, is_public_request)
 
@@ -448,12 +560,16 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
                 should_paginate:
             self.object_list = self.paginate_queryset(self.object_list)
 
+        length = self.total_count
+        if should_paginate and \
+                not isinstance(self.object_list, types.GeneratorType):
+            length = len(self.object_list)
+
+        return self._get_response(length)
+
+    def _get_response(self, length):
         STREAM_DATA = getattr(settings, 'STREAM_DATA', False)
         if STREAM_DATA:
-            length = self.total_count
-            if should_paginate and \
-                    not isinstance(self.object_list, types.GeneratorType):
-                length = len(self.object_list)
             response = self._get_streaming_response(length)
         else:
             serializer = self.get_serializer(self.object_list, many=True)
@@ -476,8 +592,14 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
 
             yield u"]"
 
+        object_list = self.object_list
+        if isinstance(object_list, QuerySet):
+            # stream the json documents instead of loading every instance
+            object_list = queryset_cursor_iterator(
+                object_list.values_list('json', flat=True))
+
         response = StreamingHttpResponse(
-            stream_json(self.object_list, length),
+            stream_json(object_list, length),
             content_type="application/json"
         )
 
@@ -27,6 +27,7 @@ class ExportViewSet(ReadOnlyModelViewSet):
         renderers.KMLRenderer,
         renderers.OSMExportRenderer,
         renderers.SAVZIPRenderer,
+        renderers.ParquetRenderer,
         renderers.XLSRenderer,
         renderers.XLSXRenderer,
         renderers.ZipRenderer
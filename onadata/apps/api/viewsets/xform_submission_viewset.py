@@ -1,5 +1,9 @@
+import os
 import re
+import shutil
 import StringIO
+import tempfile
+import zipfile
 
 from django.conf import settings
 from django.contrib.auth.models import User
@@ -13,10 +17,13 @@ from rest_framework import mixins
 from rest_framework.authentication import (
     BasicAuthentication,
     TokenAuthentication)
+from rest_framework.decorators import list_route
 from rest_framework.response import Response
 from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 
+from onadata.apps.logger.import_tools import get_instance_media_files
 from onadata.apps.logger.models import Instance
+from onadata.apps.logger.xform_fs import XFormInstanceFS
 from onadata.apps.main.models.user_profile import UserProfile
 from onadata.libs import filters
 from onadata.libs.authentication import DigestAuthentication
@@ -26,7 +33,10 @@ from onadata.libs.mixins.authenticate_header_mixin import \
 from onadata.libs.mixins.openrosa_headers_mixin import OpenRosaHeadersMixin
 from onadata.libs.renderers.renderers import TemplateXMLRenderer
 from onadata.libs.serializers.data_serializer import SubmissionSerializer
-from onadata.libs.utils.logger_tools import dict2xform, safe_create_instance
+from onadata.libs.utils.logger_tools import (
+    dict2xform,
+    safe_create_instance,
+    safe_create_instances_in_bulk)
 from onadata.apps.api.tools import get_baseviewset_class
 
 BaseViewset = get_baseviewset_class()
@@ -98,6 +108,37 @@ def create_instance_from_json(username, request):
     return safe_create_instance(username, xml_file, [], None, request)
 
 
+def get_bulk_submissions(request, temp_directory):
+    """Return a (name, xml, media files) tuple for each submission in a bulk
+    submission request.
+
+    Submissions are either ODK instance folders in a zip_submission_file
+    zip or xml_submission_file files, any other file is a media file of
+    the submissions whose XML refers to its name.
+    """
+    submissions = []
+    zip_files = request.FILES.pop('zip_submission_file', [])
+    xml_files = request.FILES.pop('xml_submission_file', [])
+    media_files = request.FILES.values()
+
+    for zip_file in zip_files:
+        zipfile.ZipFile(zip_file).extractall(temp_directory)
+    for directory, subdirs, subfiles in os.walk(temp_directory):
+        for filename in subfiles:
+            filepath = os.path.join(directory, filename)
+            if XFormInstanceFS.is_valid_instance(filepath):
+                xfxs = XFormInstanceFS(filepath)
+                submissions.append(
+                    (xfxs.filename, xfxs.xml, get_instance_media_files(xfxs)))
+
+    for xml_file in xml_files:
+        xml = xml_file.read()
+        submissions.append((xml_file.name, xml, [
+            f for f in media_files if xml.find(f.name) > 0]))
+
+    return submissions
+
+
 class XFormSubmissionViewSet(AuthenticateHeaderMixin,
                              OpenRosaHeadersMixin, mixins.CreateModelMixin,
                              BaseViewset,
@@ -162,6 +203,58 @@ class XFormSubmissionViewSet(AuthenticateHeaderMixin,
                         status=status.HTTP_201_CREATED,
                         template_name=self.template_name)
 
+    @list_route(methods=['POST'])
+    def bulk(self, request, *args, **kwargs):
+        """Create many submissions in batches, returns the result of each
+        submission as the JSON of a single submission would be.
+        """
+        request.accepted_renderer = JSONRenderer()
+        request.accepted_media_type = JSONRenderer.media_type
+
+        if request.user.is_anonymous():
+            # raises a permission denied exception, forces authentication
+            self.permission_denied(request)
+        username = self.kwargs.get('username') or request.user.username
+
+        submissions = []
+        temp_directory = tempfile.mkdtemp()
+        try:
+            try:
+                submissions = get_bulk_submissions(request, temp_directory)
+            except zipfile.BadZipfile as e:
+                return Response({'error': u"%s" % e},
+                                headers=self.get_openrosa_headers(request),
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            results = safe_create_instances_in_bulk(
+                username, [(xml, media_files)
+                           for name, xml, media_files in submissions],
+                request)
+        finally:
+            for name, xml, media_files in submissions:
+                for media_file in media_files:
+                    media_file.close()
+            shutil.rmtree(temp_directory)
+
+        context = self.get_serializer_context()
+        data = []
+        for (name, xml, media_files), (error, instance) in zip(
+                submissions, results):
+            if error or not instance:
+                result = self.error_response(error, True, request).data
+                result['status'] = \
+                    status.HTTP_400_BAD_REQUEST if not error or \
+                    isinstance(error, basestring) else error.status_code
+            else:
+                result = SubmissionSerializer(instance, context=context).data
+                result['status'] = status.HTTP_201_CREATED
+            result['name'] = name
+            data.append(result)
+
+        return Response(data,
+                        headers=self.get_openrosa_headers(request),
+                        status=status.HTTP_200_OK)
+
     def error_response(self, error, is_json_request, request):
         if not error:
             error_msg = _(u"Unable to create submission.")
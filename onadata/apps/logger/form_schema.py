@@ -0,0 +1,105 @@
+"""
+Compiled form schemas, the survey of a form with its element indexes,
+kept in a per process LRU cache so that a form's survey is built once per
+worker instead of once per XForm object.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from pyxform import constants
+
+from onadata.libs.utils.common_tags import KNOWN_MEDIA_TYPES
+
+NUMERIC_TYPES = [u'decimal', u'integer']
+DATE_TYPES = [u'date', u'datetime', u'start', u'end', u'today']
+CHOICE_TYPES = [constants.SELECT_ONE, constants.SELECT_ALL_THAT_APPLY]
+
+
+class FormSchema(object):
+    """A survey with its elements indexed by type and abbreviated xpath."""
+
+    def __init__(self, survey):
+        self.survey = survey
+        self.elements = []
+        self.xpaths = []
+        self.element_by_xpath = {}
+        self.elements_by_type = {}
+        self.xpaths_by_type = {}
+        self.geopoint_xpaths = []
+        self.choices = {}
+
+        for element in survey.iter_descendants():
+            xpath = element.get_abbreviated_xpath()
+            self.elements.append(element)
+            self.xpaths.append(xpath)
+            self.element_by_xpath[xpath] = element
+            self.elements_by_type.setdefault(element.type, []).append(element)
+            self.xpaths_by_type.setdefault(element.type, []).append(xpath)
+            if element.bind.get(u'type') == u'geopoint':
+                self.geopoint_xpaths.append(xpath)
+            if element.type in CHOICE_TYPES:
+                choices = self.choices[xpath] = OrderedDict()
+                for choice in element.children:
+                    choices.setdefault(choice.name, choice)
+
+        self.repeat_xpaths = self.get_xpaths_of_type(u'repeat')
+        self.numeric_xpaths = self.get_xpaths_of_type(*NUMERIC_TYPES)
+        self.date_xpaths = self.get_xpaths_of_type(*DATE_TYPES)
+        self.media_xpaths = self.get_xpaths_of_type(*KNOWN_MEDIA_TYPES)
+        self.elements_with_choices = [
+            e for e in self.elements if e.type in CHOICE_TYPES]
+
+    @property
+    def default_language(self):
+        if not hasattr(self, '_default_language'):
+            self._default_language = \
+                self.survey.to_json_dict().get('default_language')
+
+        return self._default_language
+
+    def get_elements_of_type(self, *types):
+        return [e for t in types for e in self.elements_by_type.get(t, [])]
+
+    def get_xpaths_of_type(self, *types):
+        return [x for t in types for x in self.xpaths_by_type.get(t, [])]
+
+
+class FormSchemaCache(object):
+    """A thread safe LRU of FormSchema objects keyed by form id and hash."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._schemas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            schema = self._schemas.pop(key, None)
+            if schema is not None:
+                self._schemas[key] = schema
+
+                return schema
+
+        schema = build()
+        with self._lock:
+            self._schemas[key] = schema
+            while len(self._schemas) > self.max_size:
+                self._schemas.popitem(last=False)
+
+        return schema
+
+    def invalidate(self, pk, current_hash=None):
+        """Remove the schemas of form pk, except the one of current_hash."""
+        with self._lock:
+            for key in [k for k in self._schemas
+                        if k[0] == pk and k[1] != current_hash]:
+                del self._schemas[key]
+
+    def clear(self):
+        with self._lock:
+            self._schemas.clear()
+
+
+form_schema_cache = FormSchemaCache(
+    getattr(settings, 'XFORM_SCHEMA_CACHE_SIZE', 100))
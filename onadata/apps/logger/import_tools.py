@@ -7,7 +7,8 @@ import zipfile
 from django.core.files.uploadedfile import InMemoryUploadedFile
 
 from onadata.apps.logger.xform_fs import XFormInstanceFS
-from onadata.libs.utils.logger_tools import create_instance
+from onadata.libs.utils.logger_tools import create_instance,\
+    create_instances_in_bulk
 
 # odk
 # ├── forms
@@ -69,7 +70,76 @@ def iterate_through_instances(dirpath, callback, user=None, status='zip',
     return (total_file_count, success_count, errors)
 
 
-def import_instances_from_zip(zipfile_path, user, status="zip"):
+def get_instance_media_files(xform_fs):
+    images = [django_file(jpg, field_name="image", content_type="image/jpeg")
+              for jpg in xform_fs.photos]
+    images += [django_file(osm, field_name='image', content_type='text/xml')
+               for osm in xform_fs.osm]
+
+    return images
+
+
+def _import_batch(batch, user, status, callback):
+    """
+    Import a batch of XFormInstanceFS objects with create_instances_in_bulk,
+    submissions it leaves out go through callback.
+    """
+    success_count = 0
+    errors = []
+    submissions = [(xfxs.xml, get_instance_media_files(xfxs))
+                   for xfxs in batch]
+
+    try:
+        results = create_instances_in_bulk(
+            user.username, submissions, status=status)
+    finally:
+        for xml, media_files in submissions:
+            for media_file in media_files:
+                media_file.close()
+
+    for xfxs, result in zip(batch, results):
+        if result is None:
+            try:
+                success_count += callback(xfxs)
+            except Exception, e:
+                errors.append("%s => %s" % (xfxs.filename, str(e)))
+        else:
+            success_count += 1
+
+    return success_count, errors
+
+
+def iterate_through_instances_in_batches(dirpath, callback, user,
+                                         status='zip', batch_size=100):
+    total_file_count = 0
+    success_count = 0
+    errors = []
+    batch = []
+
+    for directory, subdirs, subfiles in os.walk(dirpath):
+        for filename in subfiles:
+            filepath = os.path.join(directory, filename)
+            if XFormInstanceFS.is_valid_instance(filepath):
+                batch.append(XFormInstanceFS(filepath))
+                total_file_count += 1
+
+            if len(batch) >= batch_size:
+                count, batch_errors = _import_batch(
+                    batch, user, status, callback)
+                success_count += count
+                errors.extend(batch_errors)
+                batch = []
+
+    if batch:
+        count, batch_errors = _import_batch(batch, user, status, callback)
+        success_count += count
+        errors.extend(batch_errors)
+
+    return (total_file_count, success_count, errors)
+
+
+def import_instances_from_zip(zipfile_path, user, status="zip",
+                              batch_size=None):
     try:
         temp_directory = tempfile.mkdtemp()
         zf = zipfile.ZipFile(zipfile_path)
@@ -79,12 +149,18 @@ def import_instances_from_zip(zipfile_path, user, status="zip"):
         errors = [u"%s" % e]
         return 0, 0, errors
     else:
-        return import_instances_from_path(temp_directory, user, status)
+        return import_instances_from_path(
+            temp_directory, user, status, batch_size=batch_size)
     finally:
         shutil.rmtree(temp_directory)
 
 
-def import_instances_from_path(path, user, status="zip", is_async=False):
+def import_instances_from_path(path, user, status="zip", is_async=False,
+                               batch_size=None):
+    """
+    Import the ODK instances in path, in batches of batch_size submissions
+    when batch_size is set.
+    """
     def callback(xform_fs):
         """
         This callback is passed an instance of a XFormInstanceFS.
@@ -92,13 +168,7 @@ def import_instances_from_path(path, user, status="zip", is_async=False):
         """
         with django_file(xform_fs.path, field_name="xml_file",
                          content_type="text/xml") as xml_file:
-            images = [django_file(jpg, field_name="image",
-                      content_type="image/jpeg") for jpg in xform_fs.photos]
-            images += [
-                django_file(osm, field_name='image',
-                            content_type='text/xml')
-                for osm in xform_fs.osm
-            ]
+            images = get_instance_media_files(xform_fs)
             # TODO: if an instance has been submitted make sure all the
             # files are in the database.
             # there shouldn't be any instances with a submitted status in the
@@ -123,6 +193,10 @@ def import_instances_from_path(path, user, status="zip", is_async=False):
             status=status,
             is_async=is_async
         )
+    elif batch_size:
+        total_count, success_count, errors = \
+            iterate_through_instances_in_batches(
+                path, callback, user, status=status, batch_size=batch_size)
     else:
         total_count, success_count, errors = iterate_through_instances(
             path, callback
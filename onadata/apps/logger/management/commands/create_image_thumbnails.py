@@ -3,14 +3,12 @@ from optparse import make_option
 from django.contrib.auth.models import User
 
 from django.core.management.base import BaseCommand, CommandError
-from django.core.files.storage import get_storage_class
-from django.conf import settings
 
 from onadata.apps.logger.models.attachment import Attachment
 from onadata.apps.logger.models.xform import XForm
-from onadata.libs.utils.image_tools import resize, resize_local_env
+from onadata.libs.utils.image_tools import \
+    create_attachment_thumbnails_async
 from onadata.libs.utils.model_tools import queryset_iterator
-from onadata.libs.utils.viewer_tools import get_path
 from django.utils.translation import ugettext as _, ugettext_lazy
 
 
@@ -23,12 +21,15 @@ class Command(BaseCommand):
         make_option('-i', '--id_string',
                     help=ugettext_lazy("id string of the form")),
         make_option('-f', '--force', action='store_false',
-                    help=ugettext_lazy("regenerate thumbnails if they exist."))
+                    help=ugettext_lazy("regenerate thumbnails if they exist.")),
+        make_option('-b', '--batch-size', type='int', dest='batch_size',
+                    default=100,
+                    help=ugettext_lazy("number of images per worker task"))
     )
 
     def handle(self, *args, **kwargs):
-        attachments_qs = Attachment.objects.select_related(
-            'instance', 'instance__xform')
+        attachments_qs = Attachment.objects.filter(
+            mimetype__startswith='image')
         if kwargs.get('username'):
             username = kwargs.get('username')
             try:
@@ -49,32 +50,23 @@ class Command(BaseCommand):
                     {'id_string': id_string}
                 )
             attachments_qs = attachments_qs.filter(instance__xform=xform)
-        fs = get_storage_class('django.core.files.storage.FileSystemStorage')()
-        for att in queryset_iterator(attachments_qs):
-            filename = att.media_file.name
-            default_storage = get_storage_class()()
-            full_path = get_path(filename,
-                                 settings.THUMB_CONF['small']['suffix'])
-            if kwargs.get('force') is not None:
-                for s in ['small', 'medium', 'large']:
-                    fp = get_path(filename,
-                                  settings.THUMB_CONF[s]['suffix'])
-                    if default_storage.exists(fp):
-                        default_storage.delete(fp)
-            if not default_storage.exists(full_path):
-                try:
-                    if default_storage.__class__ != fs.__class__:
-                        resize(filename)
-                    else:
-                        resize_local_env(filename)
-                    if default_storage.exists(get_path(
-                            filename,
-                            '%s' % settings.THUMB_CONF['small']['suffix'])):
-                        print (_(u'Thumbnails created for %(file)s')
-                               % {'file': filename})
-                    else:
-                        print (_(u'Problem with the file %(file)s')
-                               % {'file': filename})
-                except (IOError, OSError), e:
-                    print _(u'Error on %(filename)s: %(error)s') \
-                        % {'filename': filename, 'error': e}
+        # each batch is sent to a worker, the workers create the
+        # thumbnails of the batches in parallel
+        batch_size = int(kwargs.get('batch_size') or 100)
+        force = kwargs.get('force') is not None
+        attachment_ids = []
+        batches = 0
+        for attachment in queryset_iterator(
+                attachments_qs, chunksize=batch_size, values=['pk']):
+            attachment_ids.append(attachment['pk'])
+            if len(attachment_ids) == batch_size:
+                create_attachment_thumbnails_async.delay(
+                    attachment_ids, force)
+                attachment_ids = []
+                batches += 1
+        if attachment_ids:
+            create_attachment_thumbnails_async.delay(attachment_ids, force)
+            batches += 1
+
+        print _(u'Queued %(batches)d batches of image attachments') \
+            % {'batches': batches}
@@ -18,7 +18,8 @@ class Command(BaseCommand):
             writer.writerow(fieldnames)
 
             for instance in queryset_iterator(
-                    Instance.objects.exclude(geom__isnull=True)):
+                    Instance.objects.exclude(geom__isnull=True),
+                    chunksize=1000, only=['geom', 'date_created']):
                 if hasattr(instance, 'point') and instance.point is not None:
                     longitude = instance.point.coords[0]
                     latitude = instance.point.coords[1]
@@ -2,6 +2,7 @@
 # vim: ai ts=4 sts=4 et sw=5 coding=utf-8
 import os
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.management.base import BaseCommand, CommandError
 from django.utils.translation import ugettext as _, ugettext_lazy
@@ -15,6 +16,14 @@ class Command(BaseCommand):
     help = ugettext_lazy("Import a zip file, a directory containing zip files "
                          "or a directory of ODK instances")
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, dest='batch_size',
+            default=getattr(settings, 'BULK_SUBMISSION_BATCH_SIZE', 100),
+            help=ugettext_lazy(
+                "Number of submissions to create per batch, 0 creates them "
+                "one at a time."))
+
     def _log_import(self, results):
         total_count, success_count, errors = results
         self.stdout.write(_(
@@ -31,6 +40,7 @@ class Command(BaseCommand):
         is_async = args[2] if len(args) > 2 else False
         is_async = True if isinstance(is_async, basestring) and \
             is_async.lower() == 'true' else False
+        batch_size = kwargs.get('batch_size')
         try:
             user = User.objects.get(username=username)
         except User.DoesNotExist:
@@ -49,7 +59,7 @@ class Command(BaseCommand):
                 subdirs.remove("odk")
                 self.stdout.write(_("Importing from dir %s..\n") % dir)
                 results = import_instances_from_path(
-                    dir, user, is_async=is_async
+                    dir, user, is_async=is_async, batch_size=batch_size
                 )
                 self._log_import(results)
             for file in files:
@@ -58,5 +68,6 @@ class Command(BaseCommand):
                         os.path.splitext(filepath)[1].lower() == ".zip":
                     self.stdout.write(_(
                         "Importing from zip at %s..\n") % filepath)
-                    results = import_instances_from_zip(filepath, user)
+                    results = import_instances_from_zip(
+                        filepath, user, batch_size=batch_size)
                     self._log_import(results)
@@ -2,6 +2,7 @@ from django.utils.translation import ugettext_lazy
 from django.core.management.base import BaseCommand
 
 from onadata.apps.logger.models import Attachment
+from onadata.apps.logger.models import Instance
 from onadata.apps.logger.models import XForm
 from onadata.libs.utils.model_tools import queryset_iterator
 from onadata.libs.utils.osm import save_osm_data
@@ -19,16 +20,15 @@ class Command(BaseCommand):
             xforms = xforms.filter(user__username=args[0])
 
         for xform in queryset_iterator(xforms):
-            attachments = Attachment.objects.filter(
-                extension=Attachment.OSM,
-                instance__xform=xform
-            ).distinct('instance')
+            instances = Instance.objects.filter(
+                attachments__extension=Attachment.OSM,
+                xform=xform
+            ).distinct()
 
-            count = attachments.count()
+            count = instances.count()
             c = 0
-            for a in queryset_iterator(attachments):
-                pk = a.instance.parsed_instance.pk
-                save_osm_data(pk)
+            for instance in queryset_iterator(instances, values=['pk']):
+                save_osm_data(instance['pk'])
                 c += 1
                 if c % 1000 == 0:
                     self.stdout.write("%s:%s: Processed %s of %s." %
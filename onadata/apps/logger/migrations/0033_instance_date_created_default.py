@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import onadata.apps.logger.models.instance
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0032_project_deleted_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='instance',
+            name='date_created',
+            field=models.DateTimeField(
+                default=onadata.apps.logger.models.instance.submission_time,
+                editable=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.contrib.postgres.fields.jsonb
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0033_instance_date_created_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XFormColumnSchema',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True,
+                                        serialize=False, verbose_name='ID')),
+                ('xform_hash', models.CharField(max_length=32)),
+                ('repeat_columns',
+                 django.contrib.postgres.fields.jsonb.JSONField(
+                     default=dict)),
+                ('last_instance_id', models.IntegerField(default=0)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('date_modified', models.DateTimeField(auto_now=True)),
+                ('xform', models.OneToOneField(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='column_schema', to='logger.XForm')),
+            ],
+        ),
+    ]
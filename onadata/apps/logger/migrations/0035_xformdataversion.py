@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0034_xformcolumnschema'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XFormDataVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True,
+                                        serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+                ('date_modified', models.DateTimeField(auto_now=True)),
+                ('xform', models.OneToOneField(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='data_version', to='logger.XForm')),
+            ],
+        ),
+        # forms published before data versions were kept
+        migrations.RunSQL(
+            "INSERT INTO logger_xformdataversion "
+            "(xform_id, version, date_modified) "
+            "SELECT id, 0, now() FROM logger_xform",
+            migrations.RunSQL.noop),
+    ]
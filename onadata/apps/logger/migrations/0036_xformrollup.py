@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0035_xformdataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XFormRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True,
+                                        serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=255)),
+                ('group_by', models.CharField(blank=True, default='',
+                                              max_length=255)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('xform', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='rollups', to='logger.XForm')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='XFormRollupCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True,
+                                        serialize=False, verbose_name='ID')),
+                ('value', models.TextField(null=True)),
+                ('group_value', models.TextField(null=True)),
+                ('count', models.BigIntegerField(default=0)),
+                ('rollup', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='counts', to='logger.XFormRollup')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='xformrollup',
+            unique_together=set([('xform', 'field', 'group_by')]),
+        ),
+    ]
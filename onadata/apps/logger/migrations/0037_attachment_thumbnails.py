@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0036_xformrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='thumbnails',
+            field=django.contrib.postgres.fields.jsonb.JSONField(
+                blank=True, default=list),
+        ),
+    ]
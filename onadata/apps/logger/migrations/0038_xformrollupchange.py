@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0037_attachment_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='xformrollup',
+            name='counted',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='xformrollup',
+            name='snapshot',
+            field=models.TextField(null=True),
+        ),
+        migrations.CreateModel(
+            name='XFormRollupChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True,
+                                        serialize=False, verbose_name='ID')),
+                ('txid', models.BigIntegerField()),
+                ('value', models.TextField(null=True)),
+                ('group_value', models.TextField(null=True)),
+                ('count', models.BigIntegerField(default=0)),
+                ('rollup', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='changes', to='logger.XFormRollup')),
+            ],
+        ),
+    ]
@@ -9,3 +9,7 @@ from onadata.apps.logger.models.data_view import DataView
 from onadata.apps.logger.models.widget import Widget
 from onadata.apps.logger.models.osmdata import OsmData
 from onadata.apps.logger.models.open_data import OpenData
+from onadata.apps.logger.models.column_schema import XFormColumnSchema
+from onadata.apps.logger.models.data_version import XFormDataVersion
+from onadata.apps.logger.models.rollup import XFormRollup, XFormRollupCount, \
+    XFormRollupChange
@@ -2,6 +2,7 @@ import os
 import mimetypes
 
 from hashlib import md5
+from django.contrib.postgres.fields import JSONField
 from django.db import models
 
 from instance import Instance
@@ -45,11 +46,17 @@ class Attachment(models.Model):
     date_modified = models.DateTimeField(null=True, auto_now=True)
     deleted_at = models.DateTimeField(null=True, default=None)
     file_size = models.PositiveIntegerField(default=0)
+    # the THUMB_CONF sizes of the image's thumbnails that were created
+    thumbnails = JSONField(default=list, blank=True)
 
     class Meta:
         app_label = 'logger'
 
     def save(self, *args, **kwargs):
+        self._set_file_details()
+        super(Attachment, self).save(*args, **kwargs)
+
+    def _set_file_details(self):
         if self.media_file and self.mimetype == '':
             # guess mimetype
             mimetype, encoding = mimetypes.guess_type(self.media_file.name)
@@ -66,8 +73,6 @@ class Attachment(models.Model):
         except (OSError, AttributeError):
             pass
 
-        super(Attachment, self).save(*args, **kwargs)
-
     @property
     def file_hash(self):
         if self.media_file.storage.exists(self.media_file.name):
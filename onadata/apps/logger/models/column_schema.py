@@ -0,0 +1,51 @@
+from django.contrib.gis.db import models
+from django.contrib.postgres.fields import JSONField
+from django.db.models import Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from onadata.apps.logger.models.xform import XForm
+
+
+class XFormColumnSchema(models.Model):
+    """
+    The repeat columns discovered in a form's submissions, i.e. the indexed
+    xpaths e.g. children[2]/name that exports need as columns, kept up to
+    date as submissions are received so that exports do not have to read
+    all the data once just to find them.
+    """
+    xform = models.OneToOneField(XForm, related_name='column_schema')
+    # the hash of the form the columns were discovered for
+    xform_hash = models.CharField(max_length=32)
+    # a mapping of a repeat's abbreviated xpath to its columns
+    repeat_columns = JSONField(default=dict, null=False)
+    # the last submission included in the repeat columns
+    last_instance_id = models.IntegerField(default=0)
+
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'logger'
+
+    def is_stale(self):
+        """
+        The columns are stale if the form changed, or a submission was
+        added, edited or deleted without updating them.
+        """
+        if self.xform_hash != self.xform.hash:
+            return True
+
+        return self.xform.instances.filter(
+            Q(pk__gt=self.last_instance_id) |
+            Q(date_modified__gt=self.date_modified)
+        ).exists()
+
+    @classmethod
+    def set_last_instance_id(cls, xform, last_instance_id):
+        """Mark submissions up to last_instance_id as included without
+        changing the columns."""
+        cls.objects.filter(xform=xform, xform_hash=xform.hash).update(
+            last_instance_id=Greatest(
+                'last_instance_id', Value(last_instance_id)),
+            date_modified=timezone.now())
@@ -0,0 +1,50 @@
+from django.db import models
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from onadata.apps.logger.models.xform import XForm
+
+
+class XFormDataVersion(models.Model):
+    """
+    A counter of the changes to a form's submissions, bumped whenever a
+    submission is added, edited or deleted, so that data listings can tell
+    whether their data changed without reading it.
+
+    It is kept out of XForm so that saving a stale XForm object can not
+    move the counter back.
+    """
+    xform = models.OneToOneField(XForm, related_name='data_version')
+    version = models.BigIntegerField(default=0)
+    date_modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'logger'
+
+    @classmethod
+    def bump(cls, xform_id):
+        """Increment the data version of the form xform_id."""
+        cls.objects.filter(xform_id=xform_id).update(
+            version=F('version') + 1, date_modified=timezone.now())
+
+    @classmethod
+    def get_version(cls, xform_id):
+        """
+        Return the data version and modification date of the form xform_id
+        or None if it has no data version.
+        """
+        versions = cls.objects.filter(xform_id=xform_id).values_list(
+            'version', 'date_modified')
+
+        return versions[0] if versions else None
+
+
+def create_xform_data_version(sender, instance=None, created=False,
+                              **kwargs):
+    if created:
+        XFormDataVersion.objects.create(xform=instance)
+
+
+post_save.connect(create_xform_data_version, sender=XForm,
+                  dispatch_uid='create_xform_data_version')
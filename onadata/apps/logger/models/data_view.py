@@ -25,6 +25,7 @@ from onadata.libs.utils.cache_tools import (
     DATAVIEW_COUNT,
     DATAVIEW_LAST_SUBMISSION_TIME,
     XFORM_LINKED_DATAVIEWS)
+from onadata.libs.utils.model_tools import server_side_cursor_iterator
 
 SUPPORTED_FILTERS = ['=', '>', '<', '>=', '<=', '<>', '!=']
 ATTACHMENT_TYPES = ['photo', 'audio', 'video']
@@ -169,6 +170,15 @@ class DataView(models.Model):
 
         return True if records else False
 
+    def get_instances(self):
+        """Return a queryset of the submissions in the data view."""
+        where, where_params = self._get_where_clause(self,
+                                                     self.get_known_integers(),
+                                                     self.get_known_dates())
+
+        return self.xform.instances.filter(deleted_at__isnull=True).extra(
+            where=where, params=[unicode(i) for i in where_params])
+
     @classmethod
     def _get_where_clause(cls, data_view, form_integer_fields=[],
                           form_date_fields=[]):
@@ -211,7 +221,6 @@ class DataView(models.Model):
 
     @classmethod
     def query_iterator(cls, sql, fields=None, params=[], count=False):
-        cursor = connection.cursor()
         sql_params = fields + params if fields is not None else params
 
         if count:
@@ -225,14 +234,19 @@ class DataView(models.Model):
 
             sql_params = params
             fields = [u'count']
-
-        cursor.execute(sql, [unicode(i) for i in sql_params])
+            cursor = connection.cursor()
+            cursor.execute(sql, [unicode(i) for i in sql_params])
+            rows = cursor.fetchall()
+        else:
+            # stream the records instead of loading all of them
+            rows = server_side_cursor_iterator(
+                sql, [unicode(i) for i in sql_params])
 
         if fields is None:
-            for row in cursor.fetchall():
+            for row in rows:
                 yield row[0]
         else:
-            for row in cursor.fetchall():
+            for row in rows:
                 yield dict(zip(fields, row))
 
     @classmethod
@@ -305,12 +319,18 @@ class DataView(models.Model):
     @classmethod
     def query_data(cls, data_view, start_index=None, limit=None, count=None,
                    last_submission_time=False, all_data=False, sort=None,
-                   filter_query=None):
-
+                   filter_query=None, stream=False):
+        """
+        Return the data view's records as a list, or as a generator if
+        stream is True, query errors are then raised while iterating.
+        """
         (sql, columns, params) = cls.generate_query_string(
             data_view, start_index, limit, last_submission_time,
             all_data, sort, filter_query)
 
+        if stream and not count:
+            return DataView.query_iterator(sql, columns, params)
+
         try:
             records = [record for record in DataView.query_iterator(sql,
                                                                     columns,
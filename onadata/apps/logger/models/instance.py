@@ -17,11 +17,12 @@ from django.utils import timezone
 from django.utils.translation import ugettext as _
 from taggit.managers import TaggableManager
 
+from onadata.apps.logger.models.data_version import XFormDataVersion
 from onadata.apps.logger.models.survey_type import SurveyType
 from onadata.apps.logger.models.xform import XForm
 from onadata.apps.logger.models.xform import XFORM_TITLE_LENGTH
 from onadata.apps.logger.xform_instance_parser import XFormInstanceParser,\
-    clean_and_parse_xml, get_uuid_from_xml
+    SubmissionXML, get_id_string_from_xml
 from onadata.libs.utils.common_tags import ATTACHMENTS, BAMBOO_DATASET_ID,\
     DELETEDAT, EDITED, GEOLOCATION, ID, MONGO_STRFTIME, NOTES, \
     SUBMISSION_TIME, TAGS, UUID, XFORM_ID_STRING, SUBMITTED_BY, VERSION, \
@@ -102,25 +103,7 @@ def numeric_checker(string_value):
 
 
 def get_id_string_from_xml_str(xml_str):
-    xml_obj = clean_and_parse_xml(xml_str)
-    root_node = xml_obj.documentElement
-    id_string = root_node.getAttribute(u"id")
-
-    if len(id_string) == 0:
-        # may be hidden in submission/data/id_string
-        elems = root_node.getElementsByTagName('data')
-
-        for data in elems:
-            for child in data.childNodes:
-                id_string = data.childNodes[0].getAttribute('id')
-
-                if len(id_string) > 0:
-                    break
-
-            if len(id_string) > 0:
-                break
-
-    return id_string
+    return get_id_string_from_xml(xml_str)
 
 
 def submission_time():
@@ -138,27 +121,33 @@ def update_xform_submission_count(instance_id, created):
         except Instance.DoesNotExist:
             pass
         else:
-            # update xform.num_of_submissions
-            cursor = connection.cursor()
-            sql = (
-                'UPDATE logger_xform SET '
-                'num_of_submissions = num_of_submissions + 1, '
-                'last_submission_time = %s '
-                'WHERE id = %s'
-            )
-            params = [instance.date_created, instance.xform_id]
-
-            # update user profile.num_of_submissions
-            cursor.execute(sql, params)
-            sql = (
-                'UPDATE main_userprofile SET '
-                'num_of_submissions = num_of_submissions + 1 '
-                'WHERE user_id = %s'
-            )
-            cursor.execute(sql, [instance.xform.user_id])
+            increment_xform_submission_count(
+                instance.xform, 1, instance.date_created)
+
+
+def increment_xform_submission_count(xform, count, last_submission_time):
+    """Add count submissions to the xform's and its owner's counters."""
+    # update xform.num_of_submissions
+    cursor = connection.cursor()
+    sql = (
+        'UPDATE logger_xform SET '
+        'num_of_submissions = num_of_submissions + %s, '
+        'last_submission_time = %s '
+        'WHERE id = %s'
+    )
+    params = [count, last_submission_time, xform.pk]
+
+    # update user profile.num_of_submissions
+    cursor.execute(sql, params)
+    sql = (
+        'UPDATE main_userprofile SET '
+        'num_of_submissions = num_of_submissions + %s '
+        'WHERE user_id = %s'
+    )
+    cursor.execute(sql, [count, xform.user_id])
 
-            safe_delete('{}{}'.format(XFORM_DATA_VERSIONS, instance.xform_id))
-            safe_delete('{}{}'.format(DATAVIEW_COUNT, instance.xform_id))
+    safe_delete('{}{}'.format(XFORM_DATA_VERSIONS, xform.pk))
+    safe_delete('{}{}'.format(DATAVIEW_COUNT, xform.pk))
 
 
 def update_xform_submission_count_delete(sender, instance, **kwargs):
@@ -204,8 +193,12 @@ def save_full_json(instance_id, created):
         except Instance.DoesNotExist:
             pass
         else:
-            instance.json = instance.get_full_dict()
-            instance.save(update_fields=['json'])
+            _save_full_json(instance)
+
+
+def _save_full_json(instance):
+    instance.json = instance.get_full_dict()
+    instance.save(update_fields=['json'])
 
 
 @task
@@ -298,7 +291,7 @@ class InstanceBaseClass(object):
                 BAMBOO_DATASET_ID: self.xform.bamboo_dataset,
                 ATTACHMENTS: _get_attachments_from_instance(self),
                 STATUS: self.status,
-                TAGS: list(self.tags.names()),
+                TAGS: [tag.name for tag in self.tags.all()],
                 NOTES: self.get_notes(),
                 VERSION: self.version,
                 DURATION: self.get_duration(),
@@ -330,9 +323,27 @@ class InstanceBaseClass(object):
 
         return doc
 
+    def _get_submission_xml(self):
+        """Return the parsed XML for this instance, parsing it only once."""
+        submission_xml = getattr(self, '_submission_xml', None)
+        if submission_xml is None or submission_xml.xml is not self.xml:
+            submission_xml = SubmissionXML(self.xml)
+            self._submission_xml = submission_xml
+
+        return submission_xml
+
+    def set_submission_xml(self, submission_xml):
+        """Reuse an already parsed SubmissionXML for this instance's xml."""
+        self.xml = submission_xml.xml
+        self._submission_xml = submission_xml
+        if hasattr(self, '_parser'):
+            del self._parser
+        if hasattr(self, '_flat_dict'):
+            del self._flat_dict
+
     def _set_parser(self):
         if not hasattr(self, "_parser"):
-            self._parser = XFormInstanceParser(self.xml, self.xform)
+            self._parser = self._get_submission_xml().get_parser(self.xform)
 
     def _set_survey_type(self):
         self.survey_type, created = \
@@ -340,7 +351,7 @@ class InstanceBaseClass(object):
 
     def _set_uuid(self):
         if self.xml and not self.uuid:
-            uuid = get_uuid_from_xml(self.xml)
+            uuid = self._get_submission_xml().uuid
             if uuid is not None:
                 self.uuid = uuid
         set_uuid(self)
@@ -353,9 +364,16 @@ class InstanceBaseClass(object):
         """Return a python object representation of this instance's XML."""
         self._set_parser()
 
-        instance_dict = self._parser.get_flat_dict_with_attributes() if flat \
-            else self._parser.to_dict()
-        return self.numeric_converter(instance_dict)
+        if not flat:
+            return self.numeric_converter(self._parser.to_dict())
+
+        # the flat dict is used by the geometry, json and duration of an
+        # instance, convert it once and hand out copies
+        if force_new or not hasattr(self, '_flat_dict'):
+            self._flat_dict = self.numeric_converter(
+                self._parser.get_flat_dict_with_attributes())
+
+        return self._flat_dict.copy()
 
     def get_notes(self):
         return [{"id": note.id,
@@ -393,8 +411,10 @@ class Instance(models.Model, InstanceBaseClass):
     xform = models.ForeignKey(XForm, null=False, related_name='instances')
     survey_type = models.ForeignKey(SurveyType)
 
-    # shows when we first received this instance
-    date_created = models.DateTimeField(auto_now_add=True)
+    # shows when we first received this instance, it can be set before the
+    # first save when the submission carries its own submission date
+    date_created = models.DateTimeField(default=submission_time,
+                                        editable=False)
 
     # this will end up representing "date last parsed"
     date_modified = models.DateTimeField(auto_now=True)
@@ -447,11 +467,11 @@ class Instance(models.Model, InstanceBaseClass):
 
         self._check_active(force)
 
-        self._set_geom()
-        self._set_json()
-        self._set_survey_type()
         self._set_uuid()
+        self._set_survey_type()
         self.version = self.xform.version
+        self._set_geom()
+        self._set_json()
         super(Instance, self).save(*args, **kwargs)
 
     def set_deleted(self, deleted_at=timezone.now()):
@@ -463,19 +483,37 @@ class Instance(models.Model, InstanceBaseClass):
 
 
 def post_save_submission(sender, instance=None, created=False, **kwargs):
+    # the json is only incomplete when the instance had no primary key
+    # before it was saved, save_submission reserves one so it is complete
+    has_full_json = instance.json.get(ID) == instance.pk
+
     if ASYNC_POST_SUBMISSION_PROCESSING_ENABLED:
         update_xform_submission_count.apply_async(args=[instance.pk, created])
-        save_full_json.apply_async(args=[instance.pk, created])
+        if not has_full_json:
+            save_full_json.apply_async(args=[instance.pk, created])
         update_project_date_modified.apply_async(args=[instance.pk, created])
     else:
         update_xform_submission_count(instance.pk, created)
-        save_full_json(instance.pk, created)
+        if created and not has_full_json:
+            # reuse the in-memory instance and its parsed xml
+            _save_full_json(instance)
         update_project_date_modified(instance.pk, created)
 
 
+def update_xform_data_version(sender, instance=None, **kwargs):
+    # every added, edited or deleted submission changes the form's data
+    XFormDataVersion.bump(instance.xform_id)
+
+
 post_save.connect(post_save_submission, sender=Instance,
                   dispatch_uid='post_save_submission')
 
+post_save.connect(update_xform_data_version, sender=Instance,
+                  dispatch_uid='update_xform_data_version')
+
+post_delete.connect(update_xform_data_version, sender=Instance,
+                    dispatch_uid='update_xform_data_version_delete')
+
 post_delete.connect(update_xform_submission_count_delete, sender=Instance,
                     dispatch_uid='update_xform_submission_count_delete')
 
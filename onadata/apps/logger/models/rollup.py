@@ -0,0 +1,310 @@
+from collections import Counter
+
+from django.db import DatabaseError, connection, models, transaction
+from django.db.models import F
+from django.db.models.signals import post_save, pre_delete, pre_save
+
+from onadata.apps.logger.models.instance import Instance
+from onadata.apps.logger.models.xform import XForm
+from onadata.libs.utils.common_tags import DURATION, SUBMISSION_TIME, \
+    SUBMITTED_BY
+
+# metadata fields that are rolled up like the questions of a form
+ROLLUP_METADATA_FIELDS = [SUBMISSION_TIME, SUBMITTED_BY, DURATION]
+
+DATE_VALUE_SQL = u"to_char(to_date(json->>%s, 'YYYY-MM-DD'), 'YYYY-MM-DD')"
+VALUE_SQL = u"json->>%s"
+
+
+def _is_rollup_field(xform, field):
+    return field in ROLLUP_METADATA_FIELDS or field in xform.schema.xpaths
+
+
+class XFormRollup(models.Model):
+    """
+    The number of submissions of a form per value of a field, or per pair of
+    values of a field and a group by field, kept up to date as submissions
+    are added, edited and deleted so that charts and stats do not have to
+    group all the submissions of a form. Date fields are counted per day.
+    """
+    xform = models.ForeignKey(XForm, related_name='rollups')
+    field = models.CharField(max_length=255)
+    group_by = models.CharField(max_length=255, default='', blank=True)
+
+    date_created = models.DateTimeField(auto_now_add=True)
+    # False while the form's submissions are being counted
+    counted = models.BooleanField(default=True)
+    # the snapshot the submissions were counted in
+    snapshot = models.TextField(null=True)
+
+    class Meta:
+        app_label = 'logger'
+        unique_together = ('xform', 'field', 'group_by')
+
+    @classmethod
+    def get_rollup(cls, xform, field, group_by=None):
+        """
+        Return the rollup of a form's field grouped by group_by, the rollup
+        is created from the form's submissions the first time it is used.
+        Returns None for fields that are not in the form and while the
+        rollup's submissions are being counted.
+        """
+        group_by = group_by or ''
+        if not _is_rollup_field(xform, field) or \
+                (group_by and not _is_rollup_field(xform, group_by)):
+            return None
+
+        rollups = cls.objects.filter(xform=xform, field=field,
+                                     group_by=group_by)
+        rollup = rollups.first()
+        if rollup is None:
+            with transaction.atomic():
+                # waits for the submissions being saved or deleted and holds
+                # back new changes until the rollup is committed so that the
+                # changes that are not counted see the rollup
+                list(XForm.objects.select_for_update().filter(
+                    pk=xform.pk).values_list('pk', flat=True))
+                rollup, created = cls.objects.get_or_create(
+                    xform=xform, field=field, group_by=group_by,
+                    defaults={'counted': False})
+            if created:
+                rollup._count_submissions()
+
+        if not rollup.counted:
+            return None
+        if rollup.snapshot:
+            rollup._apply_changes()
+
+        return rollup
+
+    @classmethod
+    def add_submissions(cls, xform, instance_ids):
+        """Count new submissions that were saved without signals."""
+        for rollup in cls.objects.filter(xform=xform):
+            rollup.xform = xform
+            rollup.record(rollup._get_counts(instance_ids))
+
+    def get_sql(self):
+        """
+        The SQL expressions of a submission's value and group value in the
+        rollup, and their parameters.
+        """
+        if self.field == SUBMISSION_TIME or \
+                self.field in self.xform.schema.date_xpaths:
+            value_sql = DATE_VALUE_SQL
+        else:
+            value_sql = VALUE_SQL
+        if self.group_by:
+            return value_sql + u", " + VALUE_SQL, [self.field, self.group_by]
+
+        return value_sql + u", NULL", [self.field]
+
+    def _count_submissions(self):
+        """
+        Count the form's submissions without locking them, the changes made
+        while counting are recorded by the signals and applied to the rollup
+        when they are not in the snapshot that was counted.
+        """
+        sql, params = self.get_sql()
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                # the statements of a WITH query share one snapshot
+                cursor.execute(
+                    u"WITH snapshot AS (SELECT txid_current_snapshot() AS s), "
+                    u"counts AS (INSERT INTO logger_xformrollupcount "
+                    u"(rollup_id, value, group_value, count) "
+                    u"SELECT %s, value, group_value, COUNT(*) FROM "
+                    u"(SELECT " + sql + u" FROM logger_instance "
+                    u"WHERE xform_id = %s AND deleted_at IS NULL) "
+                    u"AS submissions (value, group_value) "
+                    u"GROUP BY value, group_value) "
+                    u"UPDATE logger_xformrollup SET counted = TRUE, "
+                    u"snapshot = (SELECT s::text FROM snapshot) "
+                    u"WHERE id = %s",
+                    [self.pk] + params + [self.xform_id, self.pk])
+        except DatabaseError:
+            # the rollup is created again the next time it is used
+            self.delete()
+            raise
+
+        self.counted = True
+
+    def _apply_changes(self):
+        """
+        Apply the changes recorded while the submissions were counted that
+        are not in the counted snapshot.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                u"DELETE FROM logger_xformrollupchange WHERE rollup_id = %s "
+                u"RETURNING value, group_value, count, "
+                u"txid_visible_in_snapshot(txid, %s::txid_snapshot)",
+                [self.pk, self.snapshot])
+            changes = cursor.fetchall()
+
+        counts = Counter()
+        for value, group_value, count, counted in changes:
+            if not counted:
+                counts[(value, group_value)] += count
+        self.add(counts)
+
+    def _get_counts(self, instance_ids):
+        sql, params = self.get_sql()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                u"SELECT value, group_value, COUNT(*) FROM "
+                u"(SELECT " + sql + u" FROM logger_instance "
+                u"WHERE id = ANY(%s) AND deleted_at IS NULL) "
+                u"AS submissions (value, group_value) "
+                u"GROUP BY value, group_value",
+                params + [list(instance_ids)])
+
+            return dict(((value, group_value), count)
+                        for value, group_value, count in cursor.fetchall())
+
+    def record(self, counts):
+        """
+        Add counts to the rollup, or record them as changes while the
+        rollup's submissions are being counted.
+        """
+        if self.counted:
+            self.add(counts)
+            return
+
+        with connection.cursor() as cursor:
+            for (value, group_value), count in counts.items():
+                if count:
+                    cursor.execute(
+                        u"INSERT INTO logger_xformrollupchange "
+                        u"(rollup_id, txid, value, group_value, count) "
+                        u"VALUES (%s, txid_current(), %s, %s, %s)",
+                        [self.pk, value, group_value, count])
+
+    def add(self, counts):
+        """Add counts, a {(value, group value): count} dict, to the rollup."""
+        for (value, group_value), count in counts.items():
+            if not count:
+                continue
+
+            rows = XFormRollupCount.objects.filter(
+                rollup=self, value=value, group_value=group_value)
+            # concurrent submissions may have added the same value twice,
+            # the rows of a value are summed up when read
+            updated = XFormRollupCount.objects.filter(
+                pk__in=rows.values('pk')[:1]).update(
+                count=F('count') + count)
+            if not updated:
+                XFormRollupCount.objects.create(
+                    rollup=self, value=value, group_value=group_value,
+                    count=count)
+
+
+class XFormRollupCount(models.Model):
+    """The number of submissions with a value in a rollup."""
+    rollup = models.ForeignKey(XFormRollup, related_name='counts')
+    value = models.TextField(null=True)
+    group_value = models.TextField(null=True)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        app_label = 'logger'
+
+
+class XFormRollupChange(models.Model):
+    """
+    A change to the counts of a rollup made by the transaction txid while the
+    rollup's submissions were being counted.
+    """
+    rollup = models.ForeignKey(XFormRollup, related_name='changes')
+    txid = models.BigIntegerField()
+    value = models.TextField(null=True)
+    group_value = models.TextField(null=True)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        app_label = 'logger'
+
+
+def _get_rollup_values(rollups, instance_id):
+    """
+    The (value, group value) pairs of a submission in each rollup, None if
+    the submission is not saved or is deleted.
+    """
+    columns = []
+    params = []
+    for rollup in rollups:
+        sql, rollup_params = rollup.get_sql()
+        columns.append(sql)
+        params.extend(rollup_params)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            u"SELECT " + u", ".join(columns) + u" FROM logger_instance "
+            u"WHERE id = %s AND deleted_at IS NULL", params + [instance_id])
+        row = cursor.fetchone()
+
+    return zip(row[::2], row[1::2]) if row else None
+
+
+def _update_rollups(rollups, old_values, new_values):
+    for i, rollup in enumerate(rollups):
+        counts = Counter()
+        if old_values:
+            counts[old_values[i]] -= 1
+        if new_values:
+            counts[new_values[i]] += 1
+        rollup.record(counts)
+
+
+def _get_submission_rollups(instance):
+    rollups = list(XFormRollup.objects.filter(xform_id=instance.xform_id))
+    for rollup in rollups:
+        rollup.xform = instance.xform
+
+    return rollups
+
+
+def _lock_submission_form(instance):
+    """
+    Hold off the creation of the form's rollups until the change to the
+    submission is committed, as the foreign key of new submissions does.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            u"SELECT 1 FROM logger_xform WHERE id = %s FOR KEY SHARE",
+            [instance.xform_id])
+
+
+def get_submission_rollup_values(sender, instance=None, **kwargs):
+    if instance.pk:
+        _lock_submission_form(instance)
+    rollups = _get_submission_rollups(instance)
+    instance._rollups = rollups
+    instance._rollup_values = _get_rollup_values(rollups, instance.pk) \
+        if rollups and instance.pk else None
+
+
+def update_submission_rollups(sender, instance=None, **kwargs):
+    rollups = instance.__dict__.pop('_rollups', [])
+    old_values = instance.__dict__.pop('_rollup_values', None)
+    if rollups:
+        _update_rollups(rollups, old_values,
+                        _get_rollup_values(rollups, instance.pk))
+
+
+def remove_submission_from_rollups(sender, instance=None, **kwargs):
+    _lock_submission_form(instance)
+    rollups = _get_submission_rollups(instance)
+    if rollups:
+        _update_rollups(rollups, _get_rollup_values(rollups, instance.pk),
+                        None)
+
+
+pre_save.connect(get_submission_rollup_values, sender=Instance,
+                 dispatch_uid='get_submission_rollup_values')
+
+post_save.connect(update_submission_rollups, sender=Instance,
+                  dispatch_uid='update_submission_rollups')
+
+pre_delete.connect(remove_submission_from_rollups, sender=Instance,
+                   dispatch_uid='remove_submission_from_rollups')
@@ -9,6 +9,8 @@ from querybuilder.fields import AvgField, CountField, SimpleField, SumField
 from onadata.apps.logger.models.xform import XForm
 from onadata.apps.logger.models.instance import Instance
 from onadata.apps.logger.models.data_view import DataView
+from onadata.apps.logger.models.rollup import XFormRollup
+from onadata.libs.data.query import _alias, is_date_field, query_rollup
 from onadata.libs.utils.model_tools import generate_uuid_for_form
 from onadata.libs.utils.chart_tools import DATA_TYPE_MAP, get_field_label,\
     _flatten_multiple_dict_into_one, _use_labels_from_group_by_name,\
@@ -84,6 +86,71 @@ class Widget(OrderedModel):
             field_xpath = field.get_abbreviated_xpath()
             field_label = get_field_label(field)
 
+        rollup = cls._get_rollup(xform, column, group_by, field_type)
+        if rollup is not None:
+            records = cls._query_rollup(rollup, column, group_by, field_type)
+        else:
+            records = cls._query_submissions(xform, column, group_by,
+                                             field_type)
+
+        # flatten multiple dict if select one with group by
+        if field_type == SELECT_ONE and group_by:
+            records = _flatten_multiple_dict_into_one(column, group_by,
+                                                      records)
+        # use labels if group by
+        if group_by:
+            group_by_field = get_field_from_field_xpath(group_by, xform)
+            choices = get_field_choices(group_by, xform)
+            records = _use_labels_from_group_by_name(group_by, group_by_field,
+                                                     data_type, records,
+                                                     choices=choices)
+        return {
+            "field_type": field_type,
+            "data_type": data_type,
+            "field_xpath": field_xpath,
+            "field_label": field_label,
+            "grouped_by": group_by,
+            "data": records
+        }
+
+    @classmethod
+    def _get_rollup(cls, xform, column, group_by, field_type):
+        """The rollup a widget reads its data from, None if it groups the
+        submissions instead."""
+        if group_by and field_type not in NUMERIC_LIST + [SELECT_ONE]:
+            return None
+        if not group_by and is_date_field(xform, column):
+            # dates are counted per day in rollups, widgets count timestamps
+            return None
+
+        return XFormRollup.get_rollup(xform, column, group_by)
+
+    @classmethod
+    def _query_rollup(cls, rollup, column, group_by, field_type):
+        if not group_by:
+            # null values are not counted, like COUNT(column) does
+            columns = [u'value AS ' + _alias(column),
+                       u'(CASE WHEN value IS NULL THEN 0 ELSE SUM(count) END)'
+                       u'::bigint AS count']
+
+            return query_rollup(rollup, columns, u'value')
+
+        if field_type in NUMERIC_LIST:
+            columns = [u'group_value AS ' + _alias(group_by),
+                       u'SUM(value::float * count) AS sum',
+                       u'SUM(value::float * count) / NULLIF(SUM(count) '
+                       u'FILTER (WHERE value IS NOT NULL), 0) AS mean']
+
+            return query_rollup(rollup, columns, u'group_value')
+
+        columns = [u'value AS ' + _alias(column),
+                   u'group_value AS ' + _alias(group_by),
+                   u'SUM(count)::bigint AS count']
+
+        return query_rollup(rollup, columns, u'value, group_value')
+
+    @classmethod
+    def _query_submissions(cls, xform, column, group_by, field_type):
         columns = [SimpleField(field="json->>'%s'" % unicode(column),
                                alias='"{}"'.format(column)),
                    CountField(field="json->>'%s'" % unicode(column),
@@ -138,25 +205,4 @@ class Widget(OrderedModel):
                 where(xform_id=xform.pk, deleted_at=None)
             query.group_by("json->>'%s'" % unicode(column))
 
-        # run query
-        records = query.select()
-
-        # flatten multiple dict if select one with group by
-        if field_type == SELECT_ONE and group_by:
-            records = _flatten_multiple_dict_into_one(column, group_by,
-                                                      records)
-        # use labels if group by
-        if group_by:
-            group_by_field = get_field_from_field_xpath(group_by, xform)
-            choices = get_field_choices(group_by, xform)
-            records = _use_labels_from_group_by_name(group_by, group_by_field,
-                                                     data_type, records,
-                                                     choices=choices)
-        return {
-            "field_type": field_type,
-            "data_type": data_type,
-            "field_xpath": field_xpath,
-            "field_label": field_label,
-            "grouped_by": group_by,
-            "data": records
-        }
+        return query.select()
@@ -19,7 +19,6 @@ from django.utils.translation import ugettext_lazy, ugettext as _
 from guardian.models import UserObjectPermissionBase
 from guardian.models import GroupObjectPermissionBase
 
-from pyxform import constants
 from pyxform import SurveyElementBuilder
 from pyxform.question import Question
 from pyxform.section import RepeatingSection
@@ -28,6 +27,7 @@ from pyxform.xform2json import create_survey_element_from_xml
 from taggit.managers import TaggableManager
 from xml.dom import Node
 
+from onadata.apps.logger.form_schema import FormSchema, form_schema_cache
 from onadata.apps.logger.xform_instance_parser import XLSFormError
 from onadata.apps.logger.xform_instance_parser import clean_and_parse_xml
 from onadata.apps.main.models import MetaData
@@ -39,7 +39,7 @@ from onadata.libs.utils.cache_tools import (
     PROJ_SUB_DATE_CACHE,
     safe_delete)
 from onadata.libs.utils.common_tags import UUID, SUBMISSION_TIME, TAGS, NOTES,\
-    VERSION, DURATION, SUBMITTED_BY, KNOWN_MEDIA_TYPES
+    VERSION, DURATION, SUBMITTED_BY
 from onadata.libs.utils.model_tools import queryset_iterator
 
 
@@ -270,21 +270,50 @@ class XFormMixin(object):
 
         return id_string
 
+    def _build_survey(self):
+        try:
+            builder = SurveyElementBuilder()
+            return builder.create_survey_element_from_json(self.json)
+        except ValueError:
+            xml = bytes(bytearray(self.xml, encoding='utf-8'))
+            return create_survey_element_from_xml(xml)
+
     def get_survey(self):
         if not hasattr(self, "_survey"):
-            try:
-                builder = SurveyElementBuilder()
-                self._survey = \
-                    builder.create_survey_element_from_json(self.json)
-            except ValueError:
-                xml = bytes(bytearray(self.xml, encoding='utf-8'))
-                self._survey = create_survey_element_from_xml(xml)
+            self._survey = self.schema.survey
         return self._survey
 
     survey = property(get_survey)
 
+    def get_schema(self):
+        """Return the compiled FormSchema of this form, saved forms share
+        theirs through the per process form schema cache.
+        """
+        if not hasattr(self, "_schema"):
+            if hasattr(self, "_survey"):
+                self._schema = FormSchema(self._survey)
+            else:
+                self._schema_hash = self.hash
+                if self.pk:
+                    self._schema = form_schema_cache.get(
+                        (self.pk, self._schema_hash),
+                        lambda: FormSchema(self._build_survey()))
+                else:
+                    self._schema = FormSchema(self._build_survey())
+        return self._schema
+
+    schema = property(get_schema)
+
+    def _clear_schema(self):
+        """Drop the compiled schema if the form changed since it was built."""
+        if getattr(self, '_schema_hash', self.hash) != self.hash:
+            for attr in ['_survey', '_schema', '_schema_hash',
+                         '_default_language', '_xpaths']:
+                if hasattr(self, attr):
+                    delattr(self, attr)
+
     def get_survey_elements(self):
-        return self.survey.iter_descendants()
+        return iter(self.schema.elements)
 
     def get_survey_element(self, name_or_xpath):
         """Searches survey element by xpath first,
@@ -325,10 +354,12 @@ class XFormMixin(object):
         return flatten(element)
 
     def get_choice_label(self, field, choice_value, lang='English'):
-        choices = [choice for choice in field.children
-                   if choice.name == choice_value]
-        if len(choices):
-            choice = choices[0]
+        choices = self.schema.choices.get(field.get_abbreviated_xpath())
+        if choices is None:
+            choices = dict((choice.name, choice)
+                           for choice in reversed(field.children))
+        choice = choices.get(choice_value)
+        if choice is not None:
             label = choice.label
 
             if isinstance(label, dict):
@@ -358,10 +389,7 @@ class XFormMixin(object):
         ]
 
     def geopoint_xpaths(self):
-        survey_elements = self.get_survey_elements()
-
-        return [e.get_abbreviated_xpath() for e in survey_elements
-                if e.bind.get(u'type') == u'geopoint']
+        return list(self.schema.geopoint_xpaths)
 
     def xpath_of_first_geopoint(self):
         geo_xpaths = self.geopoint_xpaths()
@@ -448,21 +476,15 @@ class XFormMixin(object):
         return [remove_first_index(header) for header in self.get_headers()]
 
     def get_element(self, abbreviated_xpath):
-        if not hasattr(self, "_survey_elements"):
-            self._survey_elements = {}
-            for e in self.get_survey_elements():
-                self._survey_elements[e.get_abbreviated_xpath()] = e
-
         def remove_all_indices(xpath):
             return re.sub(r"\[\d+\]", u"", xpath)
 
         clean_xpath = remove_all_indices(abbreviated_xpath)
-        return self._survey_elements.get(clean_xpath)
+        return self.schema.element_by_xpath.get(clean_xpath)
 
     def get_default_language(self):
         if not hasattr(self, '_default_language'):
-            self._default_language = \
-                self.survey.to_json_dict().get('default_language')
+            self._default_language = self.schema.default_language
 
         return self._default_language
 
@@ -492,8 +514,7 @@ class XFormMixin(object):
 
     def get_xpath_cmp(self):
         if not hasattr(self, "_xpaths"):
-            self._xpaths = [e.get_abbreviated_xpath()
-                            for e in self.survey_elements]
+            self._xpaths = self.schema.xpaths
 
         def xpath_cmp(x, y):
             # For the moment, we aren't going to worry about repeating
@@ -580,30 +601,16 @@ class XFormMixin(object):
             self.has_start_time = False
 
     def get_survey_elements_of_type(self, element_type):
-        return [e for e in self.get_survey_elements()
-                if e.type == element_type]
-
-    def get_survey_elements_with_choices(self):
-        if not hasattr(self, '_survey_elements_with_choices'):
-            choices_type = [
-                constants.SELECT_ONE,
-                constants.SELECT_ALL_THAT_APPLY
-            ]
+        return self.schema.get_elements_of_type(element_type)
 
-            self._survey_elements_with_choices = [
-                e for e in self.get_survey_elements() if e.type in choices_type
-            ]
+    def get_survey_xpaths_of_type(self, *element_types):
+        return self.schema.get_xpaths_of_type(*element_types)
 
-        return self._survey_elements_with_choices
+    def get_survey_elements_with_choices(self):
+        return self.schema.elements_with_choices
 
     def get_media_survey_xpaths(self):
-        return [
-            e.get_abbreviated_xpath() for e in sum(
-                [self.get_survey_elements_of_type(m)
-                 for m in KNOWN_MEDIA_TYPES],
-                []
-            )
-        ]
+        return list(self.schema.media_xpaths)
 
     def _check_version_set(self, survey):
         """
@@ -799,6 +806,10 @@ class XForm(XFormMixin, BaseModel):
 
         super(XForm, self).save(*args, **kwargs)
 
+        # a replaced form has a new hash, drop schemas of its old versions
+        self._clear_schema()
+        form_schema_cache.invalidate(self.pk, self.hash)
+
     def __unicode__(self):
         return getattr(self, "id_string", "")
 
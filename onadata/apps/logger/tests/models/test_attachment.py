@@ -2,9 +2,10 @@ from datetime import datetime
 import os
 
 from django.core.files.base import File
-from django.core.files.storage import default_storage
+from django.core.files.storage import FileSystemStorage, default_storage
 from django.core.management import call_command
 from django.db.utils import DataError
+from mock import patch
 
 from onadata.apps.main.tests.test_base import TestBase
 from onadata.apps.logger.models import Attachment, Instance
@@ -76,6 +77,38 @@ class TestAttachment(TestBase):
                     default_storage.exists(thumbnail))
                 default_storage.delete(thumbnail)
 
+    def test_thumbnail_sizes_are_recorded(self):
+        image_url(self.attachment, 'small')
+        self.attachment.refresh_from_db()
+        self.assertEqual(self.attachment.thumbnails,
+                         ['large', 'medium', 'small'])
+
+        # the urls of recorded thumbnails need no storage calls
+        with patch.object(FileSystemStorage, 'exists') as mock_exists:
+            url = image_url(self.attachment, 'medium')
+        self.assertFalse(mock_exists.called)
+        self.assertTrue(url.endswith(
+            self.attachment.media_file.name.replace('.jpg', '-medium.jpg')))
+
+    def test_submission_thumbnails_are_created(self):
+        self._submit_transport_instance_w_attachment(survey_at=1)
+        attachment = Attachment.objects.get(
+            instance=self.xform.instances.latest('pk'))
+        self.assertEqual(attachment.thumbnails, ['large', 'medium', 'small'])
+
+    @patch('onadata.libs.utils.image_tools.create_attachment_thumbnails_async'
+           '.apply_async')
+    def test_thumbnails_dispatch_errors_keep_the_submission(self,
+                                                             apply_async):
+        apply_async.side_effect = IOError('broker unreachable')
+        self._submit_transport_instance_w_attachment(survey_at=1)
+
+        self.assertEqual(self.response.status_code, 201)
+        self.assertTrue(apply_async.called)
+        attachment = Attachment.objects.get(
+            instance=self.xform.instances.latest('pk'))
+        self.assertEqual(attachment.thumbnails, [])
+
     def test_create_thumbnails_command(self):
         call_command("create_image_thumbnails")
         for attachment in Attachment.objects.filter(instance=self.instance):
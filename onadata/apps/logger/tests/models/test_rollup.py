@@ -0,0 +1,148 @@
+import threading
+from collections import Counter
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from onadata.apps.logger.models import XFormRollup
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.libs.data.query import _execute_query, _postgres_count_group,\
+    get_form_submissions_grouped_by_field,\
+    get_form_submissions_grouped_by_select_one
+
+TRANSPORT_TYPES = \
+    'transport/available_transportation_types_to_referral_facility'
+
+
+class TestXFormRollup(TestBase):
+
+    def setUp(self):
+        super(TestXFormRollup, self).setUp()
+        self._publish_transportation_form()
+        self._make_submissions()
+
+    def _get_expected_counts(self, field, group_by):
+        counts = Counter()
+        for instance in self.xform.instances.filter(deleted_at=None):
+            counts[(instance.json.get(field),
+                    instance.json.get(group_by))] += 1
+
+        return counts
+
+    def _get_counts(self, rollup):
+        counts = Counter()
+        for count in rollup.counts.all():
+            counts[(count.value, count.group_value)] += count.count
+
+        # drop the values no submission has anymore
+        return +counts
+
+    def _assert_counts(self, rollup):
+        self.assertEqual(
+            self._get_counts(rollup),
+            self._get_expected_counts(TRANSPORT_TYPES, '_submitted_by'))
+
+    def test_rollup_follows_submissions(self):
+        rollup = XFormRollup.get_rollup(
+            self.xform, TRANSPORT_TYPES, '_submitted_by')
+        self._assert_counts(rollup)
+
+        # edit
+        instance = self.xform.instances.get(
+            json__contains={TRANSPORT_TYPES: 'ambulance bicycle'})
+        instance.xml = instance.xml.replace('ambulance bicycle', 'taxi')
+        instance.save()
+        self._assert_counts(rollup)
+
+        # soft delete, delete and a new submission
+        self.xform.instances.exclude(pk=instance.pk)[0].set_deleted()
+        instance.delete()
+        self._submit_transport_instance()
+        self._assert_counts(rollup)
+
+        self.assertEqual(XFormRollup.get_rollup(
+            self.xform, TRANSPORT_TYPES, '_submitted_by'), rollup)
+
+    def test_queries_read_rollups(self):
+        expected = _execute_query(_postgres_count_group(
+            '_submission_time', '_submission_time', self.xform))
+        self.assertIsNone(XFormRollup.get_rollup(self.xform, '_unknown'))
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(sorted(get_form_submissions_grouped_by_field(
+                self.xform, '_submission_time')), sorted(expected))
+            # once the rollups exist submissions are not read
+            get_form_submissions_grouped_by_field(
+                self.xform, '_submission_time')
+            self.assertEqual(
+                get_form_submissions_grouped_by_select_one(
+                    self.xform, TRANSPORT_TYPES, '_submitted_by', 'types'),
+                get_form_submissions_grouped_by_select_one(
+                    self.xform, TRANSPORT_TYPES, '_submitted_by', 'types'))
+
+        self.assertEqual(
+            len([q for q in context.captured_queries
+                 if '"logger_instance"' in q['sql'] or
+                 'FROM logger_instance' in q['sql']]), 2)
+
+    def _edit_submission(self, old_value, new_value):
+        instance = self.xform.instances.get(
+            json__contains={TRANSPORT_TYPES: old_value})
+        instance.xml = instance.xml.replace(old_value, new_value)
+        instance.save()
+
+    def test_changes_made_while_counting(self):
+        rollup = XFormRollup.get_rollup(
+            self.xform, TRANSPORT_TYPES, '_submitted_by')
+        counts = self._get_counts(rollup)
+
+        # submissions edited while the rollup is counted are recorded
+        XFormRollup.objects.filter(pk=rollup.pk).update(counted=False)
+        self.assertIsNone(XFormRollup.get_rollup(
+            self.xform, TRANSPORT_TYPES, '_submitted_by'))
+        self._edit_submission('ambulance bicycle', 'taxi')
+        self.assertEqual(self._get_counts(rollup), counts)
+        self.assertEqual(rollup.changes.count(), 2)
+
+        # changes in the counted snapshot are dropped
+        with connection.cursor() as cursor:
+            cursor.execute(u"SELECT txid_current() + 1")
+            xmax = cursor.fetchone()[0]
+        XFormRollup.objects.filter(pk=rollup.pk).update(
+            counted=True, snapshot='%d:%d:' % (xmax, xmax))
+        XFormRollup.get_rollup(self.xform, TRANSPORT_TYPES, '_submitted_by')
+        self.assertEqual(self._get_counts(rollup), counts)
+        self.assertFalse(rollup.changes.exists())
+
+        # and the others are added to the rollup
+        XFormRollup.objects.filter(pk=rollup.pk).update(counted=False)
+        self._edit_submission('none', 'bicycle')
+        for change in rollup.changes.all():
+            counts[(change.value, change.group_value)] += change.count
+        XFormRollup.objects.filter(pk=rollup.pk).update(
+            counted=True, snapshot='1:1:')
+        XFormRollup.get_rollup(self.xform, TRANSPORT_TYPES, '_submitted_by')
+        self.assertEqual(self._get_counts(rollup), +counts)
+        self.assertFalse(rollup.changes.exists())
+
+    def test_edit_made_while_a_rollup_is_created(self):
+        rollups = []
+
+        def get_rollup():
+            try:
+                rollups.append(XFormRollup.get_rollup(
+                    self.xform, TRANSPORT_TYPES, '_submitted_by'))
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            # the edit loads the form's rollups before the rollup exists
+            self._edit_submission('ambulance bicycle', 'taxi')
+            thread = threading.Thread(target=get_rollup)
+            thread.start()
+            # the rollup waits for the edit to be committed
+            thread.join(1)
+            self.assertTrue(thread.is_alive())
+
+        thread.join()
+        self._assert_counts(rollups[0])
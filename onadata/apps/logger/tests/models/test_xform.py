@@ -1,8 +1,11 @@
+import json
 import os
 
+from mock import patch
 from pyxform.tests_v1.pyxform_test_case import PyxformTestCase
 
 from onadata.apps.main.tests.test_base import TestBase
+from onadata.apps.logger.form_schema import form_schema_cache
 from onadata.apps.logger.models import XForm, Instance
 
 
@@ -114,3 +117,39 @@ class TestXForm(PyxformTestCase, TestBase):
 
         fruitb_o = xform.get_survey_element("b/fruitb/orange")
         self.assertEqual(fruitb_o.get_abbreviated_xpath(), "b/fruitb/orange")
+
+    def test_survey_schema_is_shared_between_form_objects(self):
+        self._publish_transportation_form()
+        form_schema_cache.clear()
+
+        with patch.object(XForm, '_build_survey', autospec=True,
+                          side_effect=XForm._build_survey) as mock_build:
+            xform = XForm.objects.get(pk=self.xform.pk)
+            other = XForm.objects.get(pk=self.xform.pk)
+
+            self.assertIs(xform.survey, other.survey)
+            self.assertEqual(xform.geopoint_xpaths(), [])
+            self.assertEqual(
+                [e.get_abbreviated_xpath() for e in
+                 other.get_survey_elements_of_type('integer')],
+                other.get_survey_xpaths_of_type('integer'))
+            self.assertEqual(mock_build.call_count, 1)
+
+    def test_survey_schema_invalidated_when_form_changes(self):
+        self._publish_transportation_form()
+        xform = XForm.objects.get(pk=self.xform.pk)
+        survey = xform.survey
+        old_hash = xform.hash
+
+        form_json = json.loads(xform.json)
+        form_json['children'].append(
+            {'type': 'text', 'name': 'new_question', 'label': 'New'})
+        xform.json = json.dumps(form_json)
+        xform.xml = xform.xml.replace(u'</h:head>', u' </h:head>')
+        xform.save()
+
+        self.assertIsNot(xform.survey, survey)
+        self.assertIsNotNone(xform.get_element('new_question'))
+        self.assertNotIn((xform.pk, old_hash), form_schema_cache._schemas)
+        self.assertIsNotNone(
+            XForm.objects.get(pk=xform.pk).get_element('new_question'))
@@ -0,0 +1,131 @@
+# vim: ai ts=4 sts=4 et sw=4 fileencoding=utf-8
+import os
+import re
+import time
+from unittest import skipUnless
+
+from django.test.utils import override_settings
+
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.apps.logger.xform_instance_parser import (
+    InstanceMultipleNodeError,
+    LXML_BACKEND,
+    MINIDOM_BACKEND,
+    SubmissionXML,
+    XFormInstanceParser)
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "fixtures")
+
+
+def _parse(xml, xform, backend):
+    with override_settings(XFORM_INSTANCE_PARSER_BACKEND=backend):
+        submission_xml = SubmissionXML(xml)
+        parser = XFormInstanceParser(submission_xml, xform)
+
+        return {
+            'dict': parser.to_dict(),
+            'flat_dict': parser.to_flat_dict(),
+            'attributes': parser.get_attributes(),
+            'root_node_name': parser.get_root_node_name(),
+            'uuid': submission_xml.uuid,
+            'deprecated_uuid': submission_xml.deprecated_uuid,
+            'id_string': submission_xml.id_string,
+            'submission_date': submission_xml.submission_date,
+        }
+
+
+class TestParserBackends(TestBase):
+    """
+    The lxml parser backend should give the same results as the minidom one.
+    """
+
+    def _publish_fixture_form(self, *path):
+        self._publish_xls_file_and_set_xform(os.path.join(FIXTURES_DIR, *path))
+
+    def _read_fixture(self, *path):
+        with open(os.path.join(FIXTURES_DIR, *path)) as xml_file:
+            return xml_file.read()
+
+    def _assert_parity(self, xml):
+        expected = _parse(xml, self.xform, MINIDOM_BACKEND)
+        result = _parse(xml, self.xform, LXML_BACKEND)
+        self.assertEqual(result, expected)
+
+        return result
+
+    def test_parity_with_repeats(self):
+        self._publish_fixture_form("new_repeats", "new_repeats.xls")
+        result = self._assert_parity(self._read_fixture(
+            "new_repeats", "instances", "new_repeats_2012-07-05-14-33-53.xml"))
+        self.assertEqual(result['flat_dict']['kids/kids_details'], [{
+            u'kids/kids_details/kids_name': u'Abel',
+            u'kids/kids_details/kids_age': u'50'
+        }])
+
+    def test_parity_with_meta_and_edits(self):
+        self._publish_fixture_form("tutorial", "tutorial.xls")
+        for name in ["tutorial_2012-06-27_11-27-53.xml",
+                     "tutorial_2012-06-27_11-27-53_w_uuid.xml",
+                     "tutorial_2012-06-27_11-27-53_w_uuid_edited.xml"]:
+            self._assert_parity(
+                self._read_fixture("tutorial", "instances", name))
+
+    def test_parity_with_encrypted_media(self):
+        self._publish_fixture_form(
+            "tutorial_encrypted", "tutorial_encrypted.xls")
+        result = self._assert_parity(self._read_fixture(
+            "tutorial_encrypted", "instances", "tutorial_encrypted.xml"))
+        self.assertEqual(result['flat_dict']['media'],
+                         [{u'media/file': u'1483528430996.jpg.enc'},
+                          {u'media/file': u'1483528445767.jpg.enc'}])
+
+    def test_parity_with_namespaces_comments_and_cdata(self):
+        self._publish_fixture_form("new_repeats", "new_repeats.xls")
+        xml = (
+            u'<?xml version="1.0"?><new_repeats id="new_repeat" '
+            u'xmlns:jr="http://openrosa.org/javarosa" '
+            u'xmlns:orx="http://openrosa.org/xforms" jr:version="1">'
+            u'<info><name> Adam </name><age>  </age></info>'
+            u'<kids><has_kids><!-- none --></has_kids>'
+            u'<kids_details><kids_name><![CDATA[Abel]]></kids_name>'
+            u'</kids_details><kids_details><kids_name>Cain</kids_name>'
+            u'</kids_details></kids>'
+            u'<web_browsers xml:lang="en">chrome é</web_browsers>'
+            u'<orx:meta><orx:instanceID>uuid:729f173c</orx:instanceID>'
+            u'</orx:meta></new_repeats>')
+        result = self._assert_parity(xml)
+        self.assertEqual(result['uuid'], u'729f173c')
+        self.assertEqual(result['attributes']['jr:version'], u'1')
+
+    def test_multiple_nodes_error(self):
+        self._publish_fixture_form("new_repeats", "new_repeats.xls")
+        xml = self._read_fixture(
+            "new_repeats", "instances", "multiple_nodes_error.xml")
+        for backend in [MINIDOM_BACKEND, LXML_BACKEND]:
+            with self.assertRaises(InstanceMultipleNodeError):
+                _parse(xml, self.xform, backend)
+
+    @skipUnless(os.environ.get('ONADATA_BENCHMARKS'),
+                'set ONADATA_BENCHMARKS to run benchmarks')
+    def test_benchmark_large_repeat_submission(self):
+        self._publish_fixture_form("new_repeats", "new_repeats.xls")
+        xml = self._read_fixture(
+            "new_repeats", "instances", "new_repeats_2012-07-05-14-33-53.xml")
+        details = re.search(
+            r"<kids_details>.*</kids_details>", xml, re.DOTALL).group(0)
+        rows = 1500
+        xml = xml.replace(details, details * rows)
+
+        timings = {}
+        for backend in [MINIDOM_BACKEND, LXML_BACKEND]:
+            start = time.time()
+            result = _parse(xml, self.xform, backend)
+            timings[backend] = time.time() - start
+            self.assertEqual(
+                len(result['flat_dict']['kids/kids_details']), rows)
+
+        self.assertLess(timings[LXML_BACKEND], timings[MINIDOM_BACKEND])
+        print "Parsed %d repeats, minidom: %.3fs, lxml: %.3fs" % (
+            rows, timings[MINIDOM_BACKEND], timings[LXML_BACKEND])
+        self._assert_parity(xml)
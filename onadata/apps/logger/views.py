@@ -128,7 +128,8 @@ def bulksubmission(request, username):
 
     with open(our_tfpath, 'rb') as f:
         total_count, success_count, errors = import_instances_from_zip(
-            f, posting_user)
+            f, posting_user,
+            batch_size=getattr(settings, 'BULK_SUBMISSION_BATCH_SIZE', None))
     # chose the try approach as suggested by the link below
     # http://stackoverflow.com/questions/82831
     try:
@@ -1,12 +1,24 @@
 import re
-import dateutil.parser
+from io import BytesIO
 from xml.dom import minidom, Node
+
+import dateutil.parser
+from django.conf import settings
 from django.utils.encoding import smart_unicode, smart_str
 from django.utils.translation import ugettext as _
+from lxml import etree
 
 from onadata.libs.utils.common_tags import XFORM_ID_STRING
 
 
+MINIDOM_BACKEND = u'minidom'
+LXML_BACKEND = u'lxml'
+# the whitespace clean_and_parse_xml strips from between tags
+XML_WHITESPACE = ' \t\n\r\f\v'
+XML_NAMESPACE = 'http://www.w3.org/XML/1998/namespace'
+LXML_EVENTS = ('start', 'end', 'start-ns')
+
+
 class XLSFormError(Exception):
     pass
 
@@ -52,7 +64,7 @@ class NonUniqueFormIdError(Exception):
 
 
 def get_meta_from_xml(xml_str, meta_name):
-    xml = clean_and_parse_xml(xml_str)
+    xml = get_xml_obj(xml_str)
     children = xml.childNodes
     # children ideally contains a single element
     # that is the parent of all survey elements
@@ -86,12 +98,12 @@ def get_uuid_from_xml(xml):
         if matches and len(matches.groups()) > 0:
             return matches.groups()[0]
         return None
+    xml = get_xml_obj(xml)
     uuid = get_meta_from_xml(xml, "instanceID")
     regex = re.compile(r"uuid:(.*)")
     if uuid:
         return _uuid_only(uuid, regex)
     # check in survey_node attributes
-    xml = clean_and_parse_xml(xml)
     children = xml.childNodes
     # children ideally contains a single element
     # that is the parent of all survey elements
@@ -106,7 +118,7 @@ def get_uuid_from_xml(xml):
 
 def get_submission_date_from_xml(xml):
     # check in survey_node attributes
-    xml = clean_and_parse_xml(xml)
+    xml = get_xml_obj(xml)
     children = xml.childNodes
     # children ideally contains a single element
     # that is the parent of all survey elements
@@ -136,6 +148,183 @@ def clean_and_parse_xml(xml_string):
     return xml_obj
 
 
+def clean_and_parse_lxml(xml_string):
+    """Parse xml_string into an lxml root element."""
+    clean_xml_str = smart_str(smart_unicode(xml_string.strip()))
+    parser = etree.XMLParser(resolve_entities=False)
+
+    return etree.fromstring(clean_xml_str, parser=parser)
+
+
+def get_parser_backend():
+    return getattr(settings, 'XFORM_INSTANCE_PARSER_BACKEND', MINIDOM_BACKEND)
+
+
+def get_xml_obj(xml):
+    """
+    Return the parsed document for ``xml`` which may be an XML string, an
+    already parsed document or a ``SubmissionXML`` object.
+    """
+    if isinstance(xml, SubmissionXML):
+        return xml.xml_obj
+    if isinstance(xml, minidom.Document):
+        return xml
+
+    return clean_and_parse_xml(xml)
+
+
+def get_id_string_from_xml(xml):
+    xml_obj = get_xml_obj(xml)
+    root_node = xml_obj.documentElement
+    id_string = root_node.getAttribute(u"id")
+
+    if len(id_string) == 0:
+        # may be hidden in submission/data/id_string
+        elems = root_node.getElementsByTagName('data')
+
+        for data in elems:
+            for child in data.childNodes:
+                id_string = data.childNodes[0].getAttribute('id')
+
+                if len(id_string) > 0:
+                    break
+
+            if len(id_string) > 0:
+                break
+
+    return id_string
+
+
+def _lxml_node_name(elem):
+    """Return the node name of an lxml element as minidom would."""
+    tag = elem.tag
+    if tag[0] == '{':
+        tag = tag.split('}', 1)[1]
+    if elem.prefix:
+        tag = u'%s:%s' % (elem.prefix, tag)
+
+    return unicode(tag)
+
+
+def _lxml_child_elements(elem):
+    return [n for n in elem if isinstance(n.tag, basestring)]
+
+
+def _uuid_from_meta(uuid):
+    matches = re.match(r"uuid:(.*)", uuid)
+    if matches and len(matches.groups()) > 0:
+        return matches.groups()[0]
+    return None
+
+
+def _get_meta_from_lxml(root, meta_name):
+    meta_tags = [n for n in _lxml_child_elements(root)
+                 if _lxml_node_name(n).lower() in (u"meta", u"orx:meta")]
+    if len(meta_tags) == 0:
+        return None
+
+    names = (meta_name.lower(), u'orx:%s' % meta_name.lower())
+    uuid_tags = [n for n in _lxml_child_elements(meta_tags[0])
+                 if _lxml_node_name(n).lower() in names]
+    if len(uuid_tags) == 0:
+        return None
+
+    text = uuid_tags[0].text
+    return unicode(text).strip() if text and text.strip(XML_WHITESPACE) \
+        else None
+
+
+def _get_id_string_from_lxml(root):
+    id_string = unicode(root.get(u"id", u""))
+
+    if len(id_string) == 0:
+        # may be hidden in submission/data/id_string
+        for data in root.iterdescendants():
+            if not isinstance(data.tag, basestring) or \
+                    _lxml_node_name(data) != u'data' or len(data) == 0:
+                continue
+            id_string = unicode(data[0].get(u'id', u''))
+
+            if len(id_string) > 0:
+                break
+
+    return id_string
+
+
+class SubmissionXML(object):
+    """
+    A submission's XML parsed once and shared by everything that needs to
+    read it while the submission is being processed.
+    """
+
+    def __init__(self, xml_str):
+        self.xml = xml_str
+        self.lxml_root = None
+        self._xml_obj = None
+        self._parsers = {}
+
+        if get_parser_backend() == LXML_BACKEND:
+            self.lxml_root = clean_and_parse_lxml(xml_str)
+        else:
+            self._xml_obj = clean_and_parse_xml(xml_str)
+
+    @property
+    def xml_obj(self):
+        if self._xml_obj is None:
+            self._xml_obj = clean_and_parse_xml(self.xml)
+        return self._xml_obj
+
+    @property
+    def id_string(self):
+        if not hasattr(self, '_id_string'):
+            if self.lxml_root is not None:
+                self._id_string = _get_id_string_from_lxml(self.lxml_root)
+            else:
+                self._id_string = get_id_string_from_xml(self)
+        return self._id_string
+
+    @property
+    def uuid(self):
+        if not hasattr(self, '_uuid'):
+            if self.lxml_root is not None:
+                uuid = _get_meta_from_lxml(self.lxml_root, "instanceID") or \
+                    self.lxml_root.get('instanceID')
+                self._uuid = _uuid_from_meta(uuid) if uuid else None
+            else:
+                self._uuid = get_uuid_from_xml(self)
+        return self._uuid
+
+    @property
+    def deprecated_uuid(self):
+        if not hasattr(self, '_deprecated_uuid'):
+            if self.lxml_root is not None:
+                uuid = _get_meta_from_lxml(self.lxml_root, "deprecatedID")
+                self._deprecated_uuid = _uuid_from_meta(uuid) if uuid \
+                    else None
+            else:
+                self._deprecated_uuid = get_deprecated_uuid_from_xml(self)
+        return self._deprecated_uuid
+
+    @property
+    def submission_date(self):
+        if not hasattr(self, '_submission_date'):
+            if self.lxml_root is not None:
+                submission_date = self.lxml_root.get('submissionDate')
+                self._submission_date = \
+                    dateutil.parser.parse(submission_date) \
+                    if submission_date else None
+            else:
+                self._submission_date = get_submission_date_from_xml(self)
+        return self._submission_date
+
+    def get_parser(self, data_dictionary):
+        """Return an XFormInstanceParser for data_dictionary, built once."""
+        key = data_dictionary.pk
+        if key not in self._parsers:
+            self._parsers[key] = XFormInstanceParser(self, data_dictionary)
+        return self._parsers[key]
+
+
 def _xml_node_to_dict(node, repeats=[], encrypted=False):
     assert isinstance(node, minidom.Node)
     if len(node.childNodes) == 0:
@@ -273,6 +462,123 @@ def _get_all_attributes(node):
             yield pair
 
 
+def _lxml_events_to_dict(events, repeats=[], encrypted=False, clear=False):
+    """
+    Build the same dict and attributes as _xml_node_to_dict and
+    _get_all_attributes in a single pass over lxml parse events.
+
+    :param events: (event, element) pairs from etree.iterparse or
+        etree.iterwalk with the LXML_EVENTS events.
+    :param clear: free elements once they have been processed, only safe
+        when the events come from etree.iterparse.
+    :returns: a (root node name, dict, attributes) tuple, attributes is a
+        list of (name, value) pairs in document order.
+    """
+    repeats = set(repeats)
+    attributes = []
+    namespaces = []
+    names = {}
+    # each stack item is a [name, xpath, value] list for an open element
+    stack = []
+    root_name = result = None
+
+    for event, elem in events:
+        if event == 'start-ns':
+            prefix, uri = elem
+            namespaces.append(
+                (u'xmlns:%s' % prefix if prefix else u'xmlns',
+                 unicode(uri)))
+            continue
+
+        if event == 'start':
+            key = (elem.tag, elem.prefix)
+            name = names.get(key)
+            if name is None:
+                name = names[key] = _lxml_node_name(elem)
+
+            if not stack:
+                root_name = name
+                xpath = u''
+            elif stack[-1][1]:
+                xpath = u'%s/%s' % (stack[-1][1], name)
+            else:
+                xpath = name
+            stack.append([name, xpath, {}])
+
+            if namespaces:
+                attributes.extend(namespaces)
+                namespaces = []
+            for attr, value in elem.attrib.items():
+                if attr[0] == '{':
+                    uri, local_name = attr[1:].split('}', 1)
+                    prefix = [k for k, v in elem.nsmap.items() if v == uri]
+                    if uri == XML_NAMESPACE:
+                        prefix = [u'xml']
+                    attr = u'%s:%s' % (prefix[0], local_name) \
+                        if prefix and prefix[0] else local_name
+                attributes.append((unicode(attr), unicode(value)))
+            continue
+
+        name, xpath, value = stack.pop()
+        if len(elem) == 0:
+            text = elem.text
+            # leaf node, there's data for it unless it's only whitespace
+            node = unicode(text) \
+                if text and text.strip(XML_WHITESPACE) else None
+        else:
+            # internal node, a value of {} means there's no data
+            node = value or None
+
+        if clear:
+            elem.clear()
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+        if not stack:
+            result = {name: node} if node is not None else None
+            continue
+
+        if node is None:
+            continue
+
+        parent_value = stack[-1][2]
+        # check if name is in list of repeats and make it a list if so
+        # All the photo attachments in an encrypted form use name media
+        if xpath in repeats or \
+                (encrypted and len(stack) == 1 and name == u'media'):
+            if name not in parent_value:
+                parent_value[name] = [node]
+            else:
+                parent_value[name].append(node)
+        elif name not in parent_value:
+            parent_value[name] = node
+        else:
+            raise InstanceMultipleNodeError(
+                _(u"Multiple nodes with the same name '%s'"
+                  u" while not a repeat" % name))
+
+    return root_name, result, attributes
+
+
+def _lxml_to_dict(xml, repeats=[], encrypted=False):
+    """
+    Parse a submission with lxml, xml is an XML string or a SubmissionXML.
+    """
+    if isinstance(xml, SubmissionXML) and xml.lxml_root is not None:
+        events = etree.iterwalk(xml.lxml_root, events=LXML_EVENTS)
+        return _lxml_events_to_dict(events, repeats, encrypted)
+
+    if isinstance(xml, SubmissionXML):
+        xml = xml.xml
+    clean_xml_str = smart_str(smart_unicode(xml.strip()))
+    events = etree.iterparse(
+        BytesIO(clean_xml_str), events=LXML_EVENTS, resolve_entities=False)
+
+    return _lxml_events_to_dict(events, repeats, encrypted, clear=True)
+
+
 class XFormInstanceParser(object):
 
     def __init__(self, xml_str, data_dictionary):
@@ -280,25 +586,38 @@ class XFormInstanceParser(object):
         self.parse(xml_str)
 
     def parse(self, xml_str):
-        self._xml_obj = clean_and_parse_xml(xml_str)
-        self._root_node = self._xml_obj.documentElement
-        repeats = [e.get_abbreviated_xpath()
-                   for e in self.dd.get_survey_elements_of_type(u"repeat")]
+        repeats = self.dd.get_survey_xpaths_of_type(u"repeat")
+
+        if get_parser_backend() == LXML_BACKEND:
+            self._xml_source = xml_str
+            self._xml_obj = self._root_node = None
+            self._root_node_name, self._dict, all_attributes = \
+                _lxml_to_dict(xml_str, repeats, self.dd.encrypted)
+        else:
+            self._xml_obj = get_xml_obj(xml_str)
+            self._root_node = self._xml_obj.documentElement
+            self._root_node_name = self._root_node.nodeName
+            self._dict = _xml_node_to_dict(self._root_node, repeats,
+                                           self.dd.encrypted)
+            all_attributes = None
 
-        self._dict = _xml_node_to_dict(self._root_node, repeats,
-                                       self.dd.encrypted)
         self._flat_dict = {}
         if self._dict is None:
             raise InstanceEmptyError
         for path, value in _flatten_dict_nest_repeats(self._dict, []):
             self._flat_dict[u"/".join(path[1:])] = value
-        self._set_attributes()
+        self._set_attributes(all_attributes)
 
     def get_root_node(self):
+        if self._root_node is None:
+            # the lxml backend only builds a DOM when it is asked for
+            self._xml_obj = get_xml_obj(self._xml_source)
+            self._root_node = self._xml_obj.documentElement
+
         return self._root_node
 
     def get_root_node_name(self):
-        return self._root_node.nodeName
+        return self._root_node_name
 
     def get(self, abbreviated_xpath):
         return self.to_flat_dict()[abbreviated_xpath]
@@ -312,9 +631,10 @@ class XFormInstanceParser(object):
     def get_attributes(self):
         return self._attributes
 
-    def _set_attributes(self):
+    def _set_attributes(self, all_attributes=None):
         self._attributes = {}
-        all_attributes = list(_get_all_attributes(self._root_node))
+        if all_attributes is None:
+            all_attributes = list(_get_all_attributes(self._root_node))
         for key, value in all_attributes:
             # commented since enketo forms may have the template attribute in
             # multiple xml tags and I dont see the harm in overiding
@@ -1,5 +1,11 @@
 from django.contrib.auth.models import User
 from django.contrib.auth.backends import ModelBackend as DjangoModelBackend
+from guardian.backends import ObjectPermissionBackend as \
+    GuardianObjectPermissionBackend, check_object_support, check_user_support
+from guardian.core import ObjectPermissionChecker
+from guardian.exceptions import WrongAppError
+
+from onadata.libs.utils.permission_cache import get_object_perms
 
 
 class ModelBackend(DjangoModelBackend):
@@ -11,3 +17,52 @@ class ModelBackend(DjangoModelBackend):
                 return user
         except User.DoesNotExist:
             return None
+
+
+class ObjectPermissionBackend(GuardianObjectPermissionBackend):
+    """
+    Guardian's object permission backend reading a user's permissions from
+    snapshots of the permissions on all the objects of a content type
+    instead of querying the permissions of each object checked.
+    """
+
+    def _get_user(self, user_obj, obj):
+        if not check_object_support(obj):
+            return None
+
+        if not user_obj.is_authenticated():
+            # the anonymous user is looked up once per request
+            if '_guardian_anonymous_user' not in user_obj.__dict__:
+                support, user = check_user_support(user_obj)
+                user_obj._guardian_anonymous_user = user if support else None
+
+            return user_obj._guardian_anonymous_user
+
+        return user_obj
+
+    def has_perm(self, user_obj, perm, obj=None):
+        user = self._get_user(user_obj, obj)
+        if user is None:
+            return False
+
+        if '.' in perm:
+            app_label, perm = perm.split('.')
+            if app_label != obj._meta.app_label:
+                raise WrongAppError(
+                    "Passed perm has app label of '%s' and given obj has "
+                    "'%s'" % (app_label, obj._meta.app_label))
+
+        if user.is_active and user.is_superuser:
+            return True
+
+        return perm in get_object_perms(user, obj)
+
+    def get_all_permissions(self, user_obj, obj=None):
+        user = self._get_user(user_obj, obj)
+        if user is None:
+            return set()
+
+        if user.is_active and user.is_superuser:
+            return set(ObjectPermissionChecker(user).get_perms(obj))
+
+        return set(get_object_perms(user, obj))
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Max
+
+# audit log records updated per transaction
+BACKFILL_BATCH_SIZE = 10000
+
+
+def backfill_audit_columns(apps, schema_editor):
+    Audit = apps.get_model('main', 'Audit')
+    last_id = Audit.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    with schema_editor.connection.cursor() as cursor:
+        for first_id in xrange(0, last_id, BACKFILL_BATCH_SIZE):
+            cursor.execute(
+                "UPDATE main_audit SET account = json->>'account', "
+                "action = json->>'action', \"user\" = json->>'user', "
+                "created_on = CASE WHEN json->>'created_on' ~ "
+                "'^\\d{4}-\\d{2}-\\d{2}T\\d{2}:\\d{2}:\\d{2}' "
+                "THEN (json->>'created_on')::timestamp AT TIME ZONE 'UTC' "
+                "END WHERE id > %s AND id <= %s",
+                [first_id, first_id + BACKFILL_BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+    # each batch of the backfill is committed on its own
+    atomic = False
+
+    dependencies = [
+        ('main', '0007_auto_20160418_0525'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audit',
+            name='account',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='audit',
+            name='action',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='audit',
+            name='created_on',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='audit',
+            name='user',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.RunPython(backfill_audit_columns,
+                             migrations.RunPython.noop),
+        # the indexes are built once the columns are filled
+        migrations.AlterIndexTogether(
+            name='audit',
+            index_together=set([
+                ('account', 'id'), ('account', 'action', 'id'),
+                ('account', 'user', 'id'), ('account', 'created_on')]),
+        ),
+    ]
@@ -1,19 +1,90 @@
 import json
 import six
 
+from dateutil import parser
 from django.db import models
 from django.db import connection
 from django.contrib.postgres.fields import JSONField
+from django.utils import timezone
 from django.utils.translation import ugettext as _
 
+from onadata.libs.utils.model_tools import server_side_cursor_iterator
+
 DEFAULT_LIMIT = 1000
 
+# json keys copied to indexed columns, queried with their column
+QUERY_COLUMNS = {
+    u'account': u'account',
+    u'action': u'action',
+    u'user': u'"user"',
+}
+SORT_COLUMNS = dict(QUERY_COLUMNS, created_on=u'created_on', pk=u'id',
+                    id=u'id')
+
 
 class Audit(models.Model):
     json = JSONField()
 
+    # copies of the json values the audit log is queried with
+    account = models.CharField(max_length=255, null=True)
+    action = models.CharField(max_length=255, null=True)
+    user = models.CharField(max_length=255, null=True)
+    created_on = models.DateTimeField(null=True)
+
     class Meta:
         app_label = 'main'
+        index_together = [
+            ('account', 'id'),
+            ('account', 'action', 'id'),
+            ('account', 'user', 'id'),
+            ('account', 'created_on'),
+        ]
+
+    def set_columns(self):
+        """Copy the queried json values to their columns."""
+        self.account = self.json.get(u'account')
+        self.action = self.json.get(u'action')
+        self.user = self.json.get(u'user')
+        created_on = self.json.get(u'created_on')
+        # created_on is saved in UTC without a timezone
+        self.created_on = parser.parse(created_on).replace(
+            tzinfo=timezone.utc) if created_on else None
+
+    def save(self, *args, **kwargs):
+        self.set_columns()
+        super(Audit, self).save(*args, **kwargs)
+
+
+def _get_predicate(key, value, params):
+    """The SQL condition of a query key, and its parameters in params."""
+    if key in QUERY_COLUMNS:
+        params.append(value)
+
+        return QUERY_COLUMNS[key] + u" = %s"
+
+    params.extend([key, value])
+
+    return u"json->>%s = %s"
+
+
+def _get_order_by(sort, params):
+    if isinstance(sort, dict) and sort:
+        # mongo style {field: 1 or -1}
+        field, order = sort.items()[0]
+        sort = u'-' + field if order < 0 else field
+    if not isinstance(sort, six.string_types) or not sort:
+        return u" ORDER BY id"
+
+    direction = u'DESC' if sort.startswith('-') else u'ASC'
+    sort = sort[1:] if sort.startswith('-') else sort
+    if sort in SORT_COLUMNS:
+        column = SORT_COLUMNS[sort]
+        return u" ORDER BY {0} {1}, id {1}".format(column, direction) \
+            if column != u'id' else u" ORDER BY id {}".format(direction)
+
+    params.append(sort)
+
+    return u" ORDER BY json->>%s {}, id {}".format(direction, direction)
 
 
 class AuditLog(object):
@@ -30,9 +101,17 @@ class AuditLog(object):
 
         return a
 
+    @classmethod
+    def save_many(cls, data):
+        """Save a list of audit log entries in one query."""
+        audits = [Audit(json=d) for d in data]
+        for audit in audits:
+            audit.set_columns()
+
+        return Audit.objects.bulk_create(audits)
+
     @classmethod
     def query_iterator(cls, sql, fields=None, params=[], count=False):
-        cursor = connection.cursor()
         sql_params = fields + params if fields is not None else params
 
         if count:
@@ -46,86 +125,78 @@ class AuditLog(object):
 
             sql_params = params
             fields = [u'count']
-
-        cursor.execute(sql, sql_params)
+            cursor = connection.cursor()
+            cursor.execute(sql, sql_params)
+            rows = cursor.fetchall()
+        else:
+            # stream the records instead of loading all of them
+            rows = server_side_cursor_iterator(sql, sql_params)
 
         if fields is None:
-            for row in cursor.fetchall():
+            for row in rows:
                 yield row[0]
         else:
-            for row in cursor.fetchall():
+            for row in rows:
                 yield dict(zip(fields, row))
 
     @classmethod
     def query_data(cls, username, query=None, fields=None, sort=None, start=0,
-                   limit=DEFAULT_LIMIT, count=False):
+                   limit=DEFAULT_LIMIT, count=False, after_id=None):
+        """
+        Query the audit log of an account.
+
+        Queries on the account, action and user keys and sorting on them or
+        created_on use their indexed columns. With after_id the records
+        after that id are returned in id order, limit at a time, which
+        does not scan the skipped records as start does.
+        """
         if start is not None and (start < 0 or limit < 0):
             raise ValueError(_("Invalid start/limit params"))
 
-        sort = 'pk' if sort is None else sort
-        instances = Audit.objects.filter().extra(where=["json->>%s = %s"],
-                                                 params=['account', username])
-
-        where_params = []
-        sql_where = u""
         if query and isinstance(query, six.string_types):
             query = json.loads(query)
-            or_where = []
-            or_params = []
-            if '$or' in query.keys():
-                or_dict = query.pop('$or')
-                for l in or_dict:
-                    or_where.extend([u"json->>%s = %s" for i in l.items()])
-                    [or_params.extend(i) for i in l.items()]
-
-                or_where = [u"".join([u"(", u" OR ".join(or_where), u")"])]
-
-            where = [u"json->>%s = %s" for i in query.items()] + or_where
-            [where_params.extend(i) for i in query.items()]
-            where_params.extend(or_params)
 
         if fields and isinstance(fields, six.string_types):
             fields = json.loads(fields)
 
-        if fields:
-            field_list = [u"json->%s" for i in fields]
-            sql = u"SELECT %s FROM main_audit" % u",".join(field_list)
+        params = [username]
+        where = [u"account = %s"]
+        if query:
+            query = dict(query)
+            or_dict = query.pop('$or', None)
+            for key, value in query.items():
+                where.append(_get_predicate(key, value, params))
+            if or_dict:
+                or_where = [_get_predicate(key, value, params)
+                            for l in or_dict for key, value in l.items()]
+                where.append(u"".join([u"(", u" OR ".join(or_where), u")"]))
+
+        if after_id is not None:
+            where.append(u"id > %s")
+            params.append(after_id)
+
+        sql_where = u" WHERE " + u" AND ".join(where)
+        if count:
+            cursor = connection.cursor()
+            cursor.execute(u"SELECT COUNT(*) FROM main_audit" + sql_where,
+                           params)
 
-            if where_params:
-                sql_where = u" AND " + u" AND ".join(where)
+            return [{u"count": cursor.fetchone()[0]}]
 
-            sql += u" WHERE json->>%s = %s " + sql_where \
-                + u" ORDER BY id"
-            params = ['account', username] + where_params
+        if fields:
+            sql = u"SELECT %s FROM main_audit" % u",".join(
+                [u"json->%s" for i in fields])
+        else:
+            sql = u"SELECT json FROM main_audit"
+        sql += sql_where
 
+        if after_id is not None:
+            sql += u" ORDER BY id LIMIT %s"
+            params.append(limit)
+        else:
+            sql += _get_order_by(sort, params)
             if start is not None:
                 sql += u" OFFSET %s LIMIT %s"
                 params += [start, limit]
-            records = cls.query_iterator(sql, fields, params, count)
-        else:
-            if count:
-                return [{"count": instances.count()}]
-
-            if where_params:
-                instances = instances.extra(where=where, params=where_params)
-
-            records = instances.values_list('json', flat=True)
-
-            sql, params = records.query.sql_with_params()
-
-            if isinstance(sort, six.string_types) and len(sort) > 0:
-                direction = 'DESC' if sort.startswith('-') else 'ASC'
-                sort = sort[1:] if sort.startswith('-') else sort
-                sql = u'{} ORDER BY json->>%s {}'.format(sql, direction)
-                params += (sort,)
-
-            if start is not None:
-                # some inconsistent/weird behavior I noticed with django's
-                # queryset made me have to do a raw query
-                # records = records[start: limit]
-                sql = u"{} OFFSET %s LIMIT %s".format(sql)
-                params += (start, limit)
-
-            records = cls.query_iterator(sql, None, list(params))
 
-        return records
+        return cls.query_iterator(sql, fields or None, params)
@@ -1,11 +1,18 @@
+import logging
+
 from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
 from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
 
-from onadata.libs.utils.log import audit_log, Actions
+from onadata.libs.utils.log import audit_log, flush_audit_logs, Actions
 from onadata.apps.main.models import AuditLog
+from onadata.apps.main.models.audit import Audit
 
 
+# the records are saved by the tests, not by the logging thread
+@override_settings(AUDIT_LOG_BATCH_SIZE=10, AUDIT_LOG_FLUSH_INTERVAL=3600)
 class TestAuditLog(TestCase):
     def test_audit_log_call(self):
         account_user = User(username="alice")
@@ -15,6 +22,7 @@ class TestAuditLog(TestCase):
         audit = {}
         audit_log(Actions.FORM_PUBLISHED, request_user, account_user,
                   "Form published", audit, request)
+        flush_audit_logs()
         # function should just run without exception so we are good at this
         # point query for this log entry
         sort = '-created_on'
@@ -26,3 +34,59 @@ class TestAuditLog(TestCase):
         self.assertEqual(record['account'], "alice")
         self.assertEqual(record['user'], "bob")
         self.assertEqual(record['action'], Actions.FORM_PUBLISHED)
+
+    def _log(self, count):
+        account_user = User(username="alice")
+        request = RequestFactory().get("/")
+        for i in range(count):
+            audit_log(Actions.FORM_ACCESSED, account_user, account_user,
+                      "Form accessed", {}, request)
+
+    def test_audit_logs_are_saved_in_batches(self):
+        handler = logging.getLogger("audit_logger").handlers[0]
+
+        with CaptureQueriesContext(connection) as context:
+            self._log(3)
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual(Audit.objects.count(), 0)
+
+        with CaptureQueriesContext(connection) as context:
+            handler.flush()
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(Audit.objects.count(), 3)
+
+    @override_settings(AUDIT_LOG_QUEUE_SIZE=2)
+    def test_full_audit_log_queue_is_saved_by_the_logging_thread(self):
+        self._log(2)
+
+        self.assertEqual(Audit.objects.count(), 2)
+
+    def test_query_audit_log_columns(self):
+        self._log(2)
+        account_user = User(username="alice")
+        audit_log(Actions.FORM_PUBLISHED, account_user, account_user,
+                  "Form published", {}, RequestFactory().get("/"))
+        flush_audit_logs()
+
+        audit = Audit.objects.get(action=Actions.FORM_PUBLISHED)
+        self.assertEqual(audit.account, "alice")
+        self.assertEqual(audit.user, "alice")
+        self.assertIsNotNone(audit.created_on)
+
+        records = list(AuditLog.query_data(
+            "alice", {'action': Actions.FORM_ACCESSED}, None, '-created_on'))
+        self.assertEqual(len(records), 2)
+        self.assertEqual(AuditLog.query_data(
+            "alice", '{"$or": [{"action": "form-published"}, '
+            '{"msg": "Form published"}]}', count=True), [{'count': 1}])
+
+    def test_audit_log_keyset_pagination(self):
+        self._log(5)
+        flush_audit_logs()
+        ids = list(Audit.objects.order_by('pk').values_list('pk', flat=True))
+
+        records = list(AuditLog.query_data(
+            "alice", fields='["action"]', after_id=ids[1], limit=2))
+        self.assertEqual(records, [{'action': Actions.FORM_ACCESSED}] * 2)
+        self.assertEqual(len(list(AuditLog.query_data(
+            "alice", after_id=ids[3], limit=2))), 1)
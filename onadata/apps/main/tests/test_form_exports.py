@@ -2,6 +2,8 @@ import os
 import time
 import csv
 import tempfile
+import zipfile
+from cStringIO import StringIO
 
 from django.core.urlresolvers import reverse
 from django.utils import timezone
@@ -121,6 +123,26 @@ class TestFormExports(TestBase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Disposition'], 'attachment;')
 
+    def test_zip_export_streams_attachments(self):
+        self._submit_transport_instance_w_attachment(survey_at=1)
+        url = reverse(zip_export, kwargs={'username': self.user.username,
+                                          'id_string': self.xform.id_string})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+
+        zip_file = zipfile.ZipFile(
+            StringIO(self._get_response_content(response)))
+        name = self.attachment.media_file.name
+        self.assertEqual(zip_file.namelist(), [name])
+        # jpg files are not compressed again
+        self.assertEqual(zip_file.getinfo(name).compress_type,
+                         zipfile.ZIP_STORED)
+        with open(os.path.join(
+                self.this_directory, 'fixtures', 'transportation',
+                'instances', self.surveys[1], '1335783522563.jpg')) as f:
+            self.assertEqual(zip_file.read(name), f.read())
+
     def test_restrict_zip_export_if_not_shared(self):
         url = reverse(zip_export, kwargs={'username': self.user.username,
                                           'id_string': self.xform.id_string})
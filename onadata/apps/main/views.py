@@ -1321,6 +1321,8 @@ def activity_api(request, username):
             query_args["start"] = int(request.GET.get('start'))
         if 'limit' in request.GET:
             query_args["limit"] = int(request.GET.get('limit'))
+        if 'after_id' in request.GET:
+            query_args["after_id"] = int(request.GET.get('after_id'))
         if 'count' in request.GET:
             query_args["count"] = True \
                 if int(request.GET.get('count')) > 0 else False
@@ -1,3 +1,9 @@
 class RestServiceInterface(object):
+    # whether send_batch can send many submissions in one request
+    supports_batch = False
+
     def send(self, url, data=None):
         raise NotImplementedError
+
+    def send_batch(self, url, submission_instances):
+        raise NotImplementedError
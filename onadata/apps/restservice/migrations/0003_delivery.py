@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0035_xformdataversion'),
+        ('restservice', '0002_auto_20160524_0458'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestServiceDeadLetter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True,
+                                        serialize=False, verbose_name='ID')),
+                ('attempts', models.IntegerField(default=0)),
+                ('error', models.TextField(default='')),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('instance', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='dead_letters', to='logger.Instance')),
+                ('rest_service', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='dead_letters',
+                    to='restservice.RestService')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RestServiceDelivery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True,
+                                        serialize=False, verbose_name='ID')),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt', models.DateTimeField(
+                    default=django.utils.timezone.now)),
+                ('claim', models.CharField(default=None, max_length=32,
+                                           null=True)),
+                ('date_claimed', models.DateTimeField(default=None,
+                                                      null=True)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('instance', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='deliveries', to='logger.Instance')),
+                ('rest_service', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='deliveries',
+                    to='restservice.RestService')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RestServiceStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True,
+                                        serialize=False, verbose_name='ID')),
+                ('delivered', models.BigIntegerField(default=0)),
+                ('requests', models.BigIntegerField(default=0)),
+                ('failed_requests', models.BigIntegerField(default=0)),
+                ('dead_letters', models.BigIntegerField(default=0)),
+                ('total_time', models.FloatField(default=0)),
+                ('last_delivered', models.DateTimeField(default=None,
+                                                        null=True)),
+                ('last_failed', models.DateTimeField(default=None,
+                                                     null=True)),
+                ('last_error', models.TextField(default='')),
+                ('rest_service', models.OneToOneField(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='stats', to='restservice.RestService')),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='restservicedelivery',
+            index_together=set([('rest_service', 'next_attempt')]),
+        ),
+    ]
@@ -2,9 +2,12 @@ import importlib
 
 from django.conf import settings
 from django.db import models
+from django.db.models import F
 from django.db.models.signals import post_delete
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy
 
+from onadata.apps.logger.models.instance import Instance
 from onadata.apps.logger.models.xform import XForm
 from onadata.apps.main.models import MetaData
 from onadata.apps.restservice import SERVICE_CHOICES
@@ -41,6 +44,77 @@ class RestService(models.Model):
         return sv.verbose_name
 
 
+class RestServiceDelivery(models.Model):
+    """
+    A submission waiting to be sent to a rest service, claimed by the worker
+    sending it.
+    """
+
+    class Meta:
+        app_label = 'restservice'
+        index_together = [('rest_service', 'next_attempt')]
+
+    rest_service = models.ForeignKey(RestService, related_name='deliveries')
+    instance = models.ForeignKey(Instance, related_name='deliveries')
+    attempts = models.IntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    claim = models.CharField(max_length=32, null=True, default=None)
+    date_claimed = models.DateTimeField(null=True, default=None)
+    date_created = models.DateTimeField(auto_now_add=True)
+
+
+class RestServiceDeadLetter(models.Model):
+    """A submission that could not be sent to a rest service."""
+
+    class Meta:
+        app_label = 'restservice'
+
+    rest_service = models.ForeignKey(RestService, related_name='dead_letters')
+    instance = models.ForeignKey(Instance, related_name='dead_letters')
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(default=u'')
+    date_created = models.DateTimeField(auto_now_add=True)
+
+
+class RestServiceStats(models.Model):
+    """Delivery metrics of a rest service."""
+
+    class Meta:
+        app_label = 'restservice'
+
+    rest_service = models.OneToOneField(RestService, related_name='stats')
+    # submissions sent
+    delivered = models.BigIntegerField(default=0)
+    # requests made, successful or not
+    requests = models.BigIntegerField(default=0)
+    failed_requests = models.BigIntegerField(default=0)
+    dead_letters = models.BigIntegerField(default=0)
+    # seconds spent waiting for the service
+    total_time = models.FloatField(default=0)
+    last_delivered = models.DateTimeField(null=True, default=None)
+    last_failed = models.DateTimeField(null=True, default=None)
+    last_error = models.TextField(default=u'')
+
+    @classmethod
+    def record(cls, rest_service_id, duration, delivered=0, dead_letters=0,
+               error=None):
+        """Add a request to the rest service's metrics."""
+        cls.objects.get_or_create(rest_service_id=rest_service_id)
+        counts = {
+            'requests': F('requests') + 1,
+            'total_time': F('total_time') + duration,
+        }
+        if error is None:
+            counts.update(delivered=F('delivered') + delivered,
+                          last_delivered=timezone.now())
+        else:
+            counts.update(failed_requests=F('failed_requests') + 1,
+                          dead_letters=F('dead_letters') + dead_letters,
+                          last_failed=timezone.now(),
+                          last_error=error)
+        cls.objects.filter(rest_service_id=rest_service_id).update(**counts)
+
+
 def delete_metadata(sender, instance, **kwargs):
     if instance.name in [TEXTIT, GOOGLE_SHEET]:
         MetaData.objects.filter(
@@ -1,6 +1,5 @@
-import httplib2
-
 from onadata.apps.restservice.RestServiceInterface import RestServiceInterface
+from onadata.apps.restservice.utils import get_session, get_timeout
 
 
 class ServiceDefinition(RestServiceInterface):
@@ -13,5 +12,6 @@ class ServiceDefinition(RestServiceInterface):
             "uuid": submission_instance.uuid
         }
         valid_url = url % info
-        http = httplib2.Http()
-        http.request(valid_url, 'GET')
+        response = get_session(valid_url).get(valid_url,
+                                              timeout=get_timeout())
+        response.raise_for_status()
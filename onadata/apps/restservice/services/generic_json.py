@@ -1,17 +1,24 @@
-import httplib2
 import json
 
 from onadata.apps.restservice.RestServiceInterface import RestServiceInterface
+from onadata.apps.restservice.utils import get_session, get_timeout
 
 
 class ServiceDefinition(RestServiceInterface):
     id = u'json'
     verbose_name = u'JSON POST'
+    supports_batch = True
 
-    def send(self, url, submission_instance):
-        post_data = json.dumps(submission_instance.json)
+    def _post(self, url, data):
         headers = {"Content-Type": "application/json"}
-        http = httplib2.Http()
-        resp, content = http.request(uri=url, method='POST',
-                                     headers=headers,
-                                     body=post_data)
+        response = get_session(url).post(url, data=json.dumps(data),
+                                         headers=headers,
+                                         timeout=get_timeout())
+        response.raise_for_status()
+
+    def send(self, url, submission_instance):
+        self._post(url, submission_instance.json)
+
+    def send_batch(self, url, submission_instances):
+        """Post the submissions as a JSON list."""
+        self._post(url, [i.json for i in submission_instances])
@@ -1,6 +1,5 @@
-import httplib2
-
 from onadata.apps.restservice.RestServiceInterface import RestServiceInterface
+from onadata.apps.restservice.utils import get_session, get_timeout
 
 
 class ServiceDefinition(RestServiceInterface):
@@ -9,6 +8,7 @@ class ServiceDefinition(RestServiceInterface):
 
     def send(self, url, submission_instance):
         headers = {"Content-Type": "application/xml"}
-        http = httplib2.Http()
-        resp, content = http.request(
-            url, method="POST", body=submission_instance.xml, headers=headers)
+        response = get_session(url).post(
+            url, data=submission_instance.xml, headers=headers,
+            timeout=get_timeout())
+        response.raise_for_status()
@@ -1,8 +1,8 @@
-import httplib2
 import json
 from six import string_types
 
 from onadata.apps.restservice.RestServiceInterface import RestServiceInterface
+from onadata.apps.restservice.utils import get_session, get_timeout
 from onadata.apps.main.models import MetaData
 from onadata.settings.common import METADATA_SEPARATOR
 from onadata.libs.utils.common_tags import TEXTIT
@@ -31,11 +31,10 @@ class ServiceDefinition(RestServiceInterface):
         }
         headers = {"Content-Type": "application/json",
                    "Authorization": "Token {}".format(token)}
-        http = httplib2.Http()
-
-        resp, content = http.request(uri=url, method='POST',
-                                     headers=headers,
-                                     body=json.dumps(post_data))
+        response = get_session(url).post(url, data=json.dumps(post_data),
+                                         headers=headers,
+                                         timeout=get_timeout())
+        response.raise_for_status()
 
     def clean_keys_of_slashes(self, record):
         """
@@ -1,6 +1,7 @@
 from celery import task
 
-from onadata.apps.restservice.utils import call_service
+from onadata.apps.restservice.utils import call_service, deliver, \
+    get_due_rest_service_ids
 
 
 @task()
@@ -16,3 +17,19 @@ def call_service_async(instance_pk):
         pass
     else:
         call_service(instance)
+
+
+@task()
+def deliver_async(rest_service_id):
+    """Send the due deliveries of a rest service, e.g. to retry them."""
+    deliver(rest_service_id)
+
+
+@task()
+def deliver_due_async():
+    """
+    Schedule the rest services with due deliveries, e.g. retries whose task
+    was lost or could not be sent, run periodically by celery beat.
+    """
+    for rest_service_id in get_due_rest_service_ids():
+        deliver_async.delay(rest_service_id)
@@ -0,0 +1,159 @@
+import json
+import threading
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+from django.test.utils import override_settings
+from django.utils import timezone
+from mock import patch
+
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.apps.restservice.models import RestService, \
+    RestServiceDeadLetter, RestServiceDelivery, RestServiceStats
+from onadata.apps.restservice.tasks import deliver_due_async
+from onadata.apps.restservice.utils import deliver, queue_deliveries
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append(json.loads(body))
+        self.send_response(self.server.status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestDelivery(TestBase):
+    """Deliveries to a local HTTP server standing in for a rest service."""
+
+    def setUp(self):
+        super(TestDelivery, self).setUp()
+        self.server = HTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.server.received = []
+        self.server.status = 200
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        self._publish_transportation_form()
+        # submissions made before the service exists are not queued
+        self._make_submissions()
+        self.rest_service = RestService.objects.create(
+            xform=self.xform, name='generic_json',
+            service_url='http://127.0.0.1:%s/' % self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super(TestDelivery, self).tearDown()
+
+    def _queue_submissions(self):
+        instances = self.xform.instances.order_by('pk')
+        for instance in instances:
+            queue_deliveries(instance)
+
+        return instances
+
+    @override_settings(REST_SERVICE_BATCH_SIZE=10)
+    def test_deliver_batch(self):
+        instances = self._queue_submissions()
+
+        deliver(self.rest_service.pk)
+
+        self.assertEqual(self.server.received,
+                         [[i.json for i in instances]])
+        self.assertFalse(RestServiceDelivery.objects.exists())
+        stats = RestServiceStats.objects.get(rest_service=self.rest_service)
+        self.assertEqual(stats.delivered, 4)
+        self.assertEqual(stats.requests, 1)
+        self.assertIsNotNone(stats.last_delivered)
+
+    def test_deliver_one_submission_per_request(self):
+        instances = self._queue_submissions()
+
+        deliver(self.rest_service.pk)
+
+        self.assertEqual(self.server.received, [i.json for i in instances])
+        stats = RestServiceStats.objects.get(rest_service=self.rest_service)
+        self.assertEqual((stats.delivered, stats.requests), (4, 4))
+
+    @override_settings(REST_SERVICE_BATCH_SIZE=10,
+                       REST_SERVICE_MAX_ATTEMPTS=2)
+    def test_retry_and_dead_letters(self):
+        self.server.status = 500
+        self._queue_submissions()
+
+        deliver(self.rest_service.pk)
+
+        # the deliveries wait for their retry
+        self.assertEqual(len(self.server.received), 1)
+        deliveries = RestServiceDelivery.objects.all()
+        self.assertEqual([d.attempts for d in deliveries], [1] * 4)
+        self.assertTrue(all([d.next_attempt > timezone.now() and
+                             d.claim is None for d in deliveries]))
+
+        deliveries.update(next_attempt=timezone.now())
+        deliver(self.rest_service.pk)
+
+        self.assertEqual(len(self.server.received), 2)
+        self.assertFalse(RestServiceDelivery.objects.exists())
+        dead_letters = RestServiceDeadLetter.objects.filter(
+            rest_service=self.rest_service)
+        self.assertEqual(dead_letters.count(), 4)
+        self.assertIn(u'500', dead_letters[0].error)
+        stats = RestServiceStats.objects.get(rest_service=self.rest_service)
+        self.assertEqual((stats.delivered, stats.failed_requests,
+                          stats.dead_letters), (0, 2, 4))
+
+    def test_unknown_service_is_dead_lettered(self):
+        self.rest_service.name = 'bamboo'
+        self.rest_service.save()
+        self._queue_submissions()
+
+        deliver(self.rest_service.pk)
+
+        self.assertEqual(self.server.received, [])
+        self.assertEqual(RestServiceDeadLetter.objects.filter(
+            rest_service=self.rest_service).count(), 4)
+
+    def test_submissions_are_delivered(self):
+        self.xform.instances.all().delete()
+        self._make_submissions()
+
+        self.assertEqual(
+            self.server.received,
+            [i.json for i in self.xform.instances.order_by('pk')])
+
+    def test_submission_sends_only_its_deliveries(self):
+        self.xform.instances.order_by('pk')[0].delete()
+        self._queue_submissions()
+
+        self._submit_transport_instance()
+
+        # the other deliveries are left to the workers
+        self.assertEqual(self.server.received,
+                         [self.xform.instances.order_by('pk').last().json])
+        self.assertEqual(RestServiceDelivery.objects.count(), 3)
+
+    @patch('onadata.apps.restservice.tasks.deliver_async.apply_async')
+    def test_failed_retry_dispatch_leaves_deliveries_due(self, apply_async):
+        apply_async.side_effect = IOError('broker unreachable')
+        self.server.status = 500
+        self._queue_submissions()
+
+        deliver(self.rest_service.pk)
+
+        self.assertTrue(apply_async.called)
+        self.assertEqual(
+            [d.attempts for d in RestServiceDelivery.objects.all()], [1] * 4)
+
+    @patch('onadata.apps.restservice.tasks.deliver_async.delay')
+    def test_due_deliveries_are_scheduled(self, delay):
+        deliver_due_async()
+        self.assertFalse(delay.called)
+
+        self._queue_submissions()
+        deliver_due_async()
+        delay.assert_called_once_with(self.rest_service.pk)
@@ -1,17 +1,282 @@
-from onadata.apps.restservice.models import RestService
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+from urlparse import urlparse
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from onadata.apps.restservice.models import RestService, \
+    RestServiceDeadLetter, RestServiceDelivery, RestServiceStats
+from onadata.libs.utils.cache_tools import REST_SERVICE_SLOTS
 from onadata.libs.utils.common_tags import GOOGLE_SHEET
 
+# seconds to wait before retrying a service that had no free slot
+BUSY_SERVICE_DELAY = 5
 
-def call_service(submission_instance):
-    # lookup service which is not google sheet service
+_local = threading.local()
+
+
+def _get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_timeout():
+    """Seconds to wait for a rest service to respond."""
+    return _get_setting('REST_SERVICE_TIMEOUT', 30)
+
+
+def get_session(url):
+    """
+    Return this thread's requests session for the host of url, which keeps
+    the connections to the host open between requests.
+    """
+    if not hasattr(_local, 'sessions'):
+        _local.sessions = {}
+
+    parts = urlparse(url)
+    key = (parts.scheme, parts.netloc)
+    session = _local.sessions.get(key)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=_get_setting('REST_SERVICE_MAX_CONCURRENCY', 4))
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _local.sessions[key] = session
+
+    return session
+
+
+def _acquire_slot(rest_service_id):
+    """Take one of the rest service's concurrent delivery slots."""
+    key = '{}{}'.format(REST_SERVICE_SLOTS, rest_service_id)
+    cache.add(key, 0, _get_claim_timeout())
+    try:
+        slots = cache.incr(key)
+    except ValueError:
+        # the counter was evicted, do not block deliveries on the cache
+        return True
+
+    if slots > _get_setting('REST_SERVICE_MAX_CONCURRENCY', 4):
+        cache.decr(key)
+
+        return False
+
+    return True
+
+
+def _release_slot(rest_service_id):
+    try:
+        cache.decr('{}{}'.format(REST_SERVICE_SLOTS, rest_service_id))
+    except ValueError:
+        pass
+
+
+def _get_claim_timeout():
+    # a claim outlives the slowest run of a worker sending one batch
+    return get_timeout() * _get_setting('REST_SERVICE_BATCH_SIZE', 1) + 60
+
+
+def _get_retry_delay(attempts):
+    return _get_setting('REST_SERVICE_RETRY_DELAY', 60) * 2 ** (attempts - 1)
+
+
+def _earliest(delay, other_delay):
+    if delay is None or other_delay is None:
+        return other_delay if delay is None else delay
+
+    return min(delay, other_delay)
+
+
+def _schedule_delivery(rest_service_id, countdown):
+    from onadata.apps.restservice.tasks import deliver_async
+
+    try:
+        deliver_async.apply_async(args=[rest_service_id], countdown=countdown)
+    except Exception:
+        # the deliveries stay due and are sent by deliver_due_async
+        logging.getLogger('console_logger').exception(
+            'Scheduling the deliveries of rest service %s failed',
+            rest_service_id)
+
+
+def queue_deliveries(submission_instance):
+    """
+    Queue a submission for its form's rest services, returns the ids of the
+    services.
+    """
     services = RestService.objects.filter(
         xform_id=submission_instance.xform_id).exclude(name=GOOGLE_SHEET)
-    # call service send with url and data parameters
-    for sv in services:
-        # TODO: Queue service
+    deliveries = [RestServiceDelivery(rest_service=sv,
+                                      instance=submission_instance)
+                  for sv in services]
+    RestServiceDelivery.objects.bulk_create(deliveries)
+
+    return [d.rest_service_id for d in deliveries]
+
+
+def _get_claimable_deliveries():
+    now = timezone.now()
+
+    return RestServiceDelivery.objects.filter(next_attempt__lte=now).filter(
+        Q(claim=None) |
+        Q(date_claimed__lt=now - timedelta(seconds=_get_claim_timeout())))
+
+
+def get_due_rest_service_ids():
+    """The ids of the rest services with deliveries to send."""
+    return list(_get_claimable_deliveries().order_by().values_list(
+        'rest_service_id', flat=True).distinct())
+
+
+def _claim_deliveries(rest_service_id, instance_id=None):
+    claimable = _get_claimable_deliveries().filter(
+        rest_service_id=rest_service_id)
+    if instance_id is not None:
+        claimable = claimable.filter(instance_id=instance_id)
+    ids = list(claimable.order_by('pk').values_list('pk', flat=True)[
+        :_get_setting('REST_SERVICE_BATCH_SIZE', 1)])
+    claim = uuid.uuid4().hex
+    # rows claimed meanwhile by another worker are no longer claimable
+    claimable.filter(pk__in=ids).update(claim=claim,
+                                        date_claimed=timezone.now())
+
+    return list(RestServiceDelivery.objects.filter(claim=claim).select_related(
+        'instance', 'instance__xform').order_by('pk'))
+
+
+def _delivered(rest_service, deliveries, duration):
+    RestServiceDelivery.objects.filter(
+        pk__in=[d.pk for d in deliveries]).delete()
+    RestServiceStats.record(rest_service.pk, duration,
+                            delivered=len(deliveries))
+
+
+def _failed(rest_service, deliveries, error, duration, retry=True):
+    """
+    Retry the deliveries later with an exponential backoff, or move them to
+    the dead letters once they reached the maximum number of attempts.
+    Returns the delay before the next retry if any.
+    """
+    max_attempts = _get_setting('REST_SERVICE_MAX_ATTEMPTS', 5)
+    error = u'%s' % error
+    dead_letters = []
+    retry_delay = None
+    for delivery in deliveries:
+        delivery.attempts += 1
+        if not retry or delivery.attempts >= max_attempts:
+            dead_letters.append(RestServiceDeadLetter(
+                rest_service=rest_service, instance=delivery.instance,
+                attempts=delivery.attempts, error=error))
+            delivery.delete()
+        else:
+            delay = _get_retry_delay(delivery.attempts)
+            retry_delay = _earliest(retry_delay, delay)
+            delivery.next_attempt = timezone.now() + timedelta(seconds=delay)
+            delivery.claim = None
+            delivery.save(update_fields=['attempts', 'next_attempt', 'claim'])
+
+    RestServiceDeadLetter.objects.bulk_create(dead_letters)
+    RestServiceStats.record(rest_service.pk, duration,
+                            dead_letters=len(dead_letters), error=error)
+
+    return retry_delay
+
+
+def _send(rest_service, deliveries):
+    """Send claimed deliveries, returns the delay before a retry if any."""
+    try:
+        service = rest_service.get_service_definition()()
+    except (AttributeError, ImportError) as e:
+        # a service that can not be loaded will not get any better
+        return _failed(rest_service, deliveries, e, 0, retry=False)
+
+    if service.supports_batch and len(deliveries) > 1:
+        batches = [deliveries]
+    else:
+        batches = [[d] for d in deliveries]
+
+    retry_delay = None
+    for batch in batches:
+        start = time.time()
         try:
-            service = sv.get_service_definition()()
-            service.send(sv.service_url, submission_instance)
-        except:
-            # TODO: Handle gracefully | requeue/resend
-            pass
+            if len(batch) > 1:
+                service.send_batch(rest_service.service_url,
+                                   [d.instance for d in batch])
+            else:
+                service.send(rest_service.service_url, batch[0].instance)
+        except Exception as e:
+            retry_delay = _earliest(retry_delay, _failed(
+                rest_service, batch, e, time.time() - start))
+        else:
+            _delivered(rest_service, batch, time.time() - start)
+
+    return retry_delay
+
+
+def deliver(rest_service_id, instance_id=None):
+    """
+    Send the due deliveries of a rest service, or only those of the
+    submission instance_id, at most REST_SERVICE_MAX_CONCURRENCY workers send
+    to a service at the same time.
+    """
+    try:
+        rest_service = RestService.objects.get(pk=rest_service_id)
+    except RestService.DoesNotExist:
+        return
+
+    if not _acquire_slot(rest_service_id):
+        _schedule_delivery(rest_service_id, BUSY_SERVICE_DELAY)
+
+        return
+
+    retry_delay = None
+    try:
+        deliveries = _claim_deliveries(rest_service_id, instance_id)
+        while deliveries:
+            retry_delay = _earliest(retry_delay,
+                                    _send(rest_service, deliveries))
+            deliveries = _claim_deliveries(rest_service_id, instance_id)
+    finally:
+        _release_slot(rest_service_id)
+
+    if retry_delay is not None:
+        _schedule_delivery(rest_service_id, retry_delay)
+
+
+def call_service(submission_instance):
+    """Queue a submission for its form's rest services and send it."""
+    for rest_service_id in queue_deliveries(submission_instance):
+        deliver(rest_service_id)
+
+
+def call_service_on_commit(submission_instance):
+    """
+    Queue a submission for its form's rest services and send it once the
+    submission is committed, the other due deliveries of the services are
+    left to the workers.
+    """
+    rest_service_ids = queue_deliveries(submission_instance)
+    instance_id = submission_instance.pk
+
+    def send():
+        for rest_service_id in rest_service_ids:
+            try:
+                deliver(rest_service_id, instance_id)
+            except Exception:
+                # the submission is saved, its deliveries stay due
+                logging.getLogger('console_logger').exception(
+                    'Sending submission %s to rest service %s failed',
+                    instance_id, rest_service_id)
+
+    if rest_service_ids:
+        transaction.on_commit(send)
@@ -1,11 +1,13 @@
 import importlib
 from django.conf import settings
+from django.forms.models import model_to_dict
+from rest_framework.decorators import detail_route
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 
 from onadata.apps.api.permissions import RestServiceObjectPermissions
 from onadata.libs.serializers.textit_serializer import TextItSerializer
-from onadata.apps.restservice.models import RestService
+from onadata.apps.restservice.models import RestService, RestServiceStats
 from onadata.libs import filters
 from onadata.libs.serializers.restservices_serializer import \
     RestServiceSerializer
@@ -77,3 +79,14 @@ class RestServicesViewSet(AuthenticateHeaderMixin,
             serializer = self.get_serializer(instance)
 
         return Response(serializer.data)
+
+    @detail_route(methods=['GET'])
+    def stats(self, request, *args, **kwargs):
+        """Delivery metrics of the rest service."""
+        instance = self.get_object()
+        stats, created = RestServiceStats.objects.get_or_create(
+            rest_service=instance)
+        data = model_to_dict(stats, exclude=['id', 'rest_service'])
+        data['pending'] = instance.deliveries.count()
+
+        return Response(data)
@@ -2,13 +2,12 @@ import base64
 from datetime import datetime, date
 import json
 import re
-import StringIO
 
 from django.utils.translation import ugettext as _
 
 from onadata.apps.logger.models import XForm
 from onadata.apps.sms_support.tools import SMS_API_ERROR, SMS_PARSING_ERROR,\
-    SMS_SUBMISSION_REFUSED, sms_media_to_file, generate_instance,\
+    SMS_SUBMISSION_REFUSED, sms_media_to_file, generate_instances,\
     DEFAULT_SEPARATOR, NA_VALUE, META_FIELDS, MEDIA_TYPES,\
     DEFAULT_DATE_FORMAT, DEFAULT_DATETIME_FORMAT, SMS_SUBMISSION_ACCEPTED,\
     is_last
@@ -28,9 +27,10 @@ class SMSCastingError(ValueError):
         super(SMSCastingError, self).__init__(message)
 
 
-def parse_sms_text(xform, identity, text):
+def parse_sms_text(xform, identity, text, json_survey=None):
 
-    json_survey = json.loads(xform.json)
+    if json_survey is None:
+        json_survey = json.loads(xform.json)
 
     separator = json_survey.get('sms_separator', DEFAULT_SEPARATOR) \
         or DEFAULT_SEPARATOR
@@ -249,12 +249,35 @@ def process_incoming_smses(username, incomings,
     ''' Process Incoming (identity, text[, id_string]) SMS '''
 
     xforms = []
+    xmls = []
     medias = []
     xforms_notes = []
     responses = []
     json_submissions = []
     resp_str = {'success': _(u"[SUCCESS] Your submission has been accepted. "
                              u"It's ID is {{ id }}.")}
+    # forms and their parsed json looked up once per batch
+    xforms_by_lookup = {}
+    json_surveys = {}
+
+    def get_xform(**lookup):
+        key = tuple(sorted(lookup.items()))
+        if key not in xforms_by_lookup:
+            try:
+                xforms_by_lookup[key] = XForm.objects.select_related(
+                    'user').get(user__username=username, **lookup)
+            except XForm.DoesNotExist as e:
+                xforms_by_lookup[key] = e
+        if isinstance(xforms_by_lookup[key], Exception):
+            raise xforms_by_lookup[key]
+
+        return xforms_by_lookup[key]
+
+    def get_json_survey(xform):
+        if xform.pk not in json_surveys:
+            json_surveys[xform.pk] = json.loads(xform.json)
+
+        return json_surveys[xform.pk]
 
     def process_incoming(incoming, id_string):
         # assign variables
@@ -280,11 +303,9 @@ def process_incoming_smses(username, incomings,
         # we expect the SMS to be prefixed with the form's sms_id_string
         if id_string is None:
             keyword, text = [s.strip() for s in text.split(None, 1)]
-            xform = XForm.objects.get(user__username=username,
-                                      sms_id_string=keyword)
+            xform = get_xform(sms_id_string=keyword)
         else:
-            xform = XForm.objects.get(user__username=username,
-                                      id_string=id_string)
+            xform = get_xform(id_string=id_string)
 
         if not xform.allows_sms:
             responses.append({'code': SMS_SUBMISSION_REFUSED,
@@ -294,12 +315,11 @@ def process_incoming_smses(username, incomings,
             return
 
         # parse text into a dict object of groups with values
-        json_submission, medias_submission, notes = parse_sms_text(xform,
-                                                                   identity,
-                                                                   text)
+        json_survey = get_json_survey(xform)
+        json_submission, medias_submission, notes = parse_sms_text(
+            xform, identity, text, json_survey)
 
         # retrieve sms_response if exist in the form.
-        json_survey = json.loads(xform.json)
         if json_survey.get('sms_response'):
             resp_str.update({'success': json_survey.get('sms_response')})
 
@@ -342,8 +362,8 @@ def process_incoming_smses(username, incomings,
             except:
                 pass
 
-        # process_incoming expectes submission to be a file-like object
-        xforms.append(StringIO.StringIO(xml_submission))
+        xforms.append(xform)
+        xmls.append(xml_submission)
         medias.append(medias_submission)
         json_submissions.append(json_submission)
         xforms_notes.append(notes)
@@ -354,13 +374,13 @@ def process_incoming_smses(username, incomings,
         except Exception as e:
             responses.append({'code': SMS_PARSING_ERROR, 'text': str(e)})
 
-    for idx, xform in enumerate(xforms):
-        # generate_instance expects media as a request.FILES.values() list
-        xform_medias = [sms_media_to_file(f, n) for n, f in medias[idx]]
-        # create the instance in the data base
-        response = generate_instance(username=username,
-                                     xml_file=xform,
-                                     media_files=xform_medias)
+    # generate_instances expects media as request.FILES.values() lists
+    submissions = [(xform, xmls[idx],
+                    [sms_media_to_file(f, n) for n, f in medias[idx]])
+                   for idx, xform in enumerate(xforms)]
+    # create the instances in the data base
+    for idx, response in enumerate(generate_instances(username,
+                                                      submissions)):
         if response.get('code') == SMS_SUBMISSION_ACCEPTED:
             success_response = re.sub(r'{{\s*[i,d,I,D]{2}\s*}}',
                                       response.get('id'),
@@ -1,3 +1,4 @@
+from onadata.apps.sms_support.parser import process_incoming_smses
 from onadata.apps.sms_support.tools import SMS_API_ERROR, SMS_PARSING_ERROR,\
     SMS_SUBMISSION_ACCEPTED, SMS_SUBMISSION_REFUSED
 from test_base_sms import TestBaseSMS
@@ -49,3 +50,23 @@ class TestParser(TestBaseSMS):
         result = self.response_for_text(self.username,
                                         'test +b ff')
         self.assertEqual(result['code'], SMS_SUBMISSION_REFUSED)
+
+    def test_batch_of_submissions(self):
+        texts = ['test +a 1 y 1950-02-22 john doe',
+                 'test allo',
+                 'test +a 2 n 1960-03-12 jane doe',
+                 'test +b ff']
+        results = process_incoming_smses(
+            username=self.username, id_string=None,
+            incomings=[(self.random_identity(), text) for text in texts])
+
+        # errors are returned before the accepted submissions
+        self.assertEqual([r['code'] for r in results],
+                         [SMS_PARSING_ERROR, SMS_SUBMISSION_REFUSED,
+                          SMS_SUBMISSION_ACCEPTED, SMS_SUBMISSION_ACCEPTED])
+        instances = self.xform.instances.order_by('pk')
+        self.assertEqual([r['id'] for r in results[2:]],
+                         [i.uuid[:8] for i in instances])
+        self.assertEqual(instances[1].json['section1/name'], 'jane doe')
+        self.xform.refresh_from_db()
+        self.assertEqual(self.xform.num_of_submissions, 2)
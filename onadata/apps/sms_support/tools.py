@@ -5,19 +5,25 @@
 import mimetypes
 import io
 import copy
+from StringIO import StringIO
 from xml.parsers.expat import ExpatError
 
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.utils.translation import ugettext as _
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
 from django.http import HttpRequest
+from lxml import etree
 
 from onadata.apps.logger.xform_instance_parser import InstanceEmptyError,\
-    InstanceInvalidUserError, DuplicateInstance
+    InstanceInvalidUserError, DuplicateInstance, SubmissionXML
 from onadata.apps.logger.models.instance import FormInactiveError
-from onadata.apps.logger.models import XForm
+from onadata.apps.logger.models import Instance, XForm
+from onadata.apps.viewer.models.parsed_instance import \
+    call_post_submission_services
 from onadata.libs.utils.log import audit_log, Actions
-from onadata.libs.utils.logger_tools import create_instance
+from onadata.libs.utils.logger_tools import create_instance, \
+    create_xform_instances_in_bulk
 
 
 SMS_API_ERROR = 'SMS_API_ERROR'
@@ -103,7 +109,7 @@ def generate_instance(username, xml_file, media_files, uuid=None):
     except XForm.DoesNotExist:
         return {'code': SMS_SUBMISSION_REFUSED,
                 'text': _(u"Form does not exist on this account")}
-    except ExpatError:
+    except (ExpatError, etree.XMLSyntaxError):
         return {'code': SMS_INTERNAL_ERROR,
                 'text': _(u"Improperly formatted XML.")}
     except DuplicateInstance:
@@ -115,7 +121,16 @@ def generate_instance(username, xml_file, media_files, uuid=None):
                 'text': _(u"Unable to create submission.")}
 
     user = User.objects.get(username=username)
+    log_submission_created(user, instance)
 
+    xml_file.close()
+    if len(media_files):
+        [_file.close() for _file in media_files]
+
+    return submission_accepted(instance)
+
+
+def log_submission_created(user, instance):
     audit = {
         "xform": instance.xform.id_string
     }
@@ -124,15 +139,85 @@ def generate_instance(username, xml_file, media_files, uuid=None):
               _("Created submission on form %(id_string)s.") %
               {"id_string": instance.xform.id_string}, audit, HttpRequest())
 
-    xml_file.close()
-    if len(media_files):
-        [_file.close() for _file in media_files]
 
+def submission_accepted(instance):
     return {'code': SMS_SUBMISSION_ACCEPTED,
             'text': _(u"[SUCCESS] Your submission has been accepted."),
             'id': get_sms_instance_id(instance)}
 
 
+def generate_instances(username, submissions):
+    ''' Process a batch of XForm submissions, the submissions of a form
+        are inserted together.
+
+        Submissions with media files are processed one by one with
+        generate_instance.
+
+        :param string username: username of the Forms' owner
+        :param list submissions: (xform, XML string, media files) tuples
+
+        :returns a response dict for each submission. '''
+
+    responses = [None] * len(submissions)
+    submissions_by_xform = {}
+    for index, (xform, xml, media_files) in enumerate(submissions):
+        if media_files:
+            responses[index] = generate_instance(
+                username=username, xml_file=StringIO(xml),
+                media_files=media_files)
+        else:
+            submissions_by_xform.setdefault(xform, []).append((index, xml))
+
+    user = User.objects.get(username=username) \
+        if submissions_by_xform else None
+    for xform, xform_submissions in submissions_by_xform.items():
+        if not xform.downloadable:
+            for index, xml in xform_submissions:
+                responses[index] = {'code': SMS_SUBMISSION_REFUSED,
+                                    'text': _(u"Form is not active")}
+            continue
+
+        # submissions without an instanceID are duplicates of the same XML
+        # when the form collects start time
+        existing = set(Instance.objects.filter(
+            xform=xform, xml__in=[xml for index, xml in xform_submissions]
+        ).values_list('xml', flat=True)) if xform.has_start_time else set()
+        pending = []
+        for index, xml in xform_submissions:
+            if xml in existing:
+                responses[index] = {'code': SMS_SUBMISSION_REFUSED,
+                                    'text': _(u"Duplicate submission")}
+                continue
+            if xform.has_start_time:
+                existing.add(xml)
+
+            try:
+                pending.append((index, SubmissionXML(xml)))
+            except (ExpatError, etree.XMLSyntaxError):
+                responses[index] = {'code': SMS_INTERNAL_ERROR,
+                                    'text': _(u"Improperly formatted XML.")}
+
+        try:
+            with transaction.atomic():
+                instances = create_xform_instances_in_bulk(
+                    xform, [(submission_xml, None)
+                            for index, submission_xml in pending])
+        except (IntegrityError, InstanceEmptyError):
+            # leave the batch for generate_instance and its errors
+            for index, submission_xml in pending:
+                responses[index] = generate_instance(
+                    username=username,
+                    xml_file=StringIO(submission_xml.xml), media_files=[])
+            continue
+
+        for (index, submission_xml), instance in zip(pending, instances):
+            call_post_submission_services(instance.pk)
+            log_submission_created(user, instance)
+            responses[index] = submission_accepted(instance)
+
+    return responses
+
+
 def is_sms_related(json_survey):
     ''' Whether a form is considered to want sms Support
 
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewer', '0007_export_error_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='export',
+            name='append_state',
+            field=django.contrib.postgres.fields.jsonb.JSONField(
+                default=dict),
+        ),
+        migrations.AddField(
+            model_name='export',
+            name='data_version',
+            field=models.BigIntegerField(default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='export',
+            name='last_instance_id',
+            field=models.IntegerField(default=None, null=True),
+        ),
+    ]
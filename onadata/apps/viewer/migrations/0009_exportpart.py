@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewer', '0008_export_append_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportPart',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True,
+                                        serialize=False, verbose_name='ID')),
+                ('index', models.IntegerField()),
+                ('first_instance_id', models.IntegerField()),
+                ('last_instance_id', models.IntegerField()),
+                ('filepath', models.CharField(blank=True, max_length=255,
+                                              null=True)),
+                ('num_records', models.IntegerField(default=0)),
+                ('export', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='parts', to='viewer.Export')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='exportpart',
+            unique_together=set([('export', 'index')]),
+        ),
+    ]
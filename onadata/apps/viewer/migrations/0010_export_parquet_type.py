@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewer', '0009_exportpart'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='export',
+            name='export_type',
+            field=models.CharField(choices=[(b'xls', b'Excel'), (b'csv', b'CSV'), (b'zip', b'ZIP'), (b'kml', b'kml'), (b'csv_zip', b'CSV ZIP'), (b'sav_zip', b'SAV ZIP'), (b'sav', b'SAV'), (b'parquet', b'Parquet'), (b'external', b'Excel'), ('osm', 'osm'), (b'gsheets', b'Google Sheets')], default=b'xls', max_length=10),
+        ),
+    ]
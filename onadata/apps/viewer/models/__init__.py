@@ -2,3 +2,4 @@ from onadata.apps.viewer.models.parsed_instance import ParsedInstance  # noqa
 from onadata.apps.viewer.models.data_dictionary import DataDictionary  # noqa
 from onadata.apps.viewer.models.export import Export  # noqa
 from onadata.apps.viewer.models.column_rename import ColumnRename  # noqa
+from onadata.apps.viewer.models.export_part import ExportPart  # noqa
@@ -8,7 +8,7 @@ from django.db import models
 from django.db.models.signals import post_delete
 from django.utils.translation import ugettext as _
 
-from onadata.apps.logger.models import XForm
+from onadata.apps.logger.models import XForm, XFormDataVersion
 from onadata.libs.utils.common_tags import OSM
 from onadata.libs.utils import async_status
 
@@ -65,6 +65,7 @@ class Export(models.Model):
     CSV_ZIP_EXPORT = 'csv_zip'
     SAV_ZIP_EXPORT = 'sav_zip'
     SAV_EXPORT = 'sav'
+    PARQUET_EXPORT = 'parquet'
     EXTERNAL_EXPORT = 'external'
     OSM_EXPORT = OSM
     GOOGLE_SHEETS_EXPORT = 'gsheets'
@@ -77,6 +78,7 @@ class Export(models.Model):
         'csv_zip': 'zip',
         'sav_zip': 'zip',
         'sav': 'sav',
+        'parquet': 'zip',
         'kml': 'vnd.google-earth.kml+xml',
         OSM: OSM
     }
@@ -89,6 +91,7 @@ class Export(models.Model):
         (CSV_ZIP_EXPORT, 'CSV ZIP'),
         (SAV_ZIP_EXPORT, 'SAV ZIP'),
         (SAV_EXPORT, 'SAV'),
+        (PARQUET_EXPORT, 'Parquet'),
         (EXTERNAL_EXPORT, 'Excel'),
         (OSM, OSM),
         (GOOGLE_SHEETS_EXPORT, 'Google Sheets'),
@@ -140,6 +143,12 @@ class Export(models.Model):
 
     options = JSONField(default=dict, null=False)
     error_message = models.CharField(max_length=255, null=True, blank=True)
+    # the form's data version when the export was created
+    data_version = models.BigIntegerField(null=True, default=None)
+    # the last submission in an export new submissions can be appended to
+    # and what the appended rows have to match, see export_tools
+    last_instance_id = models.IntegerField(null=True, default=None)
+    append_state = JSONField(default=dict, null=False)
 
     class Meta:
         app_label = "viewer"
@@ -234,6 +243,12 @@ class Export(models.Model):
         except cls.DoesNotExist:
             return True
         else:
+            version = XFormDataVersion.get_version(xform.pk)
+            if latest_export.data_version is not None and \
+                    version is not None:
+                # submissions were added, edited or deleted
+                return latest_export.data_version != version[0]
+
             if latest_export.time_of_last_submission is not None \
                     and xform.time_of_last_submission_update() is not None:
                 return latest_export.time_of_last_submission <\
@@ -0,0 +1,33 @@
+from django.core.files.storage import get_storage_class
+from django.db import models
+from django.db.models.signals import post_delete
+
+from onadata.apps.viewer.models.export import Export
+
+
+class ExportPart(models.Model):
+    """
+    A part of a partitioned export, the rows of the submissions with ids
+    from first_instance_id to last_instance_id rendered by a task of its own
+    and merged into the export once all the parts are rendered.
+    """
+    export = models.ForeignKey(Export, related_name='parts')
+    index = models.IntegerField()
+    first_instance_id = models.IntegerField()
+    last_instance_id = models.IntegerField()
+    # the storage path of the rendered part, None until it is rendered
+    filepath = models.CharField(max_length=255, null=True, blank=True)
+    num_records = models.IntegerField(default=0)
+
+    class Meta:
+        app_label = "viewer"
+        unique_together = (("export", "index"),)
+
+
+def export_part_delete_callback(sender, instance=None, **kwargs):
+    if instance.filepath:
+        get_storage_class()().delete(instance.filepath)
+
+
+post_delete.connect(export_part_delete_callback, sender=ExportPart,
+                    dispatch_uid='export_part_delete_callback')
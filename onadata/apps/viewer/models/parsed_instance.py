@@ -1,5 +1,6 @@
 import datetime
 import json
+import logging
 import six
 import types
 
@@ -7,10 +8,12 @@ from dateutil import parser
 from django.conf import settings
 from django.db import connection
 from django.db import models
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.utils.translation import ugettext as _
 from django.db.models.query import EmptyQuerySet
 
+from onadata.apps.logger.models.attachment import Attachment
 from onadata.apps.logger.models.note import Note
 from onadata.apps.logger.models.instance import _get_attachments_from_instance
 from onadata.apps.logger.models.instance import Instance
@@ -19,11 +22,15 @@ from onadata.apps.logger.models.xform import _encode_for_mongo
 from onadata.libs.models.sorting import (
     json_order_by, json_order_by_params, sort_from_mongo_sort_str)
 from onadata.apps.restservice.tasks import call_service_async
+from onadata.apps.restservice.utils import call_service_on_commit
 from onadata.libs.utils.common_tags import ID, UUID, ATTACHMENTS, GEOLOCATION,\
     SUBMISSION_TIME, MONGO_STRFTIME, BAMBOO_DATASET_ID, DELETEDAT, TAGS,\
     NOTES, SUBMITTED_BY, VERSION, DURATION, EDITED
+from onadata.libs.utils.image_tools import \
+    create_attachment_thumbnails_async
 from onadata.libs.utils.osm import save_osm_data_async
 from onadata.libs.utils.model_tools import queryset_iterator
+from onadata.libs.utils.model_tools import server_side_cursor_iterator
 from onadata.libs.utils.mongo import _is_invalid_for_mongo
 from onadata.apps.viewer.parsed_instance_tools import get_where_clause
 from onadata.apps.viewer.parsed_instance_tools import NONE_JSON_FIELDS
@@ -80,7 +87,6 @@ def _parse_sort_fields(fields):
 def _query_iterator(sql, fields=None, params=[], count=False):
     if not sql:
         raise ValueError(_(u"Bad SQL: %s" % sql))
-    cursor = connection.cursor()
     sql_params = fields + params if fields is not None else params
 
     if count:
@@ -88,14 +94,19 @@ def _query_iterator(sql, fields=None, params=[], count=False):
         # is less hacky
         sql = u"SELECT COUNT(*) FROM (" + sql + ") AS CQ"
         fields = [u'count']
-
-    cursor.execute(sql, [unicode(i) for i in sql_params])
+        cursor = connection.cursor()
+        cursor.execute(sql, [unicode(i) for i in sql_params])
+        rows = cursor.fetchall()
+    else:
+        # stream the records instead of loading all of them
+        rows = server_side_cursor_iterator(
+            sql, [unicode(i) for i in sql_params])
 
     if fields is None:
-        for row in cursor.fetchall():
+        for row in rows:
             yield row[0]
     else:
-        for row in cursor.fetchall():
+        for row in rows:
             yield dict(zip(fields, row))
 
 
@@ -297,8 +308,10 @@ class ParsedInstance(models.Model):
 
     @classmethod
     def dicts(cls, xform):
-        qs = cls.objects.filter(instance__xform=xform)
+        qs = cls.objects.filter(instance__xform=xform).select_related(
+            'instance')
         for parsed_instance in queryset_iterator(qs):
+            parsed_instance.instance.xform = xform
             yield parsed_instance.to_dict()
 
     def _get_name_for_type(self, type_value):
@@ -356,19 +369,41 @@ def post_save_submission(sender, **kwargs):
     created = kwargs.get('created')
 
     if created:
-        if ASYNC_POST_SUBMISSION_PROCESSING_ENABLED:
-            call_service_async.apply_async(
-                args=[parsed_instance.instance_id],
-                countdown=1
-            )
-
-            save_osm_data_async.apply_async(
-                args=[parsed_instance.instance_id],
-                countdown=1
-            )
-        else:
-            call_service_async(parsed_instance.instance_id)
-            save_osm_data_async(parsed_instance.instance_id)
+        call_post_submission_services(parsed_instance.instance_id)
+
+
+def _create_attachment_thumbnails(attachment_ids):
+    try:
+        create_attachment_thumbnails_async.apply_async(args=[attachment_ids])
+    except Exception:
+        # the thumbnails are created when the images are first shown
+        logging.getLogger('console_logger').exception(
+            'Scheduling the thumbnails of attachments %s failed',
+            attachment_ids)
+
+
+def call_post_submission_services(instance_id):
+    """
+    Send a new submission to its rest services, save its OSM data and
+    create the thumbnails of its images.
+    """
+    if ASYNC_POST_SUBMISSION_PROCESSING_ENABLED:
+        call_service_async.apply_async(args=[instance_id], countdown=1)
+        save_osm_data_async.apply_async(args=[instance_id], countdown=1)
+    else:
+        # the rest services' backlog is left to the workers
+        call_service_on_commit(Instance.objects.get(pk=instance_id))
+        save_osm_data_async(instance_id)
+
+    # thumbnails are always left to a worker, they are not needed to
+    # answer the submission, the worker reads the attachments once they are
+    # committed
+    attachment_ids = list(Attachment.objects.filter(
+        instance_id=instance_id, mimetype__startswith='image').values_list(
+        'pk', flat=True))
+    if attachment_ids:
+        transaction.on_commit(
+            lambda: _create_attachment_thumbnails(attachment_ids))
 
 
 post_save.connect(post_save_submission, sender=ParsedInstance)
@@ -10,8 +10,9 @@ from onadata.apps.viewer.models.export import Export
 from onadata.libs.exceptions import NoRecordsFoundError
 from onadata.libs.utils.common_tools import get_boolean_value
 from onadata.libs.utils.export_tools import (
-    generate_attachments_zip_export, generate_export, generate_external_export,
-    generate_kml_export, generate_osm_export)
+    create_export_parts, generate_attachments_zip_export, generate_export,
+    generate_external_export, generate_kml_export, generate_osm_export,
+    is_partitioned_export, merge_export_parts, render_export_part)
 from onadata.libs.utils.logger_tools import report_exception
 
 EXPORT_QUERY_KEY = 'query'
@@ -78,6 +79,7 @@ def create_async_export(xform, export_type, query, force_xlsx, options=None):
         Export.CSV_EXPORT: create_csv_export,
         Export.CSV_ZIP_EXPORT: create_csv_zip_export,
         Export.SAV_ZIP_EXPORT: create_sav_zip_export,
+        Export.PARQUET_EXPORT: create_parquet_export,
         Export.ZIP_EXPORT: create_zip_export,
         Export.KML_EXPORT: create_kml_export,
         Export.OSM_EXPORT: create_osm_export,
@@ -144,6 +146,17 @@ def create_csv_export(username, id_string, export_id, **options):
     export = _get_export_object(id=export_id)
 
     try:
+        if is_partitioned_export(export, options):
+            # the parts are rendered in parallel, the last one to finish
+            # merges them into the export
+            columns, parts = create_export_parts(export, options)
+            for part in parts:
+                create_export_part.apply_async(
+                    args=[username, id_string, export_id, part.pk, columns],
+                    kwargs=options)
+
+            return export.id
+
         # though export is not available when for has 0 submissions, we
         # catch this since it potentially stops celery
         gen_export = generate_export(Export.CSV_EXPORT, export.xform,
@@ -167,6 +180,48 @@ def create_csv_export(username, id_string, export_id, **options):
         return gen_export.id
 
 
+def _fail_partitioned_export(username, id_string, export_id, e):
+    export = Export.objects.filter(pk=export_id).first()
+    if export is not None:
+        export.internal_status = Export.FAILED
+        export.save()
+        # parts still rendering find their part gone and stop there
+        export.parts.all().delete()
+
+    details = _get_export_details(username, id_string, export_id)
+    report_exception("CSV Export Exception: Export ID - "
+                     "%(export_id)s, /%(username)s/%(id_string)s" %
+                     details, e, sys.exc_info())
+
+
+@task(track_started=True)
+def create_export_part(username, id_string, export_id, part_id, columns,
+                       **options):
+    try:
+        is_last_part = render_export_part(part_id, columns, options)
+    except Exception as e:
+        _fail_partitioned_export(username, id_string, export_id, e)
+        raise
+    else:
+        if is_last_part:
+            merge_export_parts_async.apply_async(
+                args=[username, id_string, export_id, columns],
+                kwargs=options)
+
+
+@task(track_started=True)
+def merge_export_parts_async(username, id_string, export_id, columns,
+                             **options):
+    export = _get_export_object(id=export_id)
+    try:
+        gen_export = merge_export_parts(export, columns, options)
+    except Exception as e:
+        _fail_partitioned_export(username, id_string, export_id, e)
+        raise
+    else:
+        return gen_export.id
+
+
 @task(track_started=True)
 def create_kml_export(username, id_string, export_id, **options):
     # we re-query the db instead of passing model objects according to
@@ -297,6 +352,28 @@ def create_sav_zip_export(username, id_string, export_id, **options):
         return gen_export.id
 
 
+@task(track_started=True)
+def create_parquet_export(username, id_string, export_id, **options):
+    export = _get_export_object(id=export_id)
+    options["extension"] = Export.ZIP_EXPORT
+    try:
+        # though export is not available when for has 0 submissions, we
+        # catch this since it potentially stops celery
+        gen_export = generate_export(Export.PARQUET_EXPORT, export.xform,
+                                     export_id, options)
+    except (Exception, NoRecordsFoundError) as e:
+        export.internal_status = Export.FAILED
+        export.save()
+        # mail admins
+        details = _get_export_details(username, id_string, export_id)
+        report_exception("Parquet Export Exception: Export ID - "
+                         "%(export_id)s, /%(username)s/%(id_string)s" %
+                         details, e, sys.exc_info())
+        raise
+    else:
+        return gen_export.id
+
+
 @task(track_started=True)
 def create_external_export(username, id_string, export_id, **options):
     export = get_object_or_404(Export, id=export_id)
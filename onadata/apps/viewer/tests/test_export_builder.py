@@ -10,6 +10,8 @@ from collections import OrderedDict
 from django.conf import settings
 from django.core.files.temp import NamedTemporaryFile
 from openpyxl import load_workbook
+import pyarrow
+import pyarrow.parquet as parquet
 from pyxform.builder import create_survey_from_xls
 from savReaderWriter import SavReader
 from savReaderWriter import SavHeaderReader
@@ -1079,6 +1081,44 @@ class TestExportBuilder(TestBase):
             section_name = section['name'].replace('/', '_')
             _test_sav_file(section_name)
 
+    def test_to_zipped_parquet(self):
+        survey = self._create_childrens_survey()
+        export_builder = ExportBuilder()
+        export_builder.set_survey(survey)
+        temp_zip_file = NamedTemporaryFile(suffix='.zip')
+        export_builder.to_zipped_parquet(temp_zip_file.name, self.data)
+        temp_dir = tempfile.mkdtemp()
+        with zipfile.ZipFile(temp_zip_file.name, "r") as zip_file:
+            self.assertEqual(sorted(zip_file.namelist()), sorted([
+                '{0}.parquet'.format(section['name'].replace('/', '_'))
+                for section in export_builder.sections]))
+            zip_file.extractall(temp_dir)
+        temp_zip_file.close()
+
+        main = parquet.read_table(os.path.join(
+            temp_dir, '{0}.parquet'.format(survey.name))).to_pydict()
+        schema = parquet.read_schema(os.path.join(
+            temp_dir, '{0}.parquet'.format(survey.name)))
+        self.assertEqual(schema.field_by_name('age').type, pyarrow.int64())
+        self.assertEqual(schema.field_by_name('geo/_geolocation_latitude')
+                         .type, pyarrow.float64())
+        self.assertEqual(main['name'], [u'Abe', None])
+        self.assertEqual(main['age'], [35, None])
+        self.assertEqual(main['_index'], [1, 2])
+
+        children = parquet.read_table(
+            os.path.join(temp_dir, 'children.parquet')).to_pydict()
+        self.assertEqual(children['children/name'],
+                         [u'Mike', u'John', u'Imora'])
+        self.assertEqual(children['children/fav_colors/red'],
+                         [True, None, None])
+        self.assertEqual(children['_parent_index'], [1, 1, 1])
+        characters = parquet.read_table(os.path.join(
+            temp_dir, 'children_cartoons_characters.parquet')).to_pydict()
+        self.assertEqual(characters['children/cartoons/characters/name'],
+                         [u'Dee Dee', u'Dexter'])
+        shutil.rmtree(temp_dir)
+
     def test_to_sav_export_language(self):
         survey = self._create_childrens_survey('childrens_survey_sw.xls')
         export_builder = ExportBuilder()
@@ -1,6 +1,14 @@
-from onadata.apps.viewer.models.parsed_instance import get_where_clause
+import types
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from onadata.apps.viewer.models.parsed_instance import (
+    get_where_clause, query_data)
 
 from onadata.apps.main.tests.test_base import TestBase
+from onadata.libs.utils.model_tools import queryset_cursor_iterator,\
+    queryset_iterator
 
 
 class TestParsedInstance(TestBase):
@@ -21,3 +29,73 @@ class TestParsedInstance(TestBase):
         where, where_params = get_where_clause(query)
         self.assertEqual(where, [u"json::text ~* cast(%s as text)"])
         self.assertEqual(where_params, [11])
+
+    @override_settings(SERVER_SIDE_CURSOR_FETCH_SIZE=1)
+    def test_query_data_streams_all_records(self):
+        self._publish_transportation_form()
+        self._make_submissions()
+        instances = self.xform.instances.order_by('pk')
+
+        records = query_data(self.xform, fields='["_id", "_uuid"]',
+                             sort='{"_id": 1}')
+        self.assertIsInstance(records, types.GeneratorType)
+        self.assertEqual(
+            list(records),
+            [{u'_id': i.pk, u'_uuid': i.uuid} for i in instances])
+
+        count = query_data(self.xform, fields='["_id"]', count=True)
+        self.assertEqual(count, [{u'count': instances.count()}])
+
+    def test_queryset_cursor_iterator(self):
+        self._publish_transportation_form()
+        self._make_submissions()
+        queryset = self.xform.instances.order_by('pk')
+
+        self.assertEqual(
+            list(queryset_cursor_iterator(
+                queryset.values_list('pk', flat=True), fetch_size=3)),
+            list(queryset.values_list('pk', flat=True)))
+        self.assertEqual(
+            list(queryset_cursor_iterator(
+                queryset.values_list('pk', 'uuid'), fetch_size=3)),
+            list(queryset.values_list('pk', 'uuid')))
+
+    def test_queryset_iterator(self):
+        self._publish_transportation_form()
+        self._make_submissions()
+        queryset = self.xform.instances.order_by('-pk')
+        pks = sorted(queryset.values_list('pk', flat=True))
+
+        with CaptureQueriesContext(connection) as context:
+            instances = list(queryset_iterator(
+                queryset, chunksize=3, prefetch_related=['attachments']))
+        self.assertEqual([i.pk for i in instances], pks)
+        # two chunks and their attachments, without counts or offsets
+        self.assertEqual(len(context.captured_queries), 4)
+        self.assertFalse([q for q in context.captured_queries
+                          if 'COUNT(' in q['sql'] or 'OFFSET' in q['sql']])
+
+        self.assertEqual(
+            list(queryset_iterator(queryset, chunksize=2, values=['uuid'])),
+            [{'pk': i.pk, 'uuid': i.uuid} for i in instances])
+        instance = next(queryset_iterator(queryset, only=['uuid']))
+        self.assertIn('xml', instance.get_deferred_fields())
+
+    @override_settings(SERVER_SIDE_CURSOR_FETCH_SIZE=2)
+    def test_query_data_reads_from_a_server_side_cursor(self):
+        self._publish_transportation_form()
+        self._make_submissions()
+
+        def get_open_cursors():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT name FROM pg_cursors WHERE name LIKE 'onadata_%'")
+                return cursor.fetchall()
+
+        records = query_data(self.xform, fields='["_id"]')
+        next(records)
+        # the records are fetched from a named cursor while they are read
+        self.assertEqual(len(get_open_cursors()), 1)
+
+        self.assertEqual(len(list(records)), self.xform.instances.count() - 1)
+        self.assertEqual(get_open_cursors(), [])
@@ -1,9 +1,13 @@
 from celery import current_app
 from django.conf import settings
+from django.core.files.storage import default_storage
+from django.test.utils import override_settings
 
 from onadata.apps.main.tests.test_base import TestBase
+from onadata.apps.viewer.models import ExportPart
 from onadata.apps.viewer.models.export import Export
 from onadata.apps.viewer.tasks import create_async_export
+from onadata.libs.utils.export_tools import generate_export
 
 
 class TestExportTasks(TestBase):
@@ -38,3 +42,25 @@ class TestExportTasks(TestBase):
             self.assertTrue(export.id)
             self.assertIn("username", options)
             self.assertEquals(options.get("id_string"), self.xform.id_string)
+
+    def test_partitioned_csv_export(self):
+        self._publish_transportation_form()
+        self._make_submissions()
+        expected = generate_export(Export.CSV_EXPORT, self.xform, None, {})
+        with default_storage.open(expected.filepath) as f:
+            expected_csv = f.read()
+        Export.objects.all().delete()
+
+        with override_settings(EXPORT_PARTITION_SIZE=2):
+            export = create_async_export(
+                self.xform, Export.CSV_EXPORT, None, False, {})[0]
+
+        export = Export.objects.get(pk=export.pk)
+        self.assertEqual(export.internal_status, Export.SUCCESSFUL)
+        with default_storage.open(export.filepath) as f:
+            self.assertEqual(f.read(), expected_csv)
+        self.assertEqual(export.append_state['num_records'],
+                         self.xform.instances.count())
+        self.assertEqual(export.last_instance_id,
+                         self.xform.instances.latest('pk').pk)
+        self.assertFalse(ExportPart.objects.exists())
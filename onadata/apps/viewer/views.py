@@ -14,7 +14,7 @@ from django.core.files.storage import get_storage_class
 from django.core.urlresolvers import reverse
 from django.http import (
     HttpResponseForbidden, HttpResponseRedirect, HttpResponseNotFound,
-    HttpResponseBadRequest, HttpResponse
+    HttpResponseBadRequest, HttpResponse, StreamingHttpResponse
 )
 from django.shortcuts import get_object_or_404
 from django.shortcuts import redirect
@@ -22,7 +22,6 @@ from django.shortcuts import render
 from django.utils.translation import ugettext as _
 from django.views.decorators.http import require_POST
 from savReaderWriter import SPSSIOError
-from wsgiref.util import FileWrapper
 
 from onadata.apps.main.models import UserProfile, MetaData, TokenStorageModel
 from onadata.apps.logger.models import Attachment
@@ -43,8 +42,8 @@ from onadata.libs.utils.google import google_flow
 from onadata.libs.utils.log import audit_log, Actions
 from onadata.libs.utils.logger_tools import response_with_mimetype_and_name,\
     generate_content_disposition_header
-from onadata.libs.utils.viewer_tools import create_attachments_zipfile,\
-    export_def_from_filename, get_form
+from onadata.libs.utils.viewer_tools import export_def_from_filename,\
+    get_form, stream_attachments_zip
 from onadata.libs.utils.user_auth import has_permission, get_xform_and_perms,\
     helper_auth_helper
 from xls_writer import XlsWriter
@@ -240,7 +239,8 @@ def data_export(request, username, id_string, export_type):
     force_xlsx = request.GET.get('xls') != 'true'
     if export_type == Export.XLS_EXPORT and force_xlsx:
         extension = 'xlsx'
-    elif export_type in [Export.CSV_ZIP_EXPORT, Export.SAV_ZIP_EXPORT]:
+    elif export_type in [Export.CSV_ZIP_EXPORT, Export.SAV_ZIP_EXPORT,
+                         Export.PARQUET_EXPORT]:
         extension = 'zip'
 
     audit = {
@@ -597,36 +597,29 @@ def zip_export(request, username, id_string):
         id_string = None
 
     attachments = Attachment.objects.filter(instance__xform=xform)
-    zip_file = None
+    audit = {
+        "xform": xform.id_string,
+        "export_type": Export.ZIP_EXPORT
+    }
+    audit_log(
+        Actions.EXPORT_CREATED, request.user, owner,
+        _("Created ZIP export on '%(id_string)s'.") %
+        {
+            'id_string': xform.id_string,
+        }, audit, request)
+    # log download as well
+    audit_log(
+        Actions.EXPORT_DOWNLOADED, request.user, owner,
+        _("Downloaded ZIP export on '%(id_string)s'.") %
+        {
+            'id_string': xform.id_string,
+        }, audit, request)
 
-    try:
-        zip_file = create_attachments_zipfile(attachments)
-        audit = {
-            "xform": xform.id_string,
-            "export_type": Export.ZIP_EXPORT
-        }
-        audit_log(
-            Actions.EXPORT_CREATED, request.user, owner,
-            _("Created ZIP export on '%(id_string)s'.") %
-            {
-                'id_string': xform.id_string,
-            }, audit, request)
-        # log download as well
-        audit_log(
-            Actions.EXPORT_DOWNLOADED, request.user, owner,
-            _("Downloaded ZIP export on '%(id_string)s'.") %
-            {
-                'id_string': xform.id_string,
-            }, audit, request)
-        if request.GET.get('raw'):
-            id_string = None
-
-        response = response_with_mimetype_and_name('zip', id_string)
-        response.write(FileWrapper(zip_file))
-        response['Content-Length'] = zip_file.tell()
-        zip_file.seek(0)
-    finally:
-        zip_file and zip_file.close()
+    # the archive is written to the response as the files are read
+    response = StreamingHttpResponse(stream_attachments_zip(attachments),
+                                     content_type='application/zip')
+    response['Content-Disposition'] = generate_content_disposition_header(
+        id_string, 'zip')
 
     return response
 
@@ -3,6 +3,7 @@ from django.db import connection
 
 from onadata.libs.utils.common_tags import SUBMISSION_TIME
 from onadata.apps.logger.models.data_view import DataView
+from onadata.apps.logger.models.rollup import XFormRollup
 
 
 def _dictfetchall(cursor):
@@ -23,15 +24,7 @@ def _execute_query(query, to_dict=True):
 
 
 def _get_fields_of_type(xform, types):
-    k = []
-    survey_elements = flatten(
-        [xform.get_survey_elements_of_type(t) for t in types])
-
-    for element in survey_elements:
-        name = element.get_abbreviated_xpath()
-        k.append(name)
-
-    return k
+    return xform.get_survey_xpaths_of_type(*types)
 
 
 def _additional_data_view_filters(data_view):
@@ -51,6 +44,33 @@ def _json_query(field):
     return "json->>'%s'" % field
 
 
+def _get_rollup(xform, field, group_by=None, data_view=None):
+    """The rollup to read a form's counts from, None to group submissions."""
+    if data_view or isinstance(group_by, list):
+        return None
+
+    return XFormRollup.get_rollup(xform, field, group_by)
+
+
+def _alias(name):
+    return u'"%s"' % name.replace('%', '%%')
+
+
+def query_rollup(rollup, columns, group_by):
+    """
+    Select columns of a rollup's counts grouped by group_by, in the order
+    the values were first counted.
+    """
+    query = u"SELECT " + u", ".join(columns) + \
+        u" FROM logger_xformrollupcount WHERE rollup_id = %s" \
+        u" GROUP BY " + group_by + \
+        u" HAVING SUM(count) > 0 ORDER BY MIN(id)"
+    cursor = connection.cursor()
+    cursor.execute(query, [rollup.pk])
+
+    return _dictfetchall(cursor)
+
+
 def _postgres_count_group_field_n_group_by(field, name, xform, group_by,
                                            data_view):
     string_args = _query_args(field, name, xform, group_by)
@@ -184,6 +204,13 @@ def get_form_submissions_grouped_by_field(xform, field, name=None,
     if not name:
         name = field
 
+    rollup = _get_rollup(xform, field, data_view=data_view)
+    if rollup is not None:
+        return query_rollup(
+            rollup,
+            [u"value AS " + _alias(name), u"SUM(count)::bigint AS count"],
+            u"value")
+
     return _execute_query(_postgres_count_group(field, name, xform, data_view))
 
 
@@ -193,6 +220,17 @@ def get_form_submissions_aggregated_by_select_one(xform, field, name=None,
     """Number of submissions grouped and aggregated by select_one field"""
     if not name:
         name = field
+
+    rollup = _get_rollup(xform, field, group_by, data_view)
+    if rollup is not None:
+        return query_rollup(
+            rollup,
+            [u"group_value AS " + _alias(group_by),
+             u"SUM(value::numeric * count) AS sum",
+             u"SUM(value::numeric * count) / NULLIF(SUM(count) FILTER "
+             u"(WHERE value IS NOT NULL), 0) AS mean"],
+            u"group_value")
+
     return _execute_query(_postgres_aggregate_group_by(field,
                                                        name,
                                                        xform,
@@ -205,6 +243,16 @@ def get_form_submissions_grouped_by_select_one(xform, field, group_by,
     """Number of submissions disaggregated by select_one field"""
     if not name:
         name = field
+
+    rollup = _get_rollup(xform, field, group_by, data_view)
+    if rollup is not None:
+        return query_rollup(
+            rollup,
+            [u"value AS " + _alias(name),
+             u"group_value AS " + _alias(group_by),
+             u"SUM(count)::bigint AS count"],
+            u"value, group_value")
+
     return _execute_query(_postgres_count_group_field_n_group_by(field,
                                                                  name,
                                                                  xform,
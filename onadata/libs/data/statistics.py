@@ -1,6 +1,20 @@
+from hashlib import md5
+
 import numpy as np
+from django.core.cache import cache
+from django.db import connection
+
 from onadata.apps.api.tools import DECIMAL_PRECISION
+from onadata.apps.logger.models.data_version import XFormDataVersion
 from onadata.libs.data.query import get_field_records, get_numeric_fields
+from onadata.libs.utils.cache_tools import XFORM_STATS_CACHE
+
+# values of a field that are numbers, anything else is left out of its stats
+NUMBER_PATTERN = r'^\s*[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?\s*$'
+STATS_AGGREGATES = (
+    u"min({0}), max({0}), avg({0}), "
+    u"percentile_cont(0.5) WITHIN GROUP (ORDER BY {0}), "
+    u"mode() WITHIN GROUP (ORDER BY {0})")
 
 
 def _chk_asarray(a, axis):
@@ -45,12 +59,72 @@ def get_median_for_field(field, xform):
     return np.median(get_field_records(field, xform))
 
 
+def _query_stats(xform, fields):
+    """
+    Compute the min, max, mean, median and mode of all the fields in a
+    single scan of the form's submissions.
+    """
+    values = []
+    params = []
+    for i, field in enumerate(fields):
+        values.append(u"CASE WHEN json->>%s ~ %s THEN (json->>%s)::float8 "
+                      u"END AS f{}".format(i))
+        params.extend([field, NUMBER_PATTERN, field])
+    sql = (u"SELECT " + u", ".join(
+        [STATS_AGGREGATES.format(u"f%d" % i) for i in range(len(fields))]) +
+        u" FROM (SELECT " + u", ".join(values) + u" FROM logger_instance"
+        u" WHERE xform_id = %s AND deleted_at IS NULL) AS v")
+    params.append(xform.pk)
+
+    cursor = connection.cursor()
+    cursor.execute(sql, params)
+    row = cursor.fetchone()
+
+    stats = {}
+    for i, field in enumerate(fields):
+        _min, _max, mean, median, mode = row[i * 5:i * 5 + 5]
+        stats[field] = {
+            'min': _min,
+            'max': _max,
+            'range': _max - _min if _max is not None else None,
+            'mean': mean,
+            'median': median,
+            'mode': mode
+        }
+
+    return stats
+
+
+def get_stats(xform, field=None):
+    """
+    Return the stats of a form's numeric fields, or of field, cached until
+    the form's data changes.
+    """
+    fields = [field] if field else get_numeric_fields(xform)
+    if not fields:
+        return {}
+
+    version = XFormDataVersion.get_version(xform.pk)
+    if version is None:
+        return _query_stats(xform, fields)
+
+    key = u'{}{}-{}-{}'.format(XFORM_STATS_CACHE, xform.pk, version[0], md5(
+        u','.join(fields).encode('utf-8')).hexdigest())
+    stats = cache.get(key)
+    if stats is None:
+        stats = _query_stats(xform, fields)
+        cache.set(key, stats)
+
+    return stats
+
+
+def _round(value):
+    return value if value is None else round(value, DECIMAL_PRECISION)
+
+
 def get_median_for_numeric_fields_in_form(xform, field=None):
-    data = {}
-    for field_name in [field] if field else get_numeric_fields(xform):
-        median = get_median_for_field(field_name, xform)
-        data.update({field_name: median})
-    return data
+    return dict([(field_name, stats['median'])
+                 for field_name, stats in get_stats(xform, field).items()])
 
 
 def get_mean_for_field(field, xform):
@@ -58,11 +132,8 @@ def get_mean_for_field(field, xform):
 
 
 def get_mean_for_numeric_fields_in_form(xform, field):
-    data = {}
-    for field_name in [field] if field else get_numeric_fields(xform):
-        mean = get_mean_for_field(field_name, xform)
-        data.update({field_name: round(mean, DECIMAL_PRECISION)})
-    return data
+    return dict([(field_name, _round(stats['mean']))
+                 for field_name, stats in get_stats(xform, field).items()])
 
 
 def get_mode_for_field(field, xform):
@@ -72,11 +143,8 @@ def get_mode_for_field(field, xform):
 
 
 def get_mode_for_numeric_fields_in_form(xform, field=None):
-    data = {}
-    for field_name in [field] if field else get_numeric_fields(xform):
-        mode = get_mode_for_field(field_name, xform)
-        data.update({field_name: round(mode, DECIMAL_PRECISION)})
-    return data
+    return dict([(field_name, _round(stats['mode']))
+                 for field_name, stats in get_stats(xform, field).items()])
 
 
 def get_min_max_range_for_field(field, xform):
@@ -89,25 +157,24 @@ def get_min_max_range_for_field(field, xform):
 
 def get_min_max_range(xform, field=None):
     data = {}
-    for field_name in [field] if field else get_numeric_fields(xform):
-        _min, _max, _range = get_min_max_range_for_field(field_name, xform)
-        data[field_name] = {'max': _max, 'min': _min, 'range': _range}
+    for field_name, stats in get_stats(xform, field).items():
+        data[field_name] = {
+            'max': stats['max'],
+            'min': stats['min'],
+            'range': stats['range']
+        }
     return data
 
 
 def get_all_stats(xform, field=None):
     data = {}
-    for field_name in [field] if field else get_numeric_fields(xform):
-        _min, _max, _range = get_min_max_range_for_field(field_name, xform)
-        mode = get_mode_for_field(field_name, xform)
-        mean = get_mean_for_field(field_name, xform)
-        median = get_median_for_field(field_name, xform)
+    for field_name, stats in get_stats(xform, field).items():
         data[field_name] = {
-            'mean': round(mean, DECIMAL_PRECISION),
-            'median': median,
-            'mode': round(mode, DECIMAL_PRECISION),
-            'max': _max,
-            'min': _min,
-            'range': _range
+            'mean': _round(stats['mean']),
+            'median': stats['median'],
+            'mode': _round(stats['mode']),
+            'max': stats['max'],
+            'min': stats['min'],
+            'range': stats['range']
         }
     return data
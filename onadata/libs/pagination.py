@@ -1,7 +1,96 @@
+import base64
+import binascii
+
+from django.utils.translation import ugettext as _
+from rest_framework.exceptions import ParseError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class StandardPageNumberPagination(PageNumberPagination):
     page_size = 1000
     page_size_query_param = 'page_size'
     max_page_size = 10000
+
+
+class KeysetPagination(object):
+    """
+    Pages a queryset ordered by id, each page starting after the last id of
+    the previous page instead of at an offset, so that deep pages cost the
+    same as the first one.
+
+    A page is requested with ?after_id=<id> or with the opaque
+    ?cursor=<token> of the previous page's next link.
+    """
+    after_id_query_param = 'after_id'
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    limit_query_param = 'limit'
+    page_size = StandardPageNumberPagination.page_size
+    max_page_size = StandardPageNumberPagination.max_page_size
+
+    @classmethod
+    def is_requested(cls, request):
+        return any([k in request.query_params for k in
+                    [cls.after_id_query_param, cls.cursor_query_param]])
+
+    @staticmethod
+    def encode_cursor(after_id):
+        return base64.urlsafe_b64encode(str(after_id)).rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            cursor = str(cursor)
+
+            return int(base64.urlsafe_b64decode(
+                cursor + '=' * (-len(cursor) % 4)))
+        except (TypeError, UnicodeError, ValueError, binascii.Error):
+            raise ParseError(_(u"Invalid cursor %(cursor)s" %
+                               {'cursor': cursor}))
+
+    def get_after_id(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            return self.decode_cursor(cursor)
+
+        after_id = request.query_params.get(self.after_id_query_param) or 0
+        try:
+            return int(after_id)
+        except ValueError:
+            raise ParseError(_(u"Invalid after_id %(after_id)s" %
+                               {'after_id': after_id}))
+
+    def get_page_size(self, request):
+        for param in [self.page_size_query_param, self.limit_query_param]:
+            try:
+                page_size = int(request.query_params[param])
+            except (KeyError, ValueError):
+                continue
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+
+        return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Return the rows of a values_list() queryset, whose first value is
+        the id, that come after the requested id.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        page = list(queryset.filter(pk__gt=self.get_after_id(request))
+                    .order_by('pk')[:page_size])
+        self.next_id = page[-1][0] if len(page) == page_size else None
+
+        return page
+
+    def get_next_link(self):
+        if self.next_id is None:
+            return None
+
+        url = remove_query_param(self.request.build_absolute_uri(),
+                                 self.after_id_query_param)
+
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.encode_cursor(self.next_id))
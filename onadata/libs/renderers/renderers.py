@@ -65,6 +65,15 @@ class SAVZIPRenderer(BaseRenderer):
         return json.dumps(data) if isinstance(data, dict) else data
 
 
+class ParquetRenderer(BaseRenderer):
+    media_type = 'application/octet-stream'
+    format = 'parquet'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data) if isinstance(data, dict) else data
+
+
 class SurveyRenderer(BaseRenderer):
     media_type = 'application/xml'
     format = 'xml'
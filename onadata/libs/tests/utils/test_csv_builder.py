@@ -3,8 +3,10 @@ import os
 from tempfile import NamedTemporaryFile
 
 from django.utils.dateparse import parse_datetime
+from mock import patch
 
 from onadata.apps.main.tests.test_base import TestBase
+from onadata.apps.logger.models import XFormColumnSchema
 from onadata.apps.logger.models.xform import XForm
 from onadata.apps.logger.xform_instance_parser import xform_instance_to_dict
 from onadata.libs.utils.csv_builder import AbstractDataFrameBuilder,\
@@ -619,3 +621,55 @@ class TestCSVDataFrameBuilder(TestBase):
         # close and delete file
         csv_file.close()
         os.unlink(temp_file.name)
+
+    def _export_csv_rows(self):
+        csv_df_builder = CSVDataFrameBuilder(self.user.username,
+                                             self.xform.id_string,
+                                             include_images=False)
+        temp_file = NamedTemporaryFile(suffix=".csv")
+        csv_df_builder.export_to(temp_file.name)
+        with open(temp_file.name) as csv_file:
+            rows = [row for row in csv.reader(csv_file)]
+        temp_file.close()
+
+        return rows
+
+    def test_csv_export_uses_stored_repeat_columns(self):
+        self._publish_nested_repeats_form()
+        self._submit_fixture_instance("nested_repeats", "01")
+        self.assertFalse(
+            XFormColumnSchema.objects.filter(xform=self.xform).exists())
+
+        # the first export discovers the columns and stores them
+        rows = self._export_csv_rows()
+        schema = XFormColumnSchema.objects.get(xform=self.xform)
+        self.assertFalse(schema.is_stale())
+        self.assertEqual(schema.last_instance_id,
+                         self.xform.instances.latest('pk').pk)
+
+        # new submissions update the stored columns
+        self._submit_fixture_instance("nested_repeats", "02")
+        schema = XFormColumnSchema.objects.get(xform=self.xform)
+        self.assertFalse(schema.is_stale())
+        self.assertEqual(schema.last_instance_id,
+                         self.xform.instances.latest('pk').pk)
+
+        with patch.object(CSVDataFrameBuilder, '_update_columns_from_data',
+                          autospec=True) as mock_discover:
+            single_pass_rows = self._export_csv_rows()
+            self.assertFalse(mock_discover.called)
+        self.assertEqual(len(single_pass_rows), len(rows) + 1)
+
+        # the stored columns give the same export as discovering them
+        XFormColumnSchema.objects.filter(xform=self.xform).delete()
+        self.assertEqual(single_pass_rows, self._export_csv_rows())
+
+    def test_stored_repeat_columns_stale_after_edit(self):
+        self._publish_nested_repeats_form()
+        self._submit_fixture_instance("nested_repeats", "01")
+        self._export_csv_rows()
+        schema = XFormColumnSchema.objects.get(xform=self.xform)
+
+        instance = self.xform.instances.first()
+        instance.set_deleted()
+        self.assertTrue(schema.is_stale())
@@ -3,6 +3,7 @@ import os
 import re
 from cStringIO import StringIO
 from django.conf import settings
+from django.test.utils import override_settings
 from onadata.libs.utils import csv_import
 from onadata.apps.logger.models import XForm
 from onadata.apps.logger.models import Instance
@@ -109,6 +110,58 @@ class CSVImportTestCase(TestBase):
         self.assertEqual(Instance.objects.count(), count,
                          u'submit_csv edits #2 test Failed!')
 
+    def _publish_tutorial_form(self):
+        xls_file_path = os.path.join(settings.PROJECT_ROOT, "apps", "main",
+                                     "tests", "fixtures", "tutorial.xls")
+        self._publish_xls_file(xls_file_path)
+        self.xform = XForm.objects.get()
+
+    @override_settings(CSV_IMPORT_BATCH_SIZE=4)
+    def test_submit_csv_in_bulk(self):
+        self._publish_tutorial_form()
+
+        result = csv_import.submit_csv(self.user.username, self.xform,
+                                       self.good_csv, bulk=True)
+        self.assertEqual(result['additions'], 9)
+        self.assertEqual(Instance.objects.count(), 9)
+        self.assertEqual(Instance.objects.filter(user=self.user).count(), 8)
+        self.xform.refresh_from_db()
+        self.assertEqual(self.xform.num_of_submissions, 9)
+        instance = Instance.objects.filter(user=self.user).first()
+        self.assertEqual(instance.json['_submitted_by'], self.user.username)
+        self.assertEqual(instance.parsed_instance.instance, instance)
+
+        edit_csv = open(os.path.join(self.fixtures_dir, 'edit.csv'))
+        edit_csv = StringIO(edit_csv.read().format(
+            *[x.get('uuid') for x in Instance.objects.values('uuid')]))
+        result = csv_import.submit_csv(self.user.username, self.xform,
+                                       edit_csv, bulk=True)
+        self.assertEqual(Instance.objects.count(), 9)
+        self.assertEqual(result['updates'], 4)
+
+    @override_settings(CSV_IMPORT_BATCH_SIZE=4)
+    def test_submit_csv_in_bulk_rollback(self):
+        self._publish_tutorial_form()
+        create_instances = csv_import.create_xform_instances_in_bulk
+
+        def create_two_batches(xform, submissions):
+            if Instance.objects.count():
+                raise ValueError(u'Batch failed')
+
+            return create_instances(xform, submissions)
+
+        with mock.patch(
+                'onadata.libs.utils.csv_import.'
+                'create_xform_instances_in_bulk',
+                side_effect=create_two_batches):
+            result = csv_import.submit_csv(self.user.username, self.xform,
+                                           self.good_csv, bulk=True)
+
+        self.assertEqual(result.get('error'), u'Batch failed')
+        self.assertEqual(Instance.objects.count(), 0)
+        self.xform.refresh_from_db()
+        self.assertEqual(self.xform.num_of_submissions, 0)
+
     def test_import_non_utf8_csv(self):
         xls_file_path = os.path.join(self.fixtures_dir, "mali_health.xls")
         self._publish_xls_file(xls_file_path)
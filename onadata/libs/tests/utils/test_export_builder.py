@@ -0,0 +1,129 @@
+import os
+import time
+from unittest import skipUnless
+
+from django.conf import settings
+from pyxform.builder import create_survey_from_xls
+
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.libs.utils.common_tags import INDEX, PARENT_INDEX
+from onadata.libs.utils.export_builder import ExportBuilder, \
+    dict_to_joined_export
+
+
+def _get_record(i):
+    return {
+        'name': 'Abe %d' % i,
+        'age': '35',
+        'tel/telLg==office': '020123456',
+        'children': [
+            {
+                'children/name': 'Mike',
+                'children/age': '5',
+                'children/fav_colors': 'red blue',
+                'children/iceLg==creams': 'vanilla chocolate',
+                'children/cartoons': [
+                    {
+                        'children/cartoons/name': 'Tom & Jerry',
+                        'children/cartoons/why': 'Tom is silly',
+                        'children/cartoons/characters': [
+                            {
+                                'children/cartoons/characters/name': 'Tom',
+                                'children/cartoons/characters/good_or_evil':
+                                'good'
+                            }
+                        ]
+                    }
+                ]
+            },
+            {
+                'children/name': 'John',
+                'children/age': '2',
+                'children/fav_colors': 'pink',
+                'children/cartoons': []
+            }
+        ]
+    }
+
+
+class TestExportBuilderRows(TestBase):
+
+    def setUp(self):
+        super(TestExportBuilderRows, self).setUp()
+        self.survey = create_survey_from_xls(os.path.join(
+            settings.PROJECT_ROOT, 'apps', 'logger', 'tests', 'fixtures',
+            'childrens_survey.xls'))
+        self.export_builder = ExportBuilder()
+        self.export_builder.set_survey(self.survey)
+
+    def _get_output(self, record, index, indices, data_dictionary=None):
+        survey_name = self.survey.name
+        output = ExportBuilder.decode_mongo_encoded_section_names(
+            dict_to_joined_export(record, index, indices, survey_name,
+                                  self.survey, record, [], data_dictionary))
+        output.setdefault(survey_name, {})
+        output[survey_name][INDEX] = index
+        output[survey_name][PARENT_INDEX] = -1
+
+        return output
+
+    def _get_rows_per_row(self, records):
+        """Rows set up section by section for every record."""
+        indices = {}
+        rows = []
+        for index, record in enumerate(records, start=1):
+            output = self._get_output(record, index, indices)
+            for section in self.export_builder.sections:
+                fields = self.export_builder.get_fields(
+                    None, section, 'xpath')
+                row = output.get(section['name'])
+                for child_row in row if type(row) == list else [row]:
+                    if child_row is not None:
+                        child_row = self.export_builder.pre_process_row(
+                            child_row, section)
+                        rows.append([child_row.get(f) for f in fields])
+
+        return rows
+
+    def _get_rows_with_section_writers(self, records):
+        """Rows written with the section writers set up once."""
+        section_writers = self.export_builder._get_section_writers(None)
+        indices = {}
+        rows = []
+        for index, record in enumerate(records, start=1):
+            output = self._get_output(
+                record, index, indices, self.export_builder.dd)
+            for section_name, fields, process_row in section_writers:
+                row = output.get(section_name)
+                for child_row in row if type(row) == list else [row]:
+                    if child_row is not None:
+                        child_row = process_row(child_row)
+                        rows.append([child_row.get(f) for f in fields])
+
+        return rows
+
+    def test_section_writers_rows(self):
+        records = [_get_record(i) for i in range(3)]
+        rows = self._get_rows_with_section_writers(records)
+
+        self.assertEqual(rows, self._get_rows_per_row(records))
+        # the select multiples of the first child are split
+        self.assertIn(True, rows[1])
+
+    @skipUnless(os.environ.get('ONADATA_BENCHMARKS'),
+                'set ONADATA_BENCHMARKS to run benchmarks')
+    def test_benchmark_section_writers(self):
+        num_records = 2000
+        records = [_get_record(i) for i in range(num_records)]
+
+        timings = []
+        for get_rows in [self._get_rows_per_row,
+                         self._get_rows_with_section_writers]:
+            start = time.time()
+            get_rows(records)
+            timings.append(time.time() - start)
+
+        self.assertLess(timings[1], timings[0])
+        print "Rows of %d records per second, set up per row: %d, " \
+            "section writers: %d" % (num_records, num_records / timings[0],
+                                     num_records / timings[1])
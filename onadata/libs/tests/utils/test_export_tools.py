@@ -1,9 +1,11 @@
 import os
+import zipfile
 from datetime import date, datetime, timedelta
 from django.conf import settings
 from django.core.files.storage import default_storage
 from django.contrib.sites.models import Site
 from django.test.utils import override_settings
+from mock import patch
 from pyxform.builder import create_survey_from_xls
 from pyxform.tests_v1.pyxform_test_case import PyxformTestCase
 from django.core.files.temp import NamedTemporaryFile
@@ -15,6 +17,7 @@ from onadata.apps.viewer.models.export import Export
 from onadata.libs.utils.export_builder import encode_if_str
 from onadata.libs.utils.export_tools import check_pending_export
 from onadata.libs.utils.export_tools import generate_export
+from onadata.libs.utils.export_tools import get_append_base
 from onadata.libs.utils.export_tools import generate_osm_export
 from onadata.libs.utils.export_builder import get_value_or_attachment_uri
 from onadata.libs.utils.export_tools import parse_request_export_options
@@ -420,3 +423,57 @@ class TestExportTools(PyxformTestCase, TestBase):
         test_export = check_pending_export(self.xform, Export.CSV_EXPORT, {})
 
         self.assertIsNone(test_export)
+
+    def _read_export(self, export):
+        with default_storage.open(export.filepath) as f:
+            if export.export_type == Export.CSV_EXPORT:
+                return f.read()
+
+            zip_file = zipfile.ZipFile(f)
+            return dict((name, zip_file.read(name))
+                        for name in zip_file.namelist())
+
+    def _assert_export_appended(self, export_type, options):
+        self._publish_transportation_form()
+        self._submit_transport_instance(0)
+        self._submit_transport_instance(1)
+        export = generate_export(export_type, self.xform, None, options)
+        self.assertEqual(export.last_instance_id,
+                         self.xform.instances.latest('pk').pk)
+        self.assertEqual(export.append_state['num_records'], 2)
+
+        self._submit_transport_instance(2)
+        with patch.object(ExportBuilder, 'to_flat_csv_export') as csv_export,\
+                patch.object(ExportBuilder, 'to_zipped_csv') as zipped_csv:
+            appended = generate_export(export_type, self.xform, None, options)
+            self.assertFalse(csv_export.called or zipped_csv.called)
+        self.assertEqual(appended.last_instance_id,
+                         self.xform.instances.latest('pk').pk)
+        self.assertEqual(appended.append_state['num_records'], 3)
+
+        # an edited submission means the export is rebuilt
+        instance = self.xform.instances.earliest('pk')
+        instance.save()
+        rebuilt = generate_export(export_type, self.xform, None, options)
+        self.assertEqual(self._read_export(appended),
+                         self._read_export(rebuilt))
+
+    def test_csv_export_appends_new_submissions(self):
+        self._assert_export_appended(Export.CSV_EXPORT, {})
+
+    def test_csv_zip_export_appends_new_submissions(self):
+        self._assert_export_appended(
+            Export.CSV_ZIP_EXPORT, {'extension': 'zip'})
+
+    def test_export_with_deleted_submission_is_rebuilt(self):
+        self._publish_transportation_form()
+        self._submit_transport_instance(0)
+        self._submit_transport_instance(1)
+        generate_export(Export.CSV_EXPORT, self.xform, None, {})
+        options = Export.objects.get().options
+
+        self.assertIsNotNone(
+            get_append_base(self.xform, Export.CSV_EXPORT, options))
+        self.xform.instances.earliest('pk').delete()
+        self.assertIsNone(
+            get_append_base(self.xform, Export.CSV_EXPORT, options))
@@ -1,23 +1,18 @@
-import requests
-from httmock import urlmatch, HTTMock
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 
 from onadata.libs.utils.image_tools import resize
 from onadata.apps.main.tests.test_base import TestBase
 
 
-@urlmatch(netloc=r'(.*\.)?localhost:8000$', path='/media/test.jpg')
-def image_url_mock(url, request):
-    response = requests.Response()
-    response.status_code = 200
-    response._content = "test.jpg"
-    return response
-
-
 class TestImageTools(TestBase):
     def test_resize_exception_is_handled(self):
-        with HTTMock(image_url_mock):
+        filename = default_storage.save('test.jpg', ContentFile("test.jpg"))
+        try:
             with self.assertRaises(Exception) as io_error:
-                resize('test.jpg')
+                resize(filename)
+        finally:
+            default_storage.delete(filename)
 
         self.assertEqual(io_error.exception.message,
                          u'The image file couldn\'t be identified')
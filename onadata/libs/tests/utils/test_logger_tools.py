@@ -1,6 +1,17 @@
+import os
 import re
 
-from onadata.libs.utils.logger_tools import generate_content_disposition_header
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from mock import patch
+
+from onadata.apps.logger.models import Instance
+from onadata.apps.logger.xform_instance_parser import (
+    XFormInstanceParser, clean_and_parse_xml)
+from onadata.libs.utils.common_tags import MONGO_STRFTIME
+from onadata.libs.utils.logger_tools import (
+    create_instance, generate_content_disposition_header)
 from onadata.apps.main.tests.test_base import TestBase
 
 
@@ -27,3 +38,55 @@ class TestLoggerTools(TestBase):
         print return_value_with_name_and_false_show_date
         self.assertTrue(re.search(file_name_pattern,
                                   return_value_with_name_and_false_show_date))
+
+    @patch('onadata.apps.logger.xform_instance_parser.clean_and_parse_xml',
+           wraps=clean_and_parse_xml)
+    def test_create_instance_parses_submission_xml_once(self, mock_parse):
+        self._publish_transportation_form()
+        survey = self.surveys[0]
+        path = os.path.join(
+            self.this_directory, 'fixtures', 'transportation', 'instances',
+            survey, survey + '.xml')
+
+        with open(path) as xml_file:
+            instance = create_instance(self.user.username, xml_file, [])
+
+        self.assertIsInstance(instance, Instance)
+        self.assertEqual(mock_parse.call_count, 1)
+        self.assertEqual(instance.json['_id'], instance.pk)
+
+    @patch.object(XFormInstanceParser, 'parse', autospec=True,
+                  side_effect=XFormInstanceParser.parse)
+    def test_create_instance_writes_instance_once(self, mock_parse):
+        self._publish_transportation_form()
+        survey = self.surveys[0]
+        path = os.path.join(
+            self.this_directory, 'fixtures', 'transportation', 'instances',
+            survey, survey + '.xml')
+        media_path = os.path.join(
+            self.this_directory, 'fixtures', 'transportation', 'instances',
+            survey, '1335783522563.jpg')
+
+        with open(path) as xml_file, open(media_path) as media_file:
+            media_file = InMemoryUploadedFile(
+                media_file, 'media_file', '1335783522563.jpg', 'image/jpeg',
+                os.path.getsize(media_path), None)
+            with CaptureQueriesContext(connection) as ctx:
+                instance = create_instance(
+                    self.user.username, xml_file, [media_file])
+
+        self.assertIsInstance(instance, Instance)
+        self.assertEqual(mock_parse.call_count, 1)
+        queries = [q['sql'] for q in ctx.captured_queries]
+        self.assertEqual(len([q for q in queries if q.startswith(
+            'INSERT INTO "logger_instance"')]), 1)
+        self.assertEqual(len([q for q in queries if q.startswith(
+            'UPDATE "logger_instance"')]), 0)
+
+        instance = Instance.objects.get(pk=instance.pk)
+        self.assertEqual(instance.json['_id'], instance.pk)
+        self.assertEqual(instance.json['_uuid'], instance.uuid)
+        self.assertEqual(instance.json['_version'], self.xform.version)
+        self.assertEqual(len(instance.json['_attachments']), 1)
+        self.assertEqual(instance.json['_submission_time'],
+                         instance.date_created.strftime(MONGO_STRFTIME))
@@ -2,6 +2,7 @@ import unittest
 
 from django.contrib.gis.geos import GEOSGeometry
 
+from onadata.libs.utils.osm import get_combined_osm
 from onadata.libs.utils.osm import parse_osm_nodes
 from onadata.libs.utils.osm import parse_osm_ways
 from onadata.libs.utils.osm import parse_osm
@@ -56,6 +57,24 @@ OSMNodeFaulty = """
 </osm>
 """  # noqa
 
+OSMWayBeforeNodes = """
+<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6" generator="OpenMapKit 0.7" user="theoutpost">
+    <way id="-1942">
+        <nd ref="-1943" />
+        <nd ref="-1944" />
+        <tag k="spray_status" v="yes" />
+    </way>
+    <node id="-1943" lat="-11.202901601" lon="28.883830387" />
+    <node id="-1944" lat="-11.202821164" lon="28.883858908" />
+</osm>
+"""
+
+
+class OsmXML(object):
+    def __init__(self, xml):
+        self.xml = xml
+
 
 class TestOSM(unittest.TestCase):
     def test_parse_osm(self):
@@ -125,3 +144,22 @@ class TestOSM(unittest.TestCase):
                           'structur_1': '450.000000',
                           'id': '300 / 450_Mansa',
                           'spray_status': 'yes'})
+
+    def test_parse_osm_way_before_its_nodes(self):
+        ways = parse_osm(OSMWayBeforeNodes.strip())
+        self.assertEqual(len(ways), 1)
+        self.assertEqual(ways[0]['geom'].coords,
+                         ((28.883830387, -11.202901601),
+                          (28.883858908, -11.202821164)))
+        self.assertEqual(ways[0]['tags'], {'spray_status': 'yes'})
+
+    def test_get_combined_osm(self):
+        xml = get_combined_osm([OsmXML(OSMWay.strip()),
+                                OsmXML(OSMNode.strip())])
+
+        self.assertTrue(xml.startswith(
+            "<?xml version='1.0' encoding='utf-8'?>\n<osm version=\"0.6\" "
+            "generator=\"OpenMapKit 0.7\" user=\"theoutpost\">"))
+        self.assertTrue(xml.endswith('</osm>'))
+        self.assertEqual(len(parse_osm_nodes(xml)), 6)
+        self.assertEqual(len(parse_osm_ways(xml)), 1)
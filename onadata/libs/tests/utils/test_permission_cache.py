@@ -0,0 +1,68 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from guardian.shortcuts import assign_perm
+
+from onadata.apps.api import tools
+from onadata.apps.logger.models import XForm
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.libs.permissions import CAN_VIEW_XFORM, ReadOnlyRole
+
+
+def _count_permission_queries(context):
+    return len([q for q in context.captured_queries
+                if 'objectpermission' in q['sql']])
+
+
+class TestPermissionCache(TestBase):
+
+    def setUp(self):
+        super(TestPermissionCache, self).setUp()
+        self._publish_transportation_form()
+        self.alice = self._create_user('alice', 'alice')
+
+    def test_permissions_are_read_once_per_content_type(self):
+        ReadOnlyRole.add(self.alice, self.xform)
+        xforms = list(XForm.objects.all()) * 50
+
+        with CaptureQueriesContext(connection) as context:
+            for xform in xforms:
+                self.assertTrue(self.alice.has_perm(CAN_VIEW_XFORM, xform))
+                self.assertTrue(ReadOnlyRole.user_has_role(self.alice, xform))
+
+        # the user's and the user's teams' permissions on forms
+        self.assertEqual(_count_permission_queries(context), 2)
+
+    def test_role_changes_are_seen(self):
+        self.assertFalse(self.alice.has_perm(CAN_VIEW_XFORM, self.xform))
+
+        ReadOnlyRole.add(self.alice, self.xform)
+        self.assertTrue(self.alice.has_perm(CAN_VIEW_XFORM, self.xform))
+        self.assertTrue(self.alice.has_perm(
+            'logger.' + CAN_VIEW_XFORM, self.xform))
+
+        ReadOnlyRole._remove_obj_permissions(self.alice, self.xform)
+        self.assertFalse(self.alice.has_perm(CAN_VIEW_XFORM, self.xform))
+
+    def test_team_changes_are_seen(self):
+        self._create_user('denoinc', 'denoinc')
+        organization = tools.create_organization('denoinc', self.user)
+        team = tools.create_organization_team(organization, 'readers')
+        assign_perm(CAN_VIEW_XFORM, team, self.xform)
+        self.assertFalse(self.alice.has_perm(CAN_VIEW_XFORM, self.xform))
+
+        tools.add_user_to_team(team, self.alice)
+        self.assertTrue(self.alice.has_perm(CAN_VIEW_XFORM, self.xform))
+
+        tools.remove_user_from_team(team, self.alice)
+        self.assertFalse(self.alice.has_perm(CAN_VIEW_XFORM, self.xform))
+
+    def test_team_deletion_is_seen(self):
+        self._create_user('denoinc', 'denoinc')
+        organization = tools.create_organization('denoinc', self.user)
+        team = tools.create_organization_team(organization, 'readers')
+        assign_perm(CAN_VIEW_XFORM, team, self.xform)
+        tools.add_user_to_team(team, self.alice)
+        self.assertTrue(self.alice.has_perm(CAN_VIEW_XFORM, self.xform))
+
+        team.delete()
+        self.assertFalse(self.alice.has_perm(CAN_VIEW_XFORM, self.xform))
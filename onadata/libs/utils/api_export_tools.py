@@ -59,6 +59,7 @@ EXPORT_EXT = {
     'csv': Export.CSV_EXPORT,
     'csvzip': Export.CSV_ZIP_EXPORT,
     'savzip': Export.SAV_ZIP_EXPORT,
+    'parquet': Export.PARQUET_EXPORT,
     'uuid': Export.EXTERNAL_EXPORT,
     'kml': Export.KML_EXPORT,
     'zip': Export.ZIP_EXPORT,
@@ -335,7 +336,8 @@ def _get_extension_from_export_type(export_type):
 
     if export_type == Export.XLS_EXPORT:
         extension = 'xlsx'
-    elif export_type in [Export.CSV_ZIP_EXPORT, Export.SAV_ZIP_EXPORT]:
+    elif export_type in [Export.CSV_ZIP_EXPORT, Export.SAV_ZIP_EXPORT,
+                         Export.PARQUET_EXPORT]:
         extension = 'zip'
 
     return extension
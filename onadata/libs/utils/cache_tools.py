@@ -25,3 +25,9 @@ DATAVIEW_LAST_SUBMISSION_TIME = 'dvs-last_submission_time'
 PROJ_TEAM_USERS_CACHE = 'ps-project-team-users'
 XFORM_LINKED_DATAVIEWS = 'xfs-linked_dataviews'
 PROJECT_LINKED_DATAVIEWS = 'ps-project-linked_dataviews'
+REST_SERVICE_SLOTS = 'rss-delivery_slots'
+XFORM_STATS_CACHE = 'xfs-stats'
+
+# Cache names used by the object permission snapshots
+USER_PERMS_VERSION = 'ps-user_perms_version-'
+USER_OBJECT_PERMS = 'ps-user_object_perms-'
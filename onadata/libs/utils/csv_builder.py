@@ -1,14 +1,18 @@
+import json
 import re
 from collections import OrderedDict
+from hashlib import md5
 from itertools import chain
 
 import unicodecsv as csv
 from django.conf import settings
+from django.db import transaction
 from django.db.models.query import QuerySet
+from django.utils import timezone
 from pyxform.question import Question
 from pyxform.section import RepeatingSection, Section
 
-from onadata.apps.logger.models import OsmData
+from onadata.apps.logger.models import OsmData, XFormColumnSchema
 from onadata.apps.logger.models.xform import XForm, question_types_to_exclude
 from onadata.apps.viewer.models.data_dictionary import DataDictionary
 from onadata.apps.viewer.models.parsed_instance import (ParsedInstance,
@@ -20,9 +24,12 @@ from onadata.libs.utils.common_tags import (ATTACHMENTS, BAMBOO_DATASET_ID,
                                             STATUS, SUBMISSION_TIME,
                                             SUBMITTED_BY, TAGS, UUID, VERSION,
                                             XFORM_ID_STRING)
+from onadata.libs.utils.export_builder import get_submissions_after
 from onadata.libs.utils.export_builder import get_value_or_attachment_uri
+from onadata.libs.utils.export_builder import track_records
 from onadata.libs.utils.export_builder import track_task_progress
 from onadata.libs.utils.model_tools import get_columns_with_hxl
+from onadata.libs.utils.model_tools import queryset_cursor_iterator
 
 # the bind type of select multiples that we use to compare
 MULTIPLE_SELECT_BIND_TYPE = u"select"
@@ -84,18 +91,85 @@ def get_column_names_only(columns, dd, group_delimiter):
     return new_columns
 
 
+def get_repeat_columns(dd, records, repeat_columns=None):
+    """
+    Return a dict of each repeat's abbreviated xpath to the indexed columns
+    found in records, submission json dicts, e.g. children[2]/name, in the
+    order they are found. Found columns are added to repeat_columns.
+    """
+    if repeat_columns is None:
+        repeat_columns = OrderedDict(
+            (xpath, []) for xpath in dd.get_survey_xpaths_of_type(u'repeat'))
+
+    if repeat_columns:
+        for record in records:
+            for key, value in record.iteritems():
+                CSVDataFrameBuilder._reindex(
+                    key, value, repeat_columns, record, dd,
+                    include_images=[])
+
+    return repeat_columns
+
+
+def update_column_schema(xform, instances):
+    """
+    Add the repeat columns of new submissions to the form's stored
+    XFormColumnSchema, forms without one get it on their next export.
+    """
+    if not instances:
+        return
+
+    last_instance_id = max(i.pk for i in instances)
+    schema = XFormColumnSchema.objects.filter(
+        xform=xform, xform_hash=xform.hash).first()
+    if schema is None:
+        return
+
+    repeat_columns = get_repeat_columns(xform, [i.json for i in instances])
+    has_new_columns = any(
+        set(columns) - set(schema.repeat_columns.get(key, []))
+        for key, columns in repeat_columns.items())
+
+    if not has_new_columns:
+        XFormColumnSchema.set_last_instance_id(xform, last_instance_id)
+        return
+
+    with transaction.atomic():
+        schema = XFormColumnSchema.objects.select_for_update().filter(
+            pk=schema.pk, xform_hash=xform.hash).first()
+        if schema is None:
+            return
+
+        for key, columns in repeat_columns.items():
+            existing = schema.repeat_columns.setdefault(key, [])
+            known = set(existing)
+            existing.extend(c for c in columns if c not in known)
+        schema.last_instance_id = max(
+            schema.last_instance_id, last_instance_id)
+        schema.save()
+
+
+def get_columns_hash(columns):
+    """A hash of the columns of a CSV export."""
+    return md5(json.dumps(columns)).hexdigest()
+
+
 def write_to_csv(path, rows, columns, columns_with_hxl=None,
                  remove_group_name=False, dd=None,
                  group_delimiter=DEFAULT_GROUP_DELIMITER, include_labels=False,
                  include_labels_only=False, include_hxl=False,
-                 win_excel_utf8=False, total_records=None):
+                 win_excel_utf8=False, total_records=None, append=False):
+    """
+    Write rows to the CSV file at path, with append the rows are added to
+    the end of the file without a header row.
+    """
     na_rep = getattr(settings, 'NA_REP', NA_REP)
     encoding = 'utf-8-sig' if win_excel_utf8 else 'utf-8'
-    with open(path, 'wb') as csvfile:
+    with open(path, 'ab' if append else 'wb') as csvfile:
         writer = csv.writer(csvfile, encoding=encoding, lineterminator='\n')
 
         # Check if to truncate the group name prefix
-        if not include_labels_only:
+        if not include_labels_only and not append:
             if remove_group_name and dd:
                 new_cols = get_column_names_only(columns, dd, group_delimiter)
             else:
@@ -278,22 +352,23 @@ class AbstractDataFrameBuilder(object):
 
     def _query_data(self, query='{}', start=0,
                     limit=ParsedInstance.DEFAULT_LIMIT,
-                    fields='[]', count=False):
+                    fields='[]', count=False, check_count=True):
         # query_data takes params as json strings
         # so we dumps the fields dictionary
-        count_args = {
-            'xform': self.xform,
-            'query': query,
-            'start': self.start,
-            'end': self.end,
-            'fields': '[]',
-            'sort': '{}',
-            'count': True
-        }
-        count_object = list(query_data(**count_args))
-        record_count = count_object[0]["count"]
-        if record_count < 1:
-            raise NoRecordsFoundError("No records found for your query")
+        if count or check_count:
+            count_args = {
+                'xform': self.xform,
+                'query': query,
+                'start': self.start,
+                'end': self.end,
+                'fields': '[]',
+                'sort': '{}',
+                'count': True
+            }
+            count_object = list(query_data(**count_args))
+            record_count = count_object[0]["count"]
+            if record_count < 1:
+                raise NoRecordsFoundError("No records found for your query")
         # if count was requested, return the count
         if count:
             return record_count
@@ -445,8 +520,7 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
                     # generated when we reindex
                 ordered_columns[child.get_abbreviated_xpath()] = None
 
-    def _update_columns_from_data(self, cursor):
-        # TODO: check for and handle empty results
+    def _add_select_multiple_and_gps_columns(self):
         # add ordered columns for select multiples
         if self.split_select_multiples:
             for key, choices in self.select_multiples.items():
@@ -457,10 +531,20 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
         for key in self.gps_fields:
             gps_xpaths = self.dd.get_additional_geopoint_xpaths(key)
             self.ordered_columns[key] = [key] + gps_xpaths
+
+    def _update_columns_from_data(self, cursor, repeat_columns=None):
+        """
+        Add the repeat columns found in the data to the ordered columns,
+        the unsplit repeat columns are also added to repeat_columns.
+        """
+        # TODO: check for and handle empty results
+        self._add_select_multiple_and_gps_columns()
         image_xpaths = [] if not self.include_images \
             else self.dd.get_media_survey_xpaths()
 
         for record in cursor:
+            if repeat_columns is not None:
+                get_repeat_columns(self.dd, [record], repeat_columns)
             # split select multiples
             if self.split_select_multiples:
                 record = self._split_select_multiples(
@@ -475,6 +559,84 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
                 self._reindex(key, value, self.ordered_columns,
                               record, self.dd, include_images=image_xpaths)
 
+    def _is_unfiltered(self):
+        return self.filter_query in (None, '', '{}', {}) and \
+            self.start is None and self.end is None
+
+    def _get_stored_repeat_columns(self):
+        """
+        Return the form's stored repeat columns, or None if the export is
+        filtered or the columns are missing or stale.
+        """
+        if not self._is_unfiltered():
+            return None
+
+        try:
+            schema = self.xform.column_schema
+        except XFormColumnSchema.DoesNotExist:
+            return None
+
+        return None if schema.is_stale() else schema.repeat_columns
+
+    def _discover_repeat_columns(self):
+        """
+        Add the repeat columns found in the data to the ordered columns,
+        unfiltered exports store them for the next exports.
+        """
+        discovered_at = timezone.now()
+        cursor = self._query_data(self.filter_query)
+        if isinstance(cursor, QuerySet):
+            cursor = queryset_cursor_iterator(cursor)
+
+        if not self._is_unfiltered():
+            self._update_columns_from_data(cursor)
+            return
+
+        repeat_columns = get_repeat_columns(self.dd, [])
+        last_instance_id = [0]
+
+        def track_last_instance_id(cursor):
+            for record in cursor:
+                last_instance_id[0] = max(
+                    last_instance_id[0], record.get(ID, 0))
+                yield record
+
+        self._update_columns_from_data(
+            track_last_instance_id(cursor), repeat_columns)
+
+        schema, created = XFormColumnSchema.objects.update_or_create(
+            xform=self.xform, defaults={
+                'xform_hash': self.xform.hash,
+                'repeat_columns': repeat_columns,
+                'last_instance_id': last_instance_id[0]
+            })
+        # submissions changed during the pass make the columns stale
+        XFormColumnSchema.objects.filter(pk=schema.pk).update(
+            date_modified=discovered_at)
+
+    def _set_repeat_columns(self, repeat_columns):
+        """
+        Set the ordered columns of repeats from stored repeat columns,
+        splitting select multiples into their choices if required.
+        """
+        for key, columns in repeat_columns.items():
+            if key not in self.ordered_columns:
+                continue
+
+            ordered_columns = []
+            for column in columns:
+                xpath = re.sub(r"\[\d+\]", u"", column)
+                if self.split_select_multiples and \
+                        xpath in self.select_multiples:
+                    element = self.dd.get_element(xpath)
+                    ordered_columns.extend([
+                        column + choice.get_abbreviated_xpath()[len(xpath):]
+                        for choice in element.children])
+                else:
+                    ordered_columns.append(column)
+            self.ordered_columns[key] = \
+                remove_dups_from_list_maintain_order(ordered_columns)
+
     def _format_for_dataframe(self, cursor, key_replacement_obj=None):
         pattern, replacer = None, None
         if key_replacement_obj:
@@ -482,16 +644,7 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
             replacer = key_replacement_obj.get('replacer')
 
         # TODO: check for and handle empty results
-        # add ordered columns for select multiples
-        if self.split_select_multiples:
-            for key, choices in self.select_multiples.items():
-                # HACK to ensure choices are NOT duplicated
-                self.ordered_columns[key] = \
-                    remove_dups_from_list_maintain_order(choices)
-        # add ordered columns for gps fields
-        for key in self.gps_fields:
-            gps_xpaths = self.dd.get_additional_geopoint_xpaths(key)
-            self.ordered_columns[key] = [key] + gps_xpaths
+        self._add_select_multiple_and_gps_columns()
         image_xpaths = [] if not self.include_images \
             else self.dd.get_media_survey_xpaths()
 
@@ -518,14 +671,33 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
 
             yield flat_dict
 
-    def export_to(self, path, dataview=None):
+    def _get_columns(self):
+        columns = list(chain.from_iterable(
+            [[xpath] if cols is None else cols
+             for xpath, cols in self.ordered_columns.iteritems()]))
+
+        # add extra columns
+        columns += [col for col in self.ADDITIONAL_COLUMNS]
+        for field in self.dd.get_survey_elements_of_type('osm'):
+            columns += OsmData.get_tag_keys(self.xform,
+                                            field.get_abbreviated_xpath(),
+                                            include_prefix=True)
+
+        return columns
+
+    def export_to(self, path, dataview=None, append_state=None):
+        """
+        Write the CSV export to path, the state rows can later be appended
+        to is kept in append_state if given.
+        """
         self.ordered_columns = OrderedDict()
         self._build_ordered_columns(self.dd.survey, self.ordered_columns)
 
         if dataview:
-            cursor = dataview.query_data(dataview, all_data=True)
+            cursor = dataview.query_data(dataview, all_data=True,
+                                         stream=True)
             if isinstance(cursor, QuerySet):
-                cursor = cursor.iterator()
+                cursor = queryset_cursor_iterator(cursor)
             self._update_columns_from_data(cursor)
 
             columns = list(chain.from_iterable(
@@ -533,29 +705,36 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
                  for xpath, cols in self.ordered_columns.iteritems()
                  if [c for c in dataview.columns if xpath.startswith(c)]]
             ))
-            cursor = dataview.query_data(dataview, all_data=True)
+            cursor = dataview.query_data(dataview, all_data=True,
+                                         stream=True)
             if isinstance(cursor, QuerySet):
-                cursor = cursor.iterator()
+                cursor = queryset_cursor_iterator(cursor)
             data = self._format_for_dataframe(cursor)
         else:
-            cursor = self._query_data(self.filter_query)
-            if isinstance(cursor, QuerySet):
-                cursor = cursor.iterator()
-            self._update_columns_from_data(cursor)
-
-            columns = list(chain.from_iterable(
-                [[xpath] if cols is None else cols
-                 for xpath, cols in self.ordered_columns.iteritems()]))
-
-            # add extra columns
-            columns += [col for col in self.ADDITIONAL_COLUMNS]
-            for field in self.dd.get_survey_elements_of_type('osm'):
-                columns += OsmData.get_tag_keys(self.xform,
-                                                field.get_abbreviated_xpath(),
-                                                include_prefix=True)
-            cursor = self._query_data(self.filter_query)
+            repeat_columns = self._get_stored_repeat_columns()
+            if repeat_columns is None:
+                # discover the repeat columns with a pass over the data
+                self._discover_repeat_columns()
+                cursor = self._query_data(self.filter_query)
+            else:
+                self._add_select_multiple_and_gps_columns()
+                self._set_repeat_columns(repeat_columns)
+                cursor = self._query_data(self.filter_query,
+                                          check_count=False)
             if isinstance(cursor, QuerySet):
-                cursor = cursor.iterator()
+                cursor = queryset_cursor_iterator(cursor)
+
+            columns = self._get_columns()
+            if append_state is not None:
+                append_state['columns'] = get_columns_hash(columns)
+                cursor = track_records(cursor, append_state)
+            if repeat_columns is not None:
+                cursor = iter(cursor)
+                first_record = next(cursor, None)
+                if first_record is None:
+                    raise NoRecordsFoundError(
+                        "No records found for your query")
+                cursor = chain([first_record], cursor)
             data = self._format_for_dataframe(cursor)
 
         columns_with_hxl = self.include_hxl and get_columns_with_hxl(
@@ -570,3 +749,82 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
                      include_hxl=self.include_hxl,
                      win_excel_utf8=self.win_excel_utf8,
                      total_records=self.total_records)
+
+    def append_to(self, path, append_state):
+        """
+        Append the rows of the submissions after append_state's
+        last_instance_id to the CSV export at path, returns False without
+        writing anything if the columns of the export changed.
+        """
+        self.ordered_columns = OrderedDict()
+        self._build_ordered_columns(self.dd.survey, self.ordered_columns)
+
+        repeat_columns = self._get_stored_repeat_columns()
+        if repeat_columns is None:
+            return False
+
+        self._add_select_multiple_and_gps_columns()
+        self._set_repeat_columns(repeat_columns)
+        columns = self._get_columns()
+        if get_columns_hash(columns) != append_state.get('columns'):
+            return False
+
+        cursor = get_submissions_after(
+            self.xform, append_state['last_instance_id'])
+        data = self._format_for_dataframe(track_records(cursor, append_state))
+
+        write_to_csv(path, data, columns, win_excel_utf8=self.win_excel_utf8,
+                     total_records=self.total_records, append=True)
+
+        return True
+
+    def get_export_columns(self):
+        """
+        Return the columns of the unfiltered CSV export, the repeat columns
+        are discovered with a pass over the data if they are not stored.
+        """
+        self.ordered_columns = OrderedDict()
+        self._build_ordered_columns(self.dd.survey, self.ordered_columns)
+
+        repeat_columns = self._get_stored_repeat_columns()
+        if repeat_columns is None:
+            self._discover_repeat_columns()
+        else:
+            self._add_select_multiple_and_gps_columns()
+            self._set_repeat_columns(repeat_columns)
+
+        return self._get_columns()
+
+    def write_header(self, path, columns):
+        """Write the header rows of the CSV export to path."""
+        columns_with_hxl = self.include_hxl and get_columns_with_hxl(
+            self.dd.survey_elements)
+
+        write_to_csv(path, [], columns,
+                     columns_with_hxl=columns_with_hxl,
+                     remove_group_name=self.remove_group_name,
+                     dd=self.dd, group_delimiter=self.group_delimiter,
+                     include_labels=self.include_labels,
+                     include_labels_only=self.include_labels_only,
+                     include_hxl=self.include_hxl,
+                     win_excel_utf8=self.win_excel_utf8)
+
+    def export_part_to(self, path, columns, first_instance_id,
+                       last_instance_id):
+        """
+        Write to path the rows of the submissions with ids from
+        first_instance_id to last_instance_id without the header rows,
+        returns the number of rows written.
+        """
+        self.ordered_columns = OrderedDict()
+        self._build_ordered_columns(self.dd.survey, self.ordered_columns)
+
+        append_state = {}
+        cursor = get_submissions_after(
+            self.xform, first_instance_id - 1, last_instance_id)
+        data = self._format_for_dataframe(track_records(cursor, append_state))
+
+        write_to_csv(path, data, columns, win_excel_utf8=self.win_excel_utf8,
+                     append=True)
+
+        return append_state.get('num_records', 0)
@@ -11,9 +11,15 @@ from celery.result import AsyncResult
 from collections import defaultdict
 from copy import deepcopy
 from datetime import datetime
+from django.conf import settings
 from django.contrib.auth.models import User
-from onadata.libs.utils.logger_tools import dict2xml, safe_create_instance
+from django.db import transaction
+from onadata.libs.utils.logger_tools import create_xform_instances_in_bulk, \
+    dict2xml, safe_create_instance
 from onadata.apps.logger.models import Instance
+from onadata.apps.logger.xform_instance_parser import SubmissionXML
+from onadata.apps.viewer.models.parsed_instance import \
+    call_post_submission_services
 from onadata.libs.utils.common_tags import MULTIPLE_SELECT_TYPE
 from onadata.libs.utils.dict_tools import csv_dict_to_nested_dict
 from onadata.libs.utils.async_status import (celery_state_to_status,
@@ -109,41 +115,39 @@ def dict_pathkeys_to_nested_dicts(dictionary):
 @task()
 def submit_csv_async(username, xform, csv_file_temp_path):
     with codecs.open(csv_file_temp_path, encoding='utf-8') as csv_file:
-        return submit_csv(username, xform, csv_file)
+        # the files too large to import during the request are imported
+        # in bulk
+        return submit_csv(username, xform, csv_file, bulk=True)
 
 
-def submit_csv(username, xform, csv_file):
-    """ Imports CSV data to an existing form
+class CSVImportError(Exception):
+    pass
 
-    Takes a csv formatted file or string containing rows of submission/instance
-    and converts those to xml submissions and finally submits them by calling
-    :py:func:`onadata.libs.utils.logger_tools.safe_create_instance`
 
-    :param str username: the subission user
-    :param onadata.apps.logger.models.XForm xfrom: The submission's XForm.
-    :param (str or file): A CSV formatted file with submission rows.
-    :return: If sucessful, a dict with import summary else dict with error str.
-    :rtype: Dict
-    """
+def _get_csv_reader(csv_file):
+    """The number of rows and a DictReader of a CSV file, or an error."""
     if isinstance(csv_file, unicode):
         csv_file = cStringIO.StringIO(csv_file)
     elif csv_file is None or not hasattr(csv_file, 'read'):
-        return async_status(FAILED,
-                            (u'Invalid param type for `csv_file`. '
+        raise CSVImportError(u'Invalid param type for `csv_file`. '
                              'Expected utf-8 encoded file or unicode'
                              ' string got {} instead.'
-                             .format(type(csv_file).__name__)))
+                             .format(type(csv_file).__name__))
 
     num_rows = sum(1 for row in csv_file) - 1
     csv_file.seek(0)
 
-    csv_reader = ucsv.DictReader(csv_file, encoding='utf-8-sig')
-    csv_header = csv_reader.fieldnames
+    return num_rows, ucsv.DictReader(csv_file, encoding='utf-8-sig')
 
+
+def _get_additional_columns(xform, csv_header):
+    """
+    Check the CSV header against the form's and return the additional
+    columns that are not imported.
+    """
     # check for spaces in headers
     if any(' ' in header for header in csv_header):
-        return async_status(FAILED,
-                            u'CSV file fieldnames should not contain spaces')
+        raise CSVImportError(u'CSV file fieldnames should not contain spaces')
 
     # Get the data dictionary
     xform_header = xform.get_headers()
@@ -183,10 +187,105 @@ def submit_csv(username, xform, csv_file):
     addition_col = [a for a in addition_col if a.find('[') == -1]
 
     if missing:
-        return async_status(FAILED,
-                            u"Sorry uploaded file does not match the form. "
-                            u"The file is missing the column(s): "
-                            u"{0}.".format(', '.join(missing)))
+        raise CSVImportError(u"Sorry uploaded file does not match the form. "
+                             u"The file is missing the column(s): "
+                             u"{0}.".format(', '.join(missing)))
+
+    return addition_col
+
+
+def _get_csv_submission(row, addition_col, ona_uuid, submission_time):
+    """
+    Turn a CSV row into a submission dict, returns the dict with the row's
+    uuid, submitter username and submission time.
+    """
+    # remove the additional columns
+    for index in addition_col:
+        del row[index]
+
+    # fetch submission uuid before purging row metadata
+    row_uuid = row.get('_uuid')
+    submitted_by = row.get('_submitted_by')
+    submission_date = row.get('_submission_time', submission_time)
+
+    location_data = {}
+    for key in row.keys():  # seems faster than a comprehension
+        # remove metadata (keys starting with '_')
+        if key.startswith('_'):
+            del row[key]
+
+        # Collect row location data into separate location_data dict
+        if key.endswith(('.latitude', '.longitude',
+                        '.altitude', '.precision')):
+            location_key, location_prop = key.rsplit(u'.', 1)
+            location_data.setdefault(location_key, {}).update(
+                {location_prop: row.get(key, '0')})
+        # remove 'n/a' values
+        if not key.startswith('_') and row[key] == 'n/a':
+            del row[key]
+
+    # collect all location K-V pairs into single geopoint field(s)
+    # in location_data dict
+    for location_key in location_data.keys():
+        location_data.update(
+            {location_key:
+             (u'%(latitude)s %(longitude)s '
+              '%(altitude)s %(precision)s') % defaultdict(
+                  lambda: '', location_data.get(location_key))})
+
+    row = csv_dict_to_nested_dict(row)
+    location_data = csv_dict_to_nested_dict(location_data)
+
+    row = dict_merge(row, location_data)
+
+    # inject our form's uuid into the submission
+    row.update(ona_uuid)
+
+    return row, row_uuid, submitted_by, submission_date
+
+
+def _set_submission_meta(row, meta):
+    old_meta = row.get('meta', {})
+    old_meta.update(meta)
+    row.update({'meta': old_meta})
+
+    return row.get('meta').get('instanceID')
+
+
+def _update_progress(additions, num_rows, addition_col):
+    try:
+        current_task.update_state(state='PROGRESS',
+                                  meta={'progress': additions,
+                                        'total': num_rows,
+                                        'info': addition_col})
+    except:
+        pass
+
+
+def submit_csv(username, xform, csv_file, bulk=False):
+    """ Imports CSV data to an existing form
+
+    Takes a csv formatted file or string containing rows of submission/instance
+    and converts those to xml submissions and finally submits them by calling
+    :py:func:`onadata.libs.utils.logger_tools.safe_create_instance`, or in
+    bulk with :py:func:`submit_csv_in_bulk`.
+
+    :param str username: the subission user
+    :param onadata.apps.logger.models.XForm xfrom: The submission's XForm.
+    :param (str or file): A CSV formatted file with submission rows.
+    :param bool bulk: import the rows in batches in one transaction.
+    :return: If sucessful, a dict with import summary else dict with error str.
+    :rtype: Dict
+    """
+    try:
+        num_rows, csv_reader = _get_csv_reader(csv_file)
+        addition_col = _get_additional_columns(xform, csv_reader.fieldnames)
+    except CSVImportError as e:
+        return async_status(FAILED, e.message)
+
+    if bulk:
+        return submit_csv_in_bulk(username, xform, csv_reader, addition_col,
+                                  num_rows)
 
     rollback_uuids = []
     submission_time = datetime.utcnow().isoformat()
@@ -195,55 +294,13 @@ def submit_csv(username, xform, csv_file):
     additions = inserts = 0
     try:
         for row in csv_reader:
-            # remove the additional columns
-            for index in addition_col:
-                del row[index]
-
-            # fetch submission uuid before purging row metadata
-            row_uuid = row.get('_uuid')
-            submitted_by = row.get('_submitted_by')
-            submission_date = row.get('_submission_time', submission_time)
-
-            location_data = {}
-            for key in row.keys():  # seems faster than a comprehension
-                # remove metadata (keys starting with '_')
-                if key.startswith('_'):
-                    del row[key]
-
-                # Collect row location data into separate location_data dict
-                if key.endswith(('.latitude', '.longitude',
-                                '.altitude', '.precision')):
-                    location_key, location_prop = key.rsplit(u'.', 1)
-                    location_data.setdefault(location_key, {}).update(
-                        {location_prop: row.get(key, '0')})
-                # remove 'n/a' values
-                if not key.startswith('_') and row[key] == 'n/a':
-                    del row[key]
-
-            # collect all location K-V pairs into single geopoint field(s)
-            # in location_data dict
-            for location_key in location_data.keys():
-                location_data.update(
-                    {location_key:
-                     (u'%(latitude)s %(longitude)s '
-                      '%(altitude)s %(precision)s') % defaultdict(
-                          lambda: '', location_data.get(location_key))})
-
-            row = csv_dict_to_nested_dict(row)
-            location_data = csv_dict_to_nested_dict(location_data)
-
-            row = dict_merge(row, location_data)
-
-            # inject our form's uuid into the submission
-            row.update(ona_uuid)
-
-            old_meta = row.get('meta', {})
+            row, row_uuid, submitted_by, submission_date = \
+                _get_csv_submission(row, addition_col, ona_uuid,
+                                    submission_time)
+
             new_meta, update = get_submission_meta_dict(xform, row_uuid)
             inserts += update
-            old_meta.update(new_meta)
-            row.update({'meta': old_meta})
-
-            row_uuid = row.get('meta').get('instanceID')
+            row_uuid = _set_submission_meta(row, new_meta)
             rollback_uuids.append(row_uuid.replace('uuid:', ''))
 
             xml_file = cStringIO.StringIO(
@@ -261,13 +318,7 @@ def submit_csv(username, xform, csv_file):
                 return async_status(FAILED, str(error))
             else:
                 additions += 1
-                try:
-                    current_task.update_state(state='PROGRESS',
-                                              meta={'progress': additions,
-                                                    'total': num_rows,
-                                                    'info': addition_col})
-                except:
-                    pass
+                _update_progress(additions, num_rows, addition_col)
 
                 users = User.objects.filter(
                     username=submitted_by) if submitted_by else []
@@ -289,6 +340,94 @@ def submit_csv(username, xform, csv_file):
             .format(', '.join(list(addition_col)))}
 
 
+def _get_batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _submit_csv_batch(username, xform, submissions, users):
+    """
+    Save a batch of CSV submissions, new ones in bulk and edits one by one.
+    Returns the created instances and the number of edits.
+    """
+    row_uuids = [s[1] for s in submissions if s[1]]
+    existing = set(xform.instances.filter(uuid__in=row_uuids).values_list(
+        'uuid', flat=True))
+    usernames = set(s[2] for s in submissions if s[2]).difference(users)
+    users.update((user.username, user) for user in User.objects.filter(
+        username__in=usernames))
+
+    new_submissions = []
+    updates = 0
+    for row, row_uuid, submitted_by, submission_date in submissions:
+        meta = {'instanceID': 'uuid:{}'.format(uuid.uuid4())}
+        if row_uuid in existing:
+            meta['deprecatedID'] = 'uuid:{}'.format(row_uuid)
+        row_uuid = _set_submission_meta(row, meta)
+        xml = dict2xmlsubmission(row, xform, row_uuid, submission_date)
+        user = users.get(submitted_by)
+
+        if 'deprecatedID' not in meta:
+            new_submissions.append((SubmissionXML(xml), user))
+            continue
+
+        # edits keep their history through the full submission path
+        error, instance = safe_create_instance(
+            username, cStringIO.StringIO(xml), [], xform.uuid, None)
+        if error:
+            raise CSVImportError(str(error))
+        updates += 1
+        if user:
+            instance.user = user
+            instance.save()
+
+    return create_xform_instances_in_bulk(xform, new_submissions), updates
+
+
+def submit_csv_in_bulk(username, xform, csv_reader, addition_col, num_rows):
+    """
+    Import the rows of a CSV file in batches of CSV_IMPORT_BATCH_SIZE rows,
+    new submissions are inserted with bulk_create and the form's counters
+    are updated once per batch. The import is one transaction, none of the
+    rows are imported if one fails.
+    """
+    batch_size = getattr(settings, 'CSV_IMPORT_BATCH_SIZE', 1000)
+    submission_time = datetime.utcnow().isoformat()
+    ona_uuid = {'formhub': {'uuid': xform.uuid}}
+    users = {}
+    instance_ids = []
+    additions = updates = 0
+    try:
+        with transaction.atomic():
+            for rows in _get_batches(csv_reader, batch_size):
+                submissions = [
+                    _get_csv_submission(row, addition_col, ona_uuid,
+                                        submission_time) for row in rows]
+                created, edits = _submit_csv_batch(
+                    username, xform, submissions, users)
+                instance_ids.extend([i.pk for i in created])
+                updates += edits
+                additions += len(created)
+                _update_progress(additions + updates, num_rows, addition_col)
+    except UnicodeDecodeError:
+        return async_status(FAILED, u'CSV file must be utf-8 encoded')
+    except Exception as e:
+        return async_status(FAILED, str(e))
+
+    for instance_id in instance_ids:
+        call_post_submission_services(instance_id)
+
+    return {u"additions": additions, u"updates": updates,
+            u"info": u"Additional column(s) excluded from the upload: '{0}'."
+            .format(', '.join(list(addition_col)))}
+
+
 def get_async_csv_submission_status(job_uuid):
     """ Gets CSV Submision progress or result
     Can be used to pol long running submissions
@@ -1,9 +1,11 @@
 import csv
+import shutil
 import six
 import uuid
 
 from celery import current_task
 from datetime import datetime, date
+from itertools import chain
 from zipfile import ZipFile
 
 from django.conf import settings
@@ -12,6 +14,9 @@ from django.core.files.temp import NamedTemporaryFile
 from openpyxl.utils.datetime import to_excel
 from openpyxl.workbook import Workbook
 
+import pyarrow
+import pyarrow.parquet as parquet
+
 from pyxform.question import Question
 from pyxform.section import Section, RepeatingSection
 
@@ -24,6 +29,7 @@ from onadata.libs.utils.common_tags import (
     ID, XFORM_ID_STRING, STATUS, ATTACHMENTS, GEOLOCATION, BAMBOO_DATASET_ID,
     DELETEDAT, INDEX, PARENT_INDEX, PARENT_TABLE_NAME,
     SUBMISSION_TIME, UUID, TAGS, NOTES, VERSION, SUBMITTED_BY, DURATION)
+from onadata.libs.utils.model_tools import queryset_cursor_iterator
 from onadata.libs.utils.mongo import _is_invalid_for_mongo,\
     _decode_from_mongo
 
@@ -32,6 +38,8 @@ from onadata.libs.utils.mongo import _is_invalid_for_mongo,\
 MULTIPLE_SELECT_BIND_TYPE = u"select"
 GEOPOINT_BIND_TYPE = u"geopoint"
 DEFAULT_UPDATE_BATCH = 100
+# rows of a section buffered before they are written as a parquet row group
+PARQUET_ROW_GROUP_SIZE = 10000
 
 
 def current_site_url(path):
@@ -90,6 +98,57 @@ def get_data_dictionary_from_survey(survey):
     return dd
 
 
+def _to_int(value):
+    if isinstance(value, bool):
+        return int(value)
+
+    return value if isinstance(value, six.integer_types) else int(value)
+
+
+def _to_float(value):
+    return value if isinstance(value, float) else float(value)
+
+
+def _to_date(value):
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return value
+
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _to_unicode(value):
+    if isinstance(value, str):
+        return value.decode('utf-8')
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+
+    return value if isinstance(value, unicode) else unicode(value)
+
+
+# parquet column types with the functions converting values to them
+PARQUET_TYPES = {
+    'int': (pyarrow.int64, _to_int),
+    'decimal': (pyarrow.float64, _to_float),
+    'date': (pyarrow.date32, _to_date),
+    'boolean': (pyarrow.bool_, bool),
+    'string': (pyarrow.string, _to_unicode),
+}
+
+
+def to_parquet_value(value, column_type):
+    """
+    Convert a value to a parquet column type, values that can not be
+    converted are left out i.e. None.
+    """
+    if value is None or value == '':
+        return None
+
+    try:
+        return PARQUET_TYPES[column_type][1](value)
+    except (TypeError, ValueError):
+        return None
+
+
 def encode_if_str(row, key, encode_dates=False):
     val = row.get(key)
 
@@ -103,7 +162,7 @@ def encode_if_str(row, key, encode_dates=False):
 
 
 def dict_to_joined_export(data, index, indices, name, survey, row,
-                          media_xpaths=[]):
+                          media_xpaths=[], data_dictionary=None):
     """
     Converts a dict into one or more tabular datasets
     :param data: current record which can be changed or updated
@@ -112,8 +171,11 @@ def dict_to_joined_export(data, index, indices, name, survey, row,
     :param name: the name of the survey
     :param survey: the survey
     :param row: current record that remains unchanged on this function's recall
+    :param data_dictionary: the survey's data dictionary, created if not given
     """
     output = {}
+    if data_dictionary is None:
+        data_dictionary = get_data_dictionary_from_survey(survey)
     # TODO: test for _geolocation and attachment lists
     if isinstance(data, dict):
         for key, val in data.iteritems():
@@ -127,7 +189,7 @@ def dict_to_joined_export(data, index, indices, name, survey, row,
                     child_index = indices[key]
                     new_output = dict_to_joined_export(
                         child, child_index, indices, key, survey, row,
-                        media_xpaths)
+                        media_xpaths, data_dictionary)
                     d = {INDEX: child_index, PARENT_INDEX: index,
                          PARENT_TABLE_NAME: name}
                     # iterate over keys within new_output and append to
@@ -150,7 +212,6 @@ def dict_to_joined_export(data, index, indices, name, survey, row,
                                  else v['note'] for v in val]
                     output[name][key] = "\r\n".join(note_list)
                 else:
-                    data_dictionary = get_data_dictionary_from_survey(survey)
                     output[name][key] = get_value_or_attachment_uri(
                         key, val, data, data_dictionary, media_xpaths,
                         row and row.get(ATTACHMENTS)
@@ -179,6 +240,33 @@ def track_task_progress(additions, total=None):
         pass
 
 
+def get_submissions_after(xform, last_instance_id, until_instance_id=None):
+    """
+    Iterate over the json of a form's submissions after last_instance_id,
+    up to until_instance_id if given, in id order.
+    """
+    instances = xform.instances.filter(
+        deleted_at=None, pk__gt=last_instance_id)
+    if until_instance_id is not None:
+        instances = instances.filter(pk__lte=until_instance_id)
+
+    return queryset_cursor_iterator(
+        instances.order_by('pk').values_list('json', flat=True))
+
+
+def track_records(records, append_state):
+    """
+    Count the records and keep the id of the last submission in
+    append_state as the records are read.
+    """
+    for record in records:
+        append_state['num_records'] = append_state.get('num_records', 0) + 1
+        append_state['last_instance_id'] = max(
+            append_state.get('last_instance_id', 0), record.get(ID, 0))
+
+        yield record
+
+
 class ExportBuilder(object):
     IGNORED_COLUMNS = [XFORM_ID_STRING, STATUS, ATTACHMENTS, GEOLOCATION,
                        BAMBOO_DATASET_ID, DELETEDAT]
@@ -403,11 +491,11 @@ class ExportBuilder(object):
         for xpath, choices in select_multiples.iteritems():
             # get the data matching this xpath
             data = row.get(xpath) and unicode(row.get(xpath))
-            selections = []
+            selections = set()
             if data:
-                selections = [
+                selections = set([
                     u'{0}/{1}'.format(
-                        xpath, selection) for selection in data.split()]
+                        xpath, selection) for selection in data.split()])
             if not cls.BINARY_SELECT_MULTIPLES:
                 row.update(dict(
                     [(choice, choice in selections if selections else None)
@@ -461,87 +549,104 @@ class ExportBuilder(object):
         """
         Split select multiples, gps and decode . and $
         """
-        section_name = section['name']
-
-        # first decode fields so that subsequent lookups
-        # have decoded field names
-        if section_name in self.encoded_fields:
-            row = ExportBuilder.decode_mongo_encoded_fields(
-                row, self.encoded_fields[section_name])
-
-        if self.SPLIT_SELECT_MULTIPLES and\
-                section_name in self.select_multiples:
-            row = ExportBuilder.split_select_multiples(
-                row, self.select_multiples[section_name])
-
-        if section_name in self.gps_fields:
-            row = ExportBuilder.split_gps_components(
-                row, self.gps_fields[section_name])
-
-        # convert to native types
-        for elm in section['elements']:
-            # only convert if its in our list and its not empty, just to
-            # optimize
-            value = row.get(elm['xpath'])
-            if elm['type'] in ExportBuilder.TYPES_TO_CONVERT\
-                    and value is not None and value != '':
-                row[elm['xpath']] = ExportBuilder.convert_type(
-                    value, elm['type'])
+        return self._get_row_processor(section)(row)
 
-        return row
+    def _get_row_processor(self, section):
+        """
+        Return a function that pre-processes the rows of a section, what
+        only depends on the section is worked out once so that exports can
+        call it for every row.
+        """
+        section_name = section['name']
+        encoded_fields = self.encoded_fields.get(section_name)
+        select_multiples = self.select_multiples.get(section_name) \
+            if self.SPLIT_SELECT_MULTIPLES else None
+        gps_fields = self.gps_fields.get(section_name)
+        # only convert the elements in our list
+        conversions = [
+            (elm['xpath'], ExportBuilder.CONVERT_FUNCS[elm['type']])
+            for elm in section['elements']
+            if elm['type'] in ExportBuilder.TYPES_TO_CONVERT]
+
+        def process_row(row):
+            # first decode fields so that subsequent lookups
+            # have decoded field names
+            if encoded_fields:
+                row = ExportBuilder.decode_mongo_encoded_fields(
+                    row, encoded_fields)
+
+            if select_multiples:
+                row = ExportBuilder.split_select_multiples(
+                    row, select_multiples)
+
+            if gps_fields:
+                row = ExportBuilder.split_gps_components(row, gps_fields)
+
+            # convert to native types, skipping empty values
+            for xpath, func in conversions:
+                value = row.get(xpath)
+                if value is not None and value != '':
+                    try:
+                        row[xpath] = func(value)
+                    except ValueError:
+                        pass
+
+            return row
+
+        return process_row
+
+    def _get_section_writers(self, dataview, fields=None):
+        """
+        Return the name, fields and row processor of each section, fields
+        maps a section to its fields if they are not the section's xpaths.
+        """
+        return [
+            (section['name'],
+             fields(section) if fields
+             else self.get_fields(dataview, section, 'xpath'),
+             self._get_row_processor(section))
+            for section in self.sections]
 
-    def to_zipped_csv(self, path, data, *args, **kwargs):
-        def write_row(row, csv_writer, fields):
-            csv_writer.writerow(
-                [encode_if_str(row, field) for field in fields])
+    @classmethod
+    def _get_zipped_csv_name(cls, section_name):
+        return "_".join(section_name.split("/")) + ".csv"
 
+    def _get_csv_defs(self):
         csv_defs = {}
-        dataview = kwargs.get('dataview')
-        total_records = kwargs.get('total_records')
-
         for section in self.sections:
             csv_file = NamedTemporaryFile(suffix=".csv")
             csv_writer = csv.writer(csv_file)
             csv_defs[section['name']] = {
                 'csv_file': csv_file, 'csv_writer': csv_writer}
 
-        # write headers
-        if not self.INCLUDE_LABELS_ONLY:
-            for section in self.sections:
-                fields = self.get_fields(dataview, section, 'title')
-                csv_defs[section['name']]['csv_writer'].writerow(
-                    [f.encode('utf-8') for f in fields])
+        return csv_defs
 
-        # write labels
-        if self.INCLUDE_LABELS or self.INCLUDE_LABELS_ONLY:
-            for section in self.sections:
-                fields = self.get_fields(dataview, section, 'label')
-                csv_defs[section['name']]['csv_writer'].writerow(
-                    [f.encode('utf-8') for f in fields])
+    def _write_zipped_csv_rows(self, csv_defs, data, dataview, index, indices,
+                               total_records=None):
+        """
+        Write the rows of each record to the section CSVs, index is the index
+        of the first record and indices the last index of each repeat.
+        Returns the index of the next record.
+        """
+        def write_row(row, csv_writer, fields):
+            csv_writer.writerow(
+                [encode_if_str(row, field) for field in fields])
 
         media_xpaths = [] if not self.INCLUDE_IMAGES \
             else self.dd.get_media_survey_xpaths()
 
-        columns_with_hxl = kwargs.get('columns_with_hxl')
-        # write hxl row
-        if self.INCLUDE_HXL and columns_with_hxl:
-            for section in self.sections:
-                fields = self.get_fields(dataview, section, 'title')
-                hxl_row = [columns_with_hxl.get(col, '')
-                           for col in fields]
-                if hxl_row:
-                    writer = csv_defs[section['name']]['csv_writer']
-                    writer.writerow(hxl_row)
-
-        index = 1
-        indices = {}
         survey_name = self.survey.name
+        section_writers = [
+            (section_name, fields, process_row,
+             csv_defs[section_name]['csv_writer'])
+            for section_name, fields, process_row
+            in self._get_section_writers(dataview)]
         for i, d in enumerate(data, start=1):
             # decode mongo section names
             joined_export = dict_to_joined_export(d, index, indices,
                                                   survey_name,
                                                   self.survey, d,
-                                                  media_xpaths)
+                                                  media_xpaths, self.dd)
             output = ExportBuilder.decode_mongo_encoded_section_names(
                 joined_export)
             # attach meta fields (index, parent_index, parent_table)
@@ -550,39 +655,108 @@ class ExportBuilder(object):
                 output[survey_name] = {}
             output[survey_name][INDEX] = index
             output[survey_name][PARENT_INDEX] = -1
-            for section in self.sections:
+            for section_name, fields, process_row, csv_writer \
+                    in section_writers:
                 # get data for this section and write to csv
-                section_name = section['name']
-                csv_def = csv_defs[section_name]
-                fields = self.get_fields(dataview, section, 'xpath')
-                csv_writer = csv_def['csv_writer']
                 # section name might not exist within the output, e.g. data was
                 # not provided for said repeat - write test to check this
                 row = output.get(section_name, None)
                 if type(row) == dict:
-                    write_row(
-                        self.pre_process_row(row, section),
-                        csv_writer, fields)
+                    write_row(process_row(row), csv_writer, fields)
                 elif type(row) == list:
                     for child_row in row:
-                        write_row(
-                            self.pre_process_row(child_row, section),
-                            csv_writer, fields)
+                        write_row(process_row(child_row), csv_writer, fields)
             index += 1
             track_task_progress(i, total_records)
 
+        return index
+
+    def _zip_csv_files(self, path, csv_defs):
         # write zipfile
         with ZipFile(path, 'w') as zip_file:
             for section_name, csv_def in csv_defs.iteritems():
                 csv_file = csv_def['csv_file']
-                csv_file.seek(0)
+                csv_file.flush()
                 zip_file.write(
-                    csv_file.name, "_".join(section_name.split("/")) + ".csv")
+                    csv_file.name, self._get_zipped_csv_name(section_name))
 
         # close files when we are done
         for section_name, csv_def in csv_defs.iteritems():
             csv_def['csv_file'].close()
 
+    def to_zipped_csv(self, path, data, *args, **kwargs):
+        dataview = kwargs.get('dataview')
+        total_records = kwargs.get('total_records')
+        append_state = kwargs.get('append_state')
+
+        csv_defs = self._get_csv_defs()
+
+        # write headers
+        if not self.INCLUDE_LABELS_ONLY:
+            for section in self.sections:
+                fields = self.get_fields(dataview, section, 'title')
+                csv_defs[section['name']]['csv_writer'].writerow(
+                    [f.encode('utf-8') for f in fields])
+
+        # write labels
+        if self.INCLUDE_LABELS or self.INCLUDE_LABELS_ONLY:
+            for section in self.sections:
+                fields = self.get_fields(dataview, section, 'label')
+                csv_defs[section['name']]['csv_writer'].writerow(
+                    [f.encode('utf-8') for f in fields])
+
+        columns_with_hxl = kwargs.get('columns_with_hxl')
+        # write hxl row
+        if self.INCLUDE_HXL and columns_with_hxl:
+            for section in self.sections:
+                fields = self.get_fields(dataview, section, 'title')
+                hxl_row = [columns_with_hxl.get(col, '')
+                           for col in fields]
+                if hxl_row:
+                    writer = csv_defs[section['name']]['csv_writer']
+                    writer.writerow(hxl_row)
+
+        indices = {}
+        if append_state is not None:
+            data = track_records(data, append_state)
+        index = self._write_zipped_csv_rows(
+            csv_defs, data, dataview, 1, indices, total_records)
+        if append_state is not None:
+            append_state.update({'index': index, 'indices': indices})
+
+        self._zip_csv_files(path, csv_defs)
+
+    def append_to_zipped_csv(self, path, data, previous_path, append_state,
+                             total_records=None):
+        """
+        Write to path the zipped CSV export at previous_path with the rows of
+        data appended, their indices follow the ones in append_state.
+        Returns False without writing anything if the previous export does
+        not have the sections of the form.
+        """
+        csv_defs = self._get_csv_defs()
+        with ZipFile(previous_path) as previous:
+            names = [self._get_zipped_csv_name(section['name'])
+                     for section in self.sections]
+            if sorted(names) != sorted(previous.namelist()):
+                return False
+
+            for section in self.sections:
+                csv_file = csv_defs[section['name']]['csv_file']
+                with previous.open(
+                        self._get_zipped_csv_name(section['name'])) as f:
+                    shutil.copyfileobj(f, csv_file)
+
+        indices = dict(append_state['indices'])
+        index = self._write_zipped_csv_rows(
+            csv_defs, track_records(data, append_state), None,
+            append_state['index'], indices, total_records)
+        append_state.update({'index': index, 'indices': indices})
+
+        self._zip_csv_files(path, csv_defs)
+
+        return True
+
     @classmethod
     def get_valid_sheet_name(cls, desired_name, existing_names):
         # a sheet name has to be <= 31 characters and not a duplicate of an
@@ -667,11 +841,12 @@ class ExportBuilder(object):
         index = 1
         indices = {}
         survey_name = self.survey.name
+        section_writers = self._get_section_writers(dataview)
         for i, d in enumerate(data, start=1):
             joined_export = dict_to_joined_export(d, index, indices,
                                                   survey_name,
                                                   self.survey, d,
-                                                  media_xpaths)
+                                                  media_xpaths, self.dd)
             output = ExportBuilder.decode_mongo_encoded_section_names(
                 joined_export)
             # attach meta fields (index, parent_index, parent_table)
@@ -680,42 +855,34 @@ class ExportBuilder(object):
                 output[survey_name] = {}
             output[survey_name][INDEX] = index
             output[survey_name][PARENT_INDEX] = -1
-            for section in self.sections:
+            for section_name, fields, process_row in section_writers:
                 # get data for this section and write to xls
-                section_name = section['name']
-                fields = self.get_fields(dataview, section, 'xpath')
-
                 ws = work_sheets[section_name]
                 # section might not exist within the output, e.g. data was
                 # not provided for said repeat - write test to check this
                 row = output.get(section_name, None)
                 if type(row) == dict:
-                    write_row(
-                        self.pre_process_row(row, section),
-                        ws, fields, work_sheet_titles)
+                    write_row(process_row(row), ws, fields, work_sheet_titles)
                 elif type(row) == list:
                     for child_row in row:
-                        write_row(
-                            self.pre_process_row(child_row, section),
-                            ws, fields, work_sheet_titles)
+                        write_row(process_row(child_row), ws, fields,
+                                  work_sheet_titles)
             index += 1
             track_task_progress(i, total_records)
 
         wb.save(filename=path)
 
-    def to_flat_csv_export(
-            self, path, data, username, id_string, filter_query, **kwargs):
+    def _get_csv_builder(self, username, id_string, filter_query, **kwargs):
         # TODO resolve circular import
         from onadata.libs.utils.csv_builder import CSVDataFrameBuilder
         start = kwargs.get('start')
         end = kwargs.get('end')
-        dataview = kwargs.get('dataview')
         xform = kwargs.get('xform')
         options = kwargs.get('options')
         total_records = kwargs.get('total_records')
         win_excel_utf8 = options.get('win_excel_utf8') if options else False
 
-        csv_builder = CSVDataFrameBuilder(
+        return CSVDataFrameBuilder(
             username, id_string, filter_query, self.GROUP_DELIMITER,
             self.SPLIT_SELECT_MULTIPLES, self.BINARY_SELECT_MULTIPLES,
             start, end, self.TRUNCATE_GROUP_TITLE, xform,
@@ -724,7 +891,52 @@ class ExportBuilder(object):
             total_records=total_records
         )
 
-        csv_builder.export_to(path, dataview=dataview)
+    def to_flat_csv_export(
+            self, path, data, username, id_string, filter_query, **kwargs):
+        csv_builder = self._get_csv_builder(
+            username, id_string, filter_query, **kwargs)
+
+        csv_builder.export_to(path, dataview=kwargs.get('dataview'),
+                              append_state=kwargs.get('append_state'))
+
+    def append_to_flat_csv_export(self, path, username, id_string,
+                                  append_state, **kwargs):
+        """
+        Append the rows of the submissions after append_state's
+        last_instance_id to the CSV export at path, returns False without
+        writing anything if the export's columns changed.
+        """
+        csv_builder = self._get_csv_builder(
+            username, id_string, None, **kwargs)
+
+        return csv_builder.append_to(path, append_state)
+
+    def get_flat_csv_columns(self, username, id_string, **kwargs):
+        """Return the columns of the unfiltered flat CSV export."""
+        csv_builder = self._get_csv_builder(
+            username, id_string, None, **kwargs)
+
+        return csv_builder.get_export_columns()
+
+    def to_flat_csv_header(self, path, username, id_string, columns,
+                           **kwargs):
+        """Write the header rows of the flat CSV export to path."""
+        csv_builder = self._get_csv_builder(
+            username, id_string, None, **kwargs)
+
+        csv_builder.write_header(path, columns)
+
+    def to_flat_csv_part(self, path, username, id_string, columns,
+                         first_instance_id, last_instance_id, **kwargs):
+        """
+        Write to path the flat CSV rows of the submissions with ids from
+        first_instance_id to last_instance_id, returns the number of rows.
+        """
+        csv_builder = self._get_csv_builder(
+            username, id_string, None, **kwargs)
+
+        return csv_builder.export_part_to(
+            path, columns, first_instance_id, last_instance_id)
 
     def get_default_language(self, languages):
         language = self.dd.default_language
@@ -884,12 +1096,15 @@ class ExportBuilder(object):
         index = 1
         indices = {}
         survey_name = self.survey.name
+        section_writers = self._get_section_writers(
+            None, lambda section: [
+                element['xpath'] for element in section['elements']])
         for i, d in enumerate(data, start=1):
             # decode mongo section names
             joined_export = dict_to_joined_export(d, index, indices,
                                                   survey_name,
                                                   self.survey, d,
-                                                  media_xpaths)
+                                                  media_xpaths, self.dd)
             output = ExportBuilder.decode_mongo_encoded_section_names(
                 joined_export)
             # attach meta fields (index, parent_index, parent_table)
@@ -898,24 +1113,15 @@ class ExportBuilder(object):
                 output[survey_name] = {}
             output[survey_name][INDEX] = index
             output[survey_name][PARENT_INDEX] = -1
-            for section in self.sections:
+            for section_name, fields, process_row in section_writers:
                 # get data for this section and write to csv
-                section_name = section['name']
-                sav_def = sav_defs[section_name]
-                fields = [
-                    element['xpath'] for element in
-                    section['elements']]
-                sav_writer = sav_def['sav_writer']
+                sav_writer = sav_defs[section_name]['sav_writer']
                 row = output.get(section_name, None)
                 if type(row) == dict:
-                    write_row(
-                        self.pre_process_row(row, section),
-                        sav_writer, fields)
+                    write_row(process_row(row), sav_writer, fields)
                 elif type(row) == list:
                     for child_row in row:
-                        write_row(
-                            self.pre_process_row(child_row, section),
-                            sav_writer, fields)
+                        write_row(process_row(child_row), sav_writer, fields)
             index += 1
             track_task_progress(i, total_records)
 
@@ -935,6 +1141,121 @@ class ExportBuilder(object):
         for section_name, sav_def in sav_defs.iteritems():
             sav_def['sav_file'].close()
 
+    def _get_parquet_column_types(self, section, fields):
+        """
+        The parquet column types of a section's fields from the question
+        types of the survey, the split choices of select multiples are
+        boolean and the indices of rows integers.
+        """
+        element_types = dict([(element['xpath'], element['type'])
+                              for element in section['elements']])
+        choices = set(chain.from_iterable(
+            self.select_multiples.get(section['name'], {}).values())) \
+            if self.SPLIT_SELECT_MULTIPLES else set()
+        column_types = []
+        for field in fields:
+            if field in choices:
+                column_type = 'boolean'
+            elif field in [ID, INDEX, PARENT_INDEX]:
+                column_type = 'int'
+            else:
+                column_type = element_types.get(field)
+            column_types.append(
+                column_type if column_type in PARQUET_TYPES else 'string')
+
+        return column_types
+
+    def to_zipped_parquet(self, path, data, *args, **kwargs):
+        """
+        Write each section to a parquet file with a column per field typed
+        from the survey, the files are zipped to path.
+        """
+        dataview = kwargs.get('dataview')
+        total_records = kwargs.get('total_records')
+
+        def flush_rows(parquet_def):
+            columns = zip(*parquet_def['rows'])
+            table = pyarrow.Table.from_arrays(
+                [pyarrow.array(list(column), type=field.type)
+                 for column, field in zip(columns, parquet_def['schema'])],
+                schema=parquet_def['schema'])
+            parquet_def['parquet_writer'].write_table(table)
+            parquet_def['rows'] = []
+
+        def write_row(row, parquet_def, fields):
+            parquet_def['rows'].append(
+                [to_parquet_value(row.get(field), column_type)
+                 for field, column_type
+                 in zip(fields, parquet_def['column_types'])])
+            if len(parquet_def['rows']) >= PARQUET_ROW_GROUP_SIZE:
+                flush_rows(parquet_def)
+
+        parquet_defs = {}
+        section_writers = self._get_section_writers(dataview)
+        for section_name, fields, process_row in section_writers:
+            section = self.section_by_name(section_name)
+            column_types = self._get_parquet_column_types(section, fields)
+            titles = self.get_fields(dataview, section, 'title')
+            schema = pyarrow.schema([
+                pyarrow.field(title, PARQUET_TYPES[column_type][0]())
+                for title, column_type in zip(titles, column_types)])
+            parquet_file = NamedTemporaryFile(suffix=".parquet")
+            parquet_defs[section_name] = {
+                'parquet_file': parquet_file,
+                'parquet_writer': parquet.ParquetWriter(
+                    parquet_file.name, schema, compression='snappy'),
+                'schema': schema,
+                'column_types': column_types,
+                'rows': []}
+
+        media_xpaths = [] if not self.INCLUDE_IMAGES \
+            else self.dd.get_media_survey_xpaths()
+
+        index = 1
+        indices = {}
+        survey_name = self.survey.name
+        for i, d in enumerate(data, start=1):
+            # decode mongo section names
+            joined_export = dict_to_joined_export(d, index, indices,
+                                                  survey_name,
+                                                  self.survey, d,
+                                                  media_xpaths, self.dd)
+            output = ExportBuilder.decode_mongo_encoded_section_names(
+                joined_export)
+            # attach meta fields (index, parent_index, parent_table)
+            # output has keys for every section
+            if survey_name not in output:
+                output[survey_name] = {}
+            output[survey_name][INDEX] = index
+            output[survey_name][PARENT_INDEX] = -1
+            for section_name, fields, process_row in section_writers:
+                # get data for this section and write to parquet
+                parquet_def = parquet_defs[section_name]
+                row = output.get(section_name, None)
+                if type(row) == dict:
+                    write_row(process_row(row), parquet_def, fields)
+                elif type(row) == list:
+                    for child_row in row:
+                        write_row(process_row(child_row), parquet_def, fields)
+            index += 1
+            track_task_progress(i, total_records)
+
+        for section_name, parquet_def in parquet_defs.iteritems():
+            if parquet_def['rows']:
+                flush_rows(parquet_def)
+            parquet_def['parquet_writer'].close()
+
+        # write zipfile
+        with ZipFile(path, 'w') as zip_file:
+            for section_name, parquet_def in parquet_defs.iteritems():
+                zip_file.write(
+                    parquet_def['parquet_file'].name,
+                    "_".join(section_name.split("/")) + ".parquet")
+
+        # close files when we are done
+        for section_name, parquet_def in parquet_defs.iteritems():
+            parquet_def['parquet_file'].close()
+
     def get_fields(self, dataview, section, key):
         if dataview:
             return [element[key] for element in section['elements']
@@ -13,32 +13,42 @@ from django.contrib.auth.models import User
 from django.core.files.base import File
 from django.core.files.storage import get_storage_class
 from django.core.files.temp import NamedTemporaryFile
-from django.db import OperationalError
+from django.db import OperationalError, transaction
+from django.db.models import Count, Max
 from django.db.models.query import QuerySet
 from django.shortcuts import render_to_response
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from json2xlsclient.client import Client
 from savReaderWriter import SPSSIOError
 
-from onadata.apps.logger.models import Attachment, Instance, OsmData, XForm
+from onadata.apps.logger.models import Attachment, Instance, OsmData, \
+    XForm, XFormDataVersion
 from onadata.apps.logger.models.data_view import DataView
 from onadata.apps.main.models.meta_data import MetaData
 from onadata.apps.viewer.models.export import (Export,
                                                get_export_options_query_kwargs)
+from onadata.apps.viewer.models.export_part import ExportPart
 from onadata.apps.viewer.models.parsed_instance import query_data
 from onadata.libs.exceptions import J2XException, NoRecordsFoundError
 from onadata.libs.utils.common_tags import (DATAVIEW_EXPORT,
                                             GROUPNAME_REMOVED_FLAG)
 from onadata.libs.utils.common_tools import str_to_bool
-from onadata.libs.utils.export_builder import ExportBuilder
+from onadata.libs.utils.csv_builder import get_columns_hash
+from onadata.libs.utils.export_builder import ExportBuilder, \
+    get_submissions_after
 from onadata.libs.utils.model_tools import (get_columns_with_hxl,
+                                            queryset_cursor_iterator,
                                             queryset_iterator)
-from onadata.libs.utils.osm import get_combined_osm
+from onadata.libs.utils.osm import iter_combined_osm
 from onadata.libs.utils.viewer_tools import (create_attachments_zipfile,
                                              image_urls)
 
 DEFAULT_GROUP_DELIMITER = '/'
 EXPORT_QUERY_KEY = 'query'
 MAX_RETRIES = 3
+# exports the new submissions of a form are appended to
+APPENDABLE_EXPORT_TYPES = [Export.CSV_EXPORT, Export.CSV_ZIP_EXPORT]
 
 
 def export_retry(tries, delay=3, backoff=2):
@@ -152,6 +162,7 @@ def generate_export(export_type, xform, export_id=None, options=None,
         Export.CSV_EXPORT: 'to_flat_csv_export',
         Export.CSV_ZIP_EXPORT: 'to_zipped_csv',
         Export.SAV_ZIP_EXPORT: 'to_zipped_sav',
+        Export.PARQUET_EXPORT: 'to_zipped_parquet',
         Export.GOOGLE_SHEETS_EXPORT: 'to_google_sheets',
     }
 
@@ -159,10 +170,15 @@ def generate_export(export_type, xform, export_id=None, options=None,
         xform = XForm.objects.get(
             user__username__iexact=username, id_string__iexact=id_string)
 
+    # changes to the data from now on make the export outdated
+    data_version = XFormDataVersion.get_version(xform.pk)
+    date_read = timezone.now()
+
     dataview = None
     if options.get("dataview_pk"):
         dataview = DataView.objects.get(pk=options.get("dataview_pk"))
-        records = dataview.query_data(dataview, all_data=True)
+        records = dataview.query_data(dataview, all_data=True,
+                                      stream=True)
         total_records = dataview.query_data(dataview,
                                             count=True)[0].get('count')
     else:
@@ -175,12 +191,149 @@ def generate_export(export_type, xform, export_id=None, options=None,
             total_records = xform.num_of_submissions
 
     if isinstance(records, QuerySet):
-        records = records.iterator()
+        records = queryset_cursor_iterator(records)
+
+    # 'win_excel_utf8' is only relevant for CSV exports
+    if 'win_excel_utf8' in options and export_type != Export.CSV_EXPORT:
+        del options['win_excel_utf8']
+
+    export_builder = get_export_builder(xform, export_type, options)
+
+    temp_file = NamedTemporaryFile(suffix=("." + extension))
+
+    columns_with_hxl = export_builder.INCLUDE_HXL and get_columns_with_hxl(
+        xform.survey_elements)
+
+    # append the new submissions to the last export if possible
+    append_state = None
+    appended = False
+    if _is_appendable(export_type, options):
+        append_state = {'xform_hash': xform.hash,
+                        'date_read': date_read.isoformat()}
+        append_base = get_append_base(xform, export_type, get_or_create_export(
+            export_id, xform, export_type, options).options)
+        if append_base is not None:
+            base_state = dict(append_base.append_state, **append_state)
+            appended = _append_export(
+                export_builder, export_type, append_base, temp_file.name,
+                base_state, xform=xform, options=options)
+            if appended:
+                append_state = base_state
+
+    # get the export function by export type
+    func = getattr(export_builder, export_type_func_map[export_type])
+    try:
+        if not appended:
+            func.__call__(
+                temp_file.name, records, username, id_string, filter_query,
+                start=start, end=end, dataview=dataview, xform=xform,
+                options=options, columns_with_hxl=columns_with_hxl,
+                total_records=total_records, append_state=append_state
+            )
+    except NoRecordsFoundError:
+        pass
+    except SPSSIOError as e:
+        export = get_or_create_export(export_id, xform, export_type, options)
+        export.error_message = str(e)
+        export.internal_status = Export.FAILED
+        export.save()
+
+        return export
+
+    dir_name, basename = save_export_file(
+        xform, export_type, extension, temp_file, remove_group_name, dataview)
+
+    # get or create export object
+    export = get_or_create_export(export_id, xform, export_type, options)
+
+    export.filedir = dir_name
+    export.filename = basename
+    export.internal_status = Export.SUCCESSFUL
+    export.data_version = data_version and data_version[0]
+    if append_state and append_state.get('num_records'):
+        export.last_instance_id = append_state['last_instance_id']
+        export.append_state = append_state
+    # do not persist exports that have a filter
+    # Get URL of the exported sheet.
+    if export_type == Export.GOOGLE_SHEETS_EXPORT:
+        export.export_url = export_builder.url
+
+    # if we should create a new export is true, we should not save it
+    if start is None and end is None:
+        export.save()
+    return export
+
+
+def _is_appendable(export_type, options):
+    return export_type in APPENDABLE_EXPORT_TYPES and \
+        not options.get('dataview_pk') and not options.get('query') and \
+        options.get('start') is None and options.get('end') is None
+
+
+def get_append_base(xform, export_type, export_options):
+    """
+    Return the latest export of a form with the same type and options that
+    the form's new submissions can be appended to, or None if submissions
+    in the export were edited or deleted since it was created.
+    """
+    export = Export.objects.filter(
+        xform=xform, export_type=export_type, options=export_options,
+        internal_status=Export.SUCCESSFUL, last_instance_id__isnull=False
+    ).order_by('-created_on').first()
+    if export is None or export.append_state.get('xform_hash') != xform.hash:
+        return None
+
+    included = xform.instances.filter(
+        pk__lte=export.last_instance_id, deleted_at__isnull=True).aggregate(
+        count=Count('pk'), date_modified=Max('date_modified'))
+    date_read = parse_datetime(export.append_state['date_read'])
+    if included['count'] != export.append_state['num_records'] or \
+            included['date_modified'] > date_read:
+        return None
 
+    return export
+
+
+def _copy_export_file(export, path):
+    """Copy the file of an export to path, returns False if it is missing."""
+    storage = get_storage_class()()
+    try:
+        with storage.open(export.filepath) as f, open(path, 'wb') as tmp:
+            for chunk in f.chunks():
+                tmp.write(chunk)
+    except IOError:
+        return False
+
+    return True
+
+
+def _append_export(export_builder, export_type, export, path, append_state,
+                   **kwargs):
+    """
+    Write to path the export with the form's new submissions appended,
+    returns False if they could not be appended.
+    """
+    if export_type == Export.CSV_EXPORT:
+        return _copy_export_file(export, path) and \
+            export_builder.append_to_flat_csv_export(
+                path, export.xform.user.username, export.xform.id_string,
+                append_state, **kwargs)
+
+    with NamedTemporaryFile(suffix='.zip') as previous:
+        return _copy_export_file(export, previous.name) and \
+            export_builder.append_to_zipped_csv(
+                path, get_submissions_after(
+                    export.xform, append_state['last_instance_id']),
+                previous.name, append_state)
+
+
+def get_export_builder(xform, export_type, options):
+    """Return an ExportBuilder for the form set up with the export options."""
     export_builder = ExportBuilder()
 
     export_builder.TRUNCATE_GROUP_TITLE = True \
-        if export_type == Export.SAV_ZIP_EXPORT else remove_group_name
+        if export_type == Export.SAV_ZIP_EXPORT \
+        else options.get("remove_group_name", False)
     export_builder.GROUP_DELIMITER = options.get(
         "group_delimiter", DEFAULT_GROUP_DELIMITER
     )
@@ -199,35 +352,19 @@ def generate_export(export_type, xform, export_id=None, options=None,
     export_builder.INCLUDE_IMAGES \
         = options.get("include_images", settings.EXPORT_WITH_IMAGE_DEFAULT)
 
-    # 'win_excel_utf8' is only relevant for CSV exports
-    if 'win_excel_utf8' in options and export_type != Export.CSV_EXPORT:
-        del options['win_excel_utf8']
-
     export_builder.set_survey(xform.survey)
 
-    temp_file = NamedTemporaryFile(suffix=("." + extension))
+    return export_builder
 
-    columns_with_hxl = export_builder.INCLUDE_HXL and get_columns_with_hxl(
-        xform.survey_elements)
 
-    # get the export function by export type
-    func = getattr(export_builder, export_type_func_map[export_type])
-    try:
-        func.__call__(
-            temp_file.name, records, username, id_string, filter_query,
-            start=start, end=end, dataview=dataview, xform=xform,
-            options=options, columns_with_hxl=columns_with_hxl,
-            total_records=total_records
-        )
-    except NoRecordsFoundError:
-        pass
-    except SPSSIOError as e:
-        export = get_or_create_export(export_id, xform, export_type, options)
-        export.error_message = str(e)
-        export.internal_status = Export.FAILED
-        export.save()
-
-        return export
+def save_export_file(xform, export_type, extension, temp_file,
+                     remove_group_name=False, dataview=None):
+    """
+    Save the temporary file of an export to storage under a unique name,
+    returns the directory and name of the saved file.
+    """
+    username = xform.user.username
+    id_string = xform.id_string
 
     # generate filename
     basename = "%s_%s" % (
@@ -259,22 +396,167 @@ def generate_export(export_type, xform, export_id=None, options=None,
     export_filename = storage.save(file_path, File(temp_file, file_path))
     temp_file.close()
 
-    dir_name, basename = os.path.split(export_filename)
+    return os.path.split(export_filename)
+
+
+def is_partitioned_export(export, options):
+    """
+    Whether an export is rendered in parts by parallel tasks, which is the
+    case for unfiltered CSV exports of forms with more than
+    EXPORT_PARTITION_SIZE submissions that can not be appended to.
+    """
+    xform = export.xform
+    partition_size = getattr(settings, 'EXPORT_PARTITION_SIZE', 100000)
+
+    return export.export_type == Export.CSV_EXPORT and \
+        _is_appendable(export.export_type, options) and \
+        xform.num_of_submissions > partition_size and \
+        get_append_base(xform, export.export_type, export.options) is None
+
+
+def _get_partitions(xform, partition_size):
+    """
+    Split the ids of a form's submissions into ranges of partition_size
+    submissions, returns a list of (first id, last id) tuples.
+    """
+    ids = xform.instances.filter(deleted_at=None).order_by(
+        'pk').values_list('pk', flat=True)
+    last_instance_id = ids.aggregate(last=Max('pk'))['last']
+    partitions = []
+    first_instance_id = ids.first()
+    while first_instance_id is not None:
+        next_ids = list(ids.filter(pk__gte=first_instance_id)[
+            partition_size:partition_size + 1])
+        next_instance_id = next_ids[0] if next_ids else None
+        partitions.append((
+            first_instance_id,
+            next_instance_id - 1 if next_ids else last_instance_id))
+        first_instance_id = next_instance_id
+
+    return partitions
+
+
+def create_export_parts(export, options):
+    """
+    Split an export into parts of EXPORT_PARTITION_SIZE submissions, returns
+    the columns of the export and its parts.
+    """
+    xform = export.xform
+    partition_size = getattr(settings, 'EXPORT_PARTITION_SIZE', 100000)
+
+    # changes to the data from now on make the export outdated
+    data_version = XFormDataVersion.get_version(xform.pk)
+    date_read = timezone.now()
+
+    export_builder = get_export_builder(xform, export.export_type, options)
+    columns = export_builder.get_flat_csv_columns(
+        xform.user.username, xform.id_string, xform=xform, options=options)
+
+    export.parts.all().delete()
+    parts = [
+        ExportPart.objects.create(
+            export=export, index=index, first_instance_id=first_instance_id,
+            last_instance_id=last_instance_id)
+        for index, (first_instance_id, last_instance_id)
+        in enumerate(_get_partitions(xform, partition_size))]
+
+    export.data_version = data_version and data_version[0]
+    export.append_state = {'xform_hash': xform.hash,
+                           'date_read': date_read.isoformat(),
+                           'columns': get_columns_hash(columns)}
+    export.save()
+
+    return columns, parts
 
-    # get or create export object
-    export = get_or_create_export(export_id, xform, export_type, options)
+
+def render_export_part(part_id, columns, options):
+    """
+    Render the rows of an export part to storage, returns True if it was the
+    last part of its export left to render.
+    """
+    try:
+        part = ExportPart.objects.select_related('export__xform').get(
+            pk=part_id)
+    except ExportPart.DoesNotExist:
+        # the export was deleted or failed
+        return False
+
+    export = part.export
+    xform = export.xform
+    username = xform.user.username
+    id_string = xform.id_string
+
+    export_builder = get_export_builder(xform, export.export_type, options)
+    temp_file = NamedTemporaryFile(suffix='.csv')
+    num_records = export_builder.to_flat_csv_part(
+        temp_file.name, username, id_string, columns,
+        part.first_instance_id, part.last_instance_id, xform=xform,
+        options=options)
+
+    file_path = os.path.join(
+        username, 'exports', id_string, export.export_type, 'parts',
+        '%s-%s.csv' % (export.pk, part.index))
+    storage = get_storage_class()()
+    temp_file.seek(0)
+    filepath = storage.save(file_path, File(temp_file, file_path))
+    temp_file.close()
+
+    with transaction.atomic():
+        # the parts of an export finish one at a time so that exactly one
+        # of them sees that no other part is left
+        list(Export.objects.select_for_update().filter(
+            pk=export.pk).values_list('pk', flat=True))
+        updated = ExportPart.objects.filter(pk=part.pk).update(
+            filepath=filepath, num_records=num_records)
+        remaining = ExportPart.objects.filter(
+            export_id=export.pk, filepath=None).exists()
+
+    if not updated:
+        storage.delete(filepath)
+
+        return False
+
+    return not remaining
+
+
+def merge_export_parts(export, columns, options):
+    """
+    Concatenate the rendered parts of an export after its header rows into
+    the export's file.
+    """
+    xform = export.xform
+    parts = list(export.parts.order_by('index'))
+
+    export_builder = get_export_builder(xform, export.export_type, options)
+    temp_file = NamedTemporaryFile(suffix='.csv')
+    export_builder.to_flat_csv_header(
+        temp_file.name, xform.user.username, xform.id_string, columns,
+        xform=xform, options=options)
+
+    storage = get_storage_class()()
+    with open(temp_file.name, 'ab') as csv_file:
+        for part in parts:
+            with storage.open(part.filepath) as f:
+                for chunk in f.chunks():
+                    csv_file.write(chunk)
+
+    dir_name, basename = save_export_file(
+        xform, export.export_type, 'csv', temp_file,
+        options.get('remove_group_name', False))
 
     export.filedir = dir_name
     export.filename = basename
     export.internal_status = Export.SUCCESSFUL
-    # do not persist exports that have a filter
-    # Get URL of the exported sheet.
-    if export_type == Export.GOOGLE_SHEETS_EXPORT:
-        export.export_url = export_builder.url
+    num_records = sum([part.num_records for part in parts])
+    if num_records:
+        export.last_instance_id = max(
+            [part.last_instance_id for part in parts])
+        export.append_state = dict(
+            export.append_state, num_records=num_records,
+            last_instance_id=export.last_instance_id)
+    export.save()
+    export.parts.all().delete()
 
-    # if we should create a new export is true, we should not save it
-    if start is None and end is None:
-        export.save()
     return export
 
 
@@ -409,9 +691,8 @@ def generate_attachments_zip_export(export_type, username, id_string,
 
     if options.get("dataview_pk"):
         dataview = DataView.objects.get(pk=options.get("dataview_pk"))
-        records = dataview.query_data(dataview, all_data=True)
-        instances_ids = [rec.get('_id') for rec in records]
-        attachments = Attachment.objects.filter(instance_id__in=instances_ids)
+        attachments = Attachment.objects.filter(
+            instance__in=dataview.get_instances().values('pk'))
     else:
         attachments = Attachment.objects.filter(instance__xform=xform)
 
@@ -520,9 +801,7 @@ def kml_export_data(id_string, user, xform=None):
     if xform is None:
         xform = XForm.objects.get(id_string=id_string, user=user)
 
-    instances = Instance.objects.filter(
-        xform__user=user, xform__id_string=id_string, geom__isnull=False
-    ).order_by('id')
+    instances = Instance.objects.filter(xform=xform, geom__isnull=False)
     data_for_template = []
 
     labels = {}
@@ -533,11 +812,14 @@ def kml_export_data(id_string, user, xform=None):
         labels[xpath] = xform.get_label(xpath)
         return labels[xpath]
 
-    for instance in queryset_iterator(instances):
+    xpath_cmp = xform.get_xpath_cmp()
+    for instance in queryset_iterator(instances,
+                                      prefetch_related=['attachments']):
+        instance.xform = xform
         # read the survey instances
         data_for_display = instance.get_dict()
         xpaths = data_for_display.keys()
-        xpaths.sort(cmp=instance.xform.get_xpath_cmp())
+        xpaths.sort(cmp=xpath_cmp)
         label_value_pairs = [
             (cached_get_labels(xpath), data_for_display[xpath]) for xpath in
             xpaths if not xpath.startswith(u"_")]
@@ -579,7 +861,6 @@ def generate_osm_export(export_type, username, id_string, export_id=None,
     if xform is None:
         xform = XForm.objects.get(user__username=username, id_string=id_string)
     osm_list = OsmData.objects.filter(instance__xform=xform)
-    content = get_combined_osm(osm_list)
 
     basename = "%s_%s" % (id_string,
                           datetime.now().strftime("%Y_%m_%d_%H_%M_%S"))
@@ -593,7 +874,9 @@ def generate_osm_export(export_type, username, id_string, export_id=None,
 
     storage = get_storage_class()()
     temp_file = NamedTemporaryFile(suffix=extension)
-    temp_file.write(content)
+    # the rows are read and written one at a time
+    for chunk in iter_combined_osm(osm_list):
+        temp_file.write(chunk)
     temp_file.seek(0)
     export_filename = storage.save(
         file_path,
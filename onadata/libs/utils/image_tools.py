@@ -1,14 +1,14 @@
-import requests
+import logging
 
 from cStringIO import StringIO
 from PIL import Image
 
+from celery import task
 from django.conf import settings
 from django.core.files.storage import get_storage_class
 from django.core.files.base import ContentFile
 
-from tempfile import NamedTemporaryFile
-
+from onadata.apps.logger.models.attachment import Attachment
 from onadata.libs.utils.viewer_tools import get_path
 
 
@@ -34,8 +34,13 @@ def get_dimensions((width, height), longest_side):
     return flat(width, height)
 
 
+def _get_image_format():
+    Image.init()
+
+    return Image.EXTENSION['.%s' % settings.IMG_FILE_TYPE.lower()]
+
+
 def _save_thumbnails(image, path, size, suffix):
-    nm = NamedTemporaryFile(suffix='.%s' % settings.IMG_FILE_TYPE)
     default_storage = get_storage_class()()
     try:
         # Ensure conversion to float in operations
@@ -43,38 +48,87 @@ def _save_thumbnails(image, path, size, suffix):
             get_dimensions(image.size, float(size)), Image.ANTIALIAS)
     except ZeroDivisionError:
         pass
-    image.save(nm.name)
-    default_storage.save(
-        get_path(path, suffix), ContentFile(nm.read()))
-    nm.close()
+    thumbnail = StringIO()
+    image.save(thumbnail, _get_image_format())
+    thumbnail_path = get_path(path, suffix)
+    # the storage would save a new file under another name
+    if default_storage.exists(thumbnail_path):
+        default_storage.delete(thumbnail_path)
+    default_storage.save(thumbnail_path, ContentFile(thumbnail.getvalue()))
 
 
 def resize(filename):
+    """
+    Create the thumbnails of an image file of the default storage, each one
+    from the next larger one, the file is read once whatever the storage.
+    Returns the sizes created.
+    """
     default_storage = get_storage_class()()
-    path = default_storage.url(filename)
-    req = requests.get(path)
-    if req.status_code == 200:
-        try:
-            im = StringIO(req.content)
-            image = Image.open(im)
-            conf = settings.THUMB_CONF
-            [_save_thumbnails(
-                image, filename,
-                conf[key]['size'],
-                conf[key]['suffix']) for key in settings.THUMB_ORDER]
-        except IOError:
-            raise Exception("The image file couldn't be identified")
-
-
-def resize_local_env(filename):
+    with default_storage.open(filename) as image_file:
+        data = image_file.read()
+    try:
+        image = Image.open(StringIO(data))
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+    except IOError:
+        raise Exception("The image file couldn't be identified")
+
+    conf = settings.THUMB_CONF
+    for key in settings.THUMB_ORDER:
+        _save_thumbnails(image, filename, conf[key]['size'],
+                         conf[key]['suffix'])
+
+    return list(settings.THUMB_ORDER)
+
+
+def create_thumbnails(attachment, force=False):
+    """
+    Create the thumbnails of an image attachment, unless they exist, and
+    record their sizes on it. Returns the sizes, none if the attachment's
+    file does not exist.
+    """
     default_storage = get_storage_class()()
-    path = default_storage.path(filename)
-    image = Image.open(path)
+    filename = attachment.media_file.name
+    if not default_storage.exists(filename):
+        return []
+
     conf = settings.THUMB_CONF
+    sizes = [] if force else [
+        key for key in settings.THUMB_ORDER
+        if default_storage.exists(get_path(filename, conf[key]['suffix']))]
+    if sizes != settings.THUMB_ORDER:
+        sizes = resize(filename)
+
+    attachment.thumbnails = sizes
+    Attachment.objects.filter(pk=attachment.pk).update(
+        thumbnails=attachment.thumbnails)
+
+    return attachment.thumbnails
+
+
+def create_attachment_thumbnails(attachment_ids, force=False):
+    """
+    Create the missing thumbnails of image attachments, or all of them with
+    force.
+    """
+    attachments = Attachment.objects.filter(
+        pk__in=attachment_ids, mimetype__startswith='image')
+    for attachment in attachments:
+        if not force and \
+                set(settings.THUMB_ORDER).issubset(attachment.thumbnails):
+            continue
+
+        try:
+            create_thumbnails(attachment, force)
+        except Exception as e:
+            # an image that can not be read does not hold back the others
+            logging.warning(u'Thumbnails of attachment %s failed: %s',
+                            attachment.pk, e)
 
-    [_save_thumbnails(
-        image, path, conf[key]['size'],
-        conf[key]['suffix']) for key in settings.THUMB_ORDER]
+
+@task(ignore_result=True)
+def create_attachment_thumbnails_async(attachment_ids, force=False):
+    create_attachment_thumbnails(attachment_ids, force)
 
 
 def image_url(attachment, suffix):
@@ -82,25 +136,16 @@ def image_url(attachment, suffix):
     e.g large, medium, small, or generate required thumbnail
     '''
     url = attachment.media_file.url
-    if suffix == 'original':
-        return url
-    else:
+    if suffix in settings.THUMB_CONF:
+        # the thumbnails are recorded once created, their urls are built
+        # without asking the storage whether they exist
+        if suffix not in attachment.thumbnails and \
+                not create_thumbnails(attachment):
+            return None
+
         default_storage = get_storage_class()()
-        fs = get_storage_class('django.core.files.storage.FileSystemStorage')()
-        if suffix in settings.THUMB_CONF:
-            size = settings.THUMB_CONF[suffix]['suffix']
-            filename = attachment.media_file.name
-            if default_storage.exists(filename):
-                if default_storage.exists(get_path(filename, size)) and\
-                        default_storage.size(get_path(filename, size)) > 0:
-                    url = default_storage.url(
-                        get_path(filename, size))
-                else:
-                    if default_storage.__class__ != fs.__class__:
-                        resize(filename)
-                    else:
-                        resize_local_env(filename)
-                    return image_url(attachment, suffix)
-            else:
-                return None
+        url = default_storage.url(get_path(
+            attachment.media_file.name,
+            settings.THUMB_CONF[suffix]['suffix']))
+
     return url
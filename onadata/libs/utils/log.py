@@ -1,5 +1,13 @@
 import logging
+import os
+import threading
+from collections import deque
 from datetime import datetime
+
+from celery.signals import worker_process_shutdown, worker_shutdown
+from django.conf import settings
+from django.db import connection
+
 from onadata.libs.utils.viewer_tools import get_client_ip
 
 
@@ -57,10 +65,23 @@ Actions = Enum(
 
 
 class AuditLogHandler(logging.Handler):
+    """
+    Saves audit log records in batches. Records are queued in memory and
+    saved by a background thread once AUDIT_LOG_BATCH_SIZE records are
+    queued or every AUDIT_LOG_FLUSH_INTERVAL seconds. When
+    AUDIT_LOG_QUEUE_SIZE records are waiting the logging thread saves them
+    itself. A batch size of 1 saves each record as it is logged.
+    """
 
     def __init__(self, model=""):
         super(AuditLogHandler, self).__init__()
         self.model_name = model
+        self._model = None
+        self._pid = None
+        self._records = deque()
+        self._flush_lock = threading.Lock()
+        self._batch_ready = threading.Event()
+        _handlers.append(self)
 
     def _format(self, record):
         created_on = datetime.utcfromtimestamp(record.created).isoformat()
@@ -99,20 +120,96 @@ class AuditLogHandler(logging.Handler):
 
     def emit(self, record):
         data = self._format(record)
-        # save to mongodb audit_log
+        batch_size = getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 100)
+        if batch_size <= 1:
+            self._save([data])
+
+            return
+
+        self._start_writer()
+        self._records.append(data)
+        queued = len(self._records)
+        if queued >= getattr(settings, 'AUDIT_LOG_QUEUE_SIZE', 10000):
+            # the writer is falling behind, hold back the logging thread
+            self.flush()
+        elif queued >= batch_size:
+            self._batch_ready.set()
+
+    def flush(self):
+        """Save the queued records."""
+        with self._flush_lock:
+            records = []
+            while self._records:
+                records.append(self._records.popleft())
+            if records:
+                self._save(records)
+
+    def close(self):
+        self.flush()
+        super(AuditLogHandler, self).close()
+
+    def _save(self, records):
+        # save to the audit log
         try:
             model = self.get_model(self.model_name)
         except:
             pass
         else:
-            log_entry = model(data)
-            log_entry.save()
+            if hasattr(model, 'save_many'):
+                model.save_many(records)
+            else:
+                for data in records:
+                    model(data).save()
+
+    def _start_writer(self):
+        if self._pid == os.getpid():
+            return
+
+        # a forked process starts its own writer, the parent saves the
+        # records queued before the fork
+        self._records = deque()
+        self._flush_lock = threading.Lock()
+        self._batch_ready = threading.Event()
+        writer = threading.Thread(target=self._write, name='audit-log-writer')
+        writer.daemon = True
+        writer.start()
+        self._pid = os.getpid()
+
+    def _write(self):
+        while True:
+            self._batch_ready.wait(
+                getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 5))
+            self._batch_ready.clear()
+            try:
+                self.flush()
+            except Exception:
+                logging.getLogger('console_logger').exception(
+                    'Saving audit log records failed')
+            finally:
+                connection.close_if_unusable_or_obsolete()
 
     def get_model(self, name):
-        names = name.split('.')
-        mod = __import__('.'.join(names[:-1]), fromlist=names[-1:])
+        if self._model is None:
+            names = name.split('.')
+            mod = __import__('.'.join(names[:-1]), fromlist=names[-1:])
+            self._model = getattr(mod, names[-1])
+
+        return self._model
+
+
+_handlers = []
+
+
+def flush_audit_logs(**kwargs):
+    """Save the audit log records waiting in this process."""
+    for handler in _handlers:
+        handler.flush()
+
 
-        return getattr(mod, names[-1])
+worker_process_shutdown.connect(flush_audit_logs,
+                                dispatch_uid='flush_audit_logs')
+worker_shutdown.connect(flush_audit_logs,
+                        dispatch_uid='flush_audit_logs_on_worker_shutdown')
 
 
 def audit_log(action, request_user, account_user, message, audit, request,
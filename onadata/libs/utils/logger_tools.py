@@ -1,3 +1,4 @@
+from StringIO import StringIO
 from datetime import datetime
 import os
 import pytz
@@ -15,8 +16,9 @@ from django.core.exceptions import (
 from django.core.files.storage import get_storage_class
 from django.core.mail import mail_admins
 from django.contrib.auth.models import User
-from django.db import IntegrityError, transaction
+from django.db import IntegrityError, connection, transaction
 from django.db.models import Q
+from django.db.models.query import prefetch_related_objects
 from django.http import HttpResponse
 from django.http import HttpResponseNotFound
 from django.http import StreamingHttpResponse
@@ -25,6 +27,7 @@ from django.shortcuts import get_object_or_404
 from django.utils.encoding import DjangoUnicodeDecodeError
 from django.utils.translation import ugettext as _
 from django.utils import timezone
+from lxml import etree
 from modilabs.utils.subprocess_timeout import ProcessTimedOut
 from pyxform.errors import PyXFormError
 from pyxform.xform2json import create_survey_element_from_xml
@@ -35,8 +38,11 @@ from onadata.apps.logger.models import Instance
 from onadata.apps.logger.models.instance import (
     FormInactiveError,
     InstanceHistory,
-    get_id_string_from_xml_str)
+    increment_xform_submission_count)
+from onadata.apps.logger.models.survey_type import SurveyType
 from onadata.apps.logger.models import XForm
+from onadata.apps.logger.models import XFormDataVersion
+from onadata.apps.logger.models import XFormRollup
 from onadata.apps.logger.models.xform import XLSFormError
 from onadata.apps.logger.xform_instance_parser import (
     InstanceEmptyError,
@@ -44,12 +50,15 @@ from onadata.apps.logger.xform_instance_parser import (
     InstanceMultipleNodeError,
     NonUniqueFormIdError,
     DuplicateInstance,
+    SubmissionXML,
     clean_and_parse_xml,
-    get_uuid_from_xml,
-    get_deprecated_uuid_from_xml,
-    get_submission_date_from_xml)
+    get_id_string_from_xml,
+    get_uuid_from_xml)
 from onadata.apps.viewer.models.data_dictionary import DataDictionary
-from onadata.apps.viewer.models.parsed_instance import ParsedInstance
+from onadata.apps.viewer.models.parsed_instance import (
+    ParsedInstance,
+    call_post_submission_services)
+from onadata.libs.utils.csv_builder import update_column_schema
 from onadata.libs.utils.model_tools import set_uuid
 from onadata.libs.utils.user_auth import get_user_default_project
 
@@ -60,15 +69,23 @@ OPEN_ROSA_VERSION = '1.0'
 DEFAULT_CONTENT_TYPE = 'text/xml; charset=utf-8'
 DEFAULT_CONTENT_LENGTH = settings.DEFAULT_CONTENT_LENGTH
 
+# errors that leave a submission for create_instance to report
+BULK_SUBMISSION_PARSE_ERRORS = (
+    ExpatError, etree.XMLSyntaxError, DjangoUnicodeDecodeError, ValueError)
+
 uuid_regex = re.compile(r'<formhub>\s*<uuid>\s*([^<]+)\s*</uuid>\s*</formhub>',
                         re.DOTALL)
 
 
-def _get_instance(xml, new_uuid, submitted_by, status, xform):
+def _get_instance(submission_xml, new_uuid, submitted_by, status, xform,
+                  media_files, date_created_override):
+    """Create or edit the instance of a submission and save its attachments,
+    the instance row is written once with its complete json.
+    """
     history = None
     instance = None
     # check if its an edit submission
-    old_uuid = get_deprecated_uuid_from_xml(xml)
+    old_uuid = submission_xml.deprecated_uuid
     if old_uuid:
         instance = Instance.objects.filter(uuid=old_uuid).first()
         history = InstanceHistory.objects.filter(
@@ -84,16 +101,27 @@ def _get_instance(xml, new_uuid, submitted_by, status, xform):
                 xml=instance.xml, xform_instance=instance, uuid=old_uuid,
                 user=submitted_by, geom=instance.geom,
                 submission_date=instance.last_edited or instance.date_created)
-            instance.xml = xml
+            instance.set_submission_xml(submission_xml)
             instance.last_edited = last_edited
             instance.uuid = new_uuid
-            instance.save()
         elif history:
             instance = history.xform_instance
     if old_uuid is None or (instance is None and history is None):
-        # new submission
-        instance = Instance.objects.create(
-            xml=xml, user=submitted_by, status=status, xform=xform)
+        # new submission, reserve its id so that its attachments and json
+        # are complete before it is inserted. Foreign keys are checked on
+        # commit so the attachments can be saved first.
+        instance = Instance(
+            user=submitted_by, status=status, xform=xform)
+        instance.set_submission_xml(submission_xml)
+        instance.pk = _reserve_instance_ids(1)[0]
+        kwargs = {'force_insert': True}
+    else:
+        kwargs = {}
+
+    if date_created_override:
+        instance.date_created = date_created_override
+    save_attachments(xform, instance, media_files)
+    instance.save(**kwargs)
 
     return instance
 
@@ -112,6 +140,14 @@ def get_uuid_from_submission(xml):
 
 
 def get_xform_from_submission(xml, username, uuid=None):
+    """Return the XForm for a submission.
+
+    :param xml: the submission XML string or its SubmissionXML.
+    """
+    submission_xml = xml if isinstance(xml, SubmissionXML) else None
+    if submission_xml is not None:
+        xml = submission_xml.xml
+
     # check alternative form submission ids
     uuid = uuid or get_uuid_from_submission(xml)
 
@@ -125,7 +161,8 @@ def get_xform_from_submission(xml, username, uuid=None):
 
             return xform
 
-    id_string = get_id_string_from_xml_str(xml)
+    id_string = submission_xml.id_string if submission_xml is not None \
+        else get_id_string_from_xml(xml)
 
     try:
         return get_object_or_404(XForm, id_string__iexact=id_string,
@@ -199,27 +236,30 @@ def save_attachments(xform, instance, media_files):
 
 def save_submission(xform, xml, media_files, new_uuid, submitted_by, status,
                     date_created_override):
+    """Save a submission, xml may be an XML string or a SubmissionXML."""
+    submission_xml = xml if isinstance(xml, SubmissionXML) \
+        else SubmissionXML(xml)
     if not date_created_override:
-        date_created_override = get_submission_date_from_xml(xml)
-
-    instance = _get_instance(xml, new_uuid, submitted_by, status, xform)
-    save_attachments(xform, instance, media_files)
+        date_created_override = submission_xml.submission_date
 
     # override date created if required
-    if date_created_override:
-        if not timezone.is_aware(date_created_override):
-            # default to utc?
-            date_created_override = timezone.make_aware(
-                date_created_override, timezone.utc)
-        instance.date_created = date_created_override
-        instance.save()
+    if date_created_override and \
+            not timezone.is_aware(date_created_override):
+        # default to utc?
+        date_created_override = timezone.make_aware(
+            date_created_override, timezone.utc)
+
+    instance = _get_instance(
+        submission_xml, new_uuid, submitted_by, status, xform, media_files,
+        date_created_override)
 
     if instance.xform is not None:
-        instance.save()
         pi, created = ParsedInstance.objects.get_or_create(
             instance=instance)
 
-    if not created:
+    if created:
+        update_column_schema(xform, [instance])
+    else:
         pi.save(async=False)
 
     return instance
@@ -256,10 +296,12 @@ def create_instance(username, xml_file, media_files,
         username = username.lower()
 
     xml = xml_file.read()
-    xform = get_xform_from_submission(xml, username, uuid)
+    # parse the submission once, it is shared by the rest of the ingest path
+    submission_xml = SubmissionXML(xml)
+    xform = get_xform_from_submission(submission_xml, username, uuid)
     check_submission_permissions(request, xform)
 
-    new_uuid = get_uuid_from_xml(xml)
+    new_uuid = submission_xml.uuid
     filtered_instances = get_filtered_instances(
         Q(xml=xml) | Q(uuid=new_uuid), xform_id=xform.pk
     )
@@ -295,8 +337,8 @@ def create_instance(username, xml_file, media_files,
     try:
         with transaction.atomic():
             instance = save_submission(
-                xform, xml, media_files, new_uuid, submitted_by, status,
-                date_created_override)
+                xform, submission_xml, media_files, new_uuid, submitted_by,
+                status, date_created_override)
     except IntegrityError:
         instance = Instance.objects.filter(
             xml=xml, xform__id=xform.pk).first()
@@ -342,13 +384,10 @@ def safe_create_instance(username, xml_file, media_files, uuid, request):
         error = OpenRosaResponseNotFound(
             _(u"Form does not exist on this account")
         )
-    except ExpatError:
+    except (ExpatError, etree.XMLSyntaxError):
         error = OpenRosaResponseBadRequest(_(u"Improperly formatted XML."))
     except DuplicateInstance:
-        response = OpenRosaResponse(_(u"Duplicate submission"))
-        response.status_code = 202
-        response['Location'] = request.build_absolute_uri(request.path)
-        error = response
+        error = duplicate_submission_response(request)
     except PermissionDenied as e:
         error = OpenRosaResponseForbidden(e)
     except UnreadablePostError as e:
@@ -366,15 +405,288 @@ def safe_create_instance(username, xml_file, media_files, uuid, request):
             u"Unable to submit because there are multiple forms with this form"
             u"ID."))
     if isinstance(instance, DuplicateInstance):
-        response = OpenRosaResponse(_(u"Duplicate submission"))
-        response.status_code = 202
-        response['Location'] = request.build_absolute_uri(request.path)
-        error = response
+        error = duplicate_submission_response(request)
         instance = None
 
     return [error, instance]
 
 
+def duplicate_submission_response(request):
+    response = OpenRosaResponse(_(u"Duplicate submission"))
+    response.status_code = 202
+    response['Location'] = request.build_absolute_uri(request.path)
+
+    return response
+
+
+def _get_xforms_for_submissions(submission_xmls, username):
+    """Return the XForm for each SubmissionXML, looked up in bulk.
+
+    Submissions whose form cannot be determined get None.
+    """
+    form_uuids = [get_uuid_from_submission(s.xml) for s in submission_xmls]
+    xforms_by_uuid = {
+        xform.uuid: xform for xform in XForm.objects.filter(
+            uuid__in=set(u for u in form_uuids if u)).select_related('user')
+    }
+
+    id_strings = set(
+        s.id_string.lower() for s, u in zip(submission_xmls, form_uuids)
+        if u not in xforms_by_uuid)
+    xforms_by_id_string = {}
+    if username and id_strings:
+        query = Q()
+        for id_string in id_strings:
+            query |= Q(id_string__iexact=id_string)
+        for xform in XForm.objects.filter(query, user__username=username)\
+                .select_related('user'):
+            key = xform.id_string.lower()
+            # None marks id strings that are not unique for the user
+            xforms_by_id_string[key] = \
+                None if key in xforms_by_id_string else xform
+
+    return [xforms_by_uuid.get(u) or
+            xforms_by_id_string.get(s.id_string.lower())
+            for s, u in zip(submission_xmls, form_uuids)]
+
+
+def _get_existing_uuids(xform, uuids):
+    """Return the uuids already submitted to xform, in one query."""
+    cursor = connection.cursor()
+    cursor.execute(
+        'SELECT uuid FROM logger_instance'
+        ' WHERE xform_id = %s AND uuid = ANY(%s)'
+        ' UNION SELECT h.uuid FROM logger_instancehistory h'
+        ' INNER JOIN logger_instance i ON i.id = h.xform_instance_id'
+        ' WHERE i.xform_id = %s AND h.uuid = ANY(%s)',
+        [xform.pk, uuids, xform.pk, uuids])
+
+    return set(row[0] for row in cursor.fetchall())
+
+
+def _reserve_instance_ids(count):
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT nextval(pg_get_serial_sequence('logger_instance', 'id'))"
+        " FROM generate_series(1, %s)", [count])
+
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _get_attachment(instance, media_file):
+    filename, extension = os.path.splitext(media_file.name)
+    extension = extension.replace('.', '')
+    content_type = u'text/xml' \
+        if extension == Attachment.OSM else media_file.content_type
+    attachment = Attachment(
+        instance=instance, media_file=media_file, mimetype=content_type,
+        extension=extension)
+    attachment._set_file_details()
+
+    return attachment
+
+
+def _save_instances_in_bulk(xform, instances):
+    """Insert new instances of an xform with their attachments and
+    ParsedInstance rows, each instance row is written once with its JSON.
+    Must be called in a transaction, foreign keys are checked on commit so
+    attachments are inserted before their instances.
+
+    :param instances: a list of (instance, media files) pairs.
+    """
+    ids = _reserve_instance_ids(len(instances))
+    for (instance, media_files), pk in zip(instances, ids):
+        instance.pk = pk
+
+    attachments = [_get_attachment(instance, f)
+                   for instance, media_files in instances
+                   for f in media_files]
+    Attachment.objects.bulk_create(attachments)
+    if not xform.instances_with_osm and \
+            any(a.extension == Attachment.OSM for a in attachments):
+        xform.instances_with_osm = True
+        xform.save()
+
+    created = [i for i, m in instances]
+    prefetch_related_objects(
+        created, ['attachments', 'notes', 'osm_data', 'tags'])
+    for instance in created:
+        instance.json = instance.get_full_dict()
+    Instance.objects.bulk_create(created)
+
+    parsed_instances = []
+    for instance in created:
+        parsed_instance = ParsedInstance(instance=instance)
+        parsed_instance._set_geopoint()
+        parsed_instances.append(parsed_instance)
+    ParsedInstance.objects.bulk_create(parsed_instances)
+    update_column_schema(xform, created)
+
+    increment_xform_submission_count(
+        xform, len(created), max(i.date_created for i in created))
+    XFormDataVersion.bump(xform.pk)
+    XFormRollup.add_submissions(xform, ids)
+    xform.project.save(update_fields=['date_modified'])
+
+    return created
+
+
+def _build_instance(xform, submission_xml, submitted_by, status,
+                    survey_types):
+    """An unsaved instance of a submission with its parsed XML.
+
+    :param survey_types: a dict of the survey types by slug, shared by the
+        instances built together.
+    """
+    instance = Instance(user=submitted_by, status=status, xform=xform)
+    instance.set_submission_xml(submission_xml)
+    instance._set_parser()
+    instance._set_geom()
+    instance.uuid = submission_xml.uuid
+    set_uuid(instance)
+    instance.version = xform.version
+
+    slug = instance.get_root_node_name()
+    if slug not in survey_types:
+        survey_types[slug] = SurveyType.objects.get_or_create(slug=slug)[0]
+    instance.survey_type = survey_types[slug]
+
+    date_created = submission_xml.submission_date
+    if date_created:
+        if not timezone.is_aware(date_created):
+            date_created = timezone.make_aware(date_created, timezone.utc)
+        instance.date_created = date_created
+
+    return instance
+
+
+def create_xform_instances_in_bulk(xform, submissions,
+                                   status=u'submitted_via_web'):
+    """
+    Insert new submissions of a form with bulk_create, in the transaction of
+    the caller. Post submission services are left to the caller.
+
+    :param submissions: a list of (SubmissionXML, submitted by user) pairs
+        of submissions whose uuids are not in the form.
+    :returns: the created instances.
+    """
+    survey_types = {}
+    instances = [(_build_instance(xform, submission_xml, submitted_by,
+                                  status, survey_types), [])
+                 for submission_xml, submitted_by in submissions]
+
+    return _save_instances_in_bulk(xform, instances) if instances else []
+
+
+def create_instances_in_bulk(username, submissions, request=None,
+                             status=u'submitted_via_web'):
+    """
+    Create new submissions in batches, each batch is deduplicated with one
+    query per form and its rows are inserted with bulk_create.
+
+    Submissions that are edits, have no instanceID, are duplicates with
+    attachments or fail any check are left for create_instance so that
+    they get its exact handling and errors.
+
+    :param submissions: a list of (xml, media files) pairs.
+    :returns: a list with an Instance, a DuplicateInstance or None, for
+        submissions that should go through create_instance, for each
+        submission.
+    """
+    results = [None] * len(submissions)
+    submitted_by = request.user \
+        if request and request.user.is_authenticated() else None
+
+    if username:
+        username = username.lower()
+
+    pending = []
+    for index, (xml, media_files) in enumerate(submissions):
+        try:
+            submission_xml = SubmissionXML(xml)
+            if submission_xml.uuid and not submission_xml.deprecated_uuid:
+                pending.append((index, submission_xml, media_files))
+        except BULK_SUBMISSION_PARSE_ERRORS:
+            pass
+
+    xforms = _get_xforms_for_submissions([s for i, s, m in pending], username)
+    submissions_by_xform = {}
+    can_submit = {}
+    for (index, submission_xml, media_files), xform in zip(pending, xforms):
+        if xform is None:
+            continue
+        if xform.pk not in can_submit:
+            try:
+                check_submission_permissions(request, xform)
+            except PermissionDenied:
+                can_submit[xform.pk] = False
+            else:
+                can_submit[xform.pk] = xform.downloadable
+        if can_submit[xform.pk]:
+            submissions_by_xform.setdefault(xform, []).append(
+                (index, submission_xml, media_files))
+
+    survey_types = {}
+    for xform, xform_submissions in submissions_by_xform.items():
+        existing = _get_existing_uuids(
+            xform, [s.uuid for i, s, m in xform_submissions])
+        instances = []
+        indices = []
+        for index, submission_xml, media_files in xform_submissions:
+            if submission_xml.uuid in existing:
+                if not media_files:
+                    results[index] = DuplicateInstance()
+                continue
+            existing.add(submission_xml.uuid)
+
+            try:
+                instance = _build_instance(xform, submission_xml,
+                                           submitted_by, status, survey_types)
+            except (InstanceEmptyError, InstanceMultipleNodeError):
+                continue
+
+            instances.append((instance, media_files))
+            indices.append(index)
+
+        if not instances:
+            continue
+
+        try:
+            with transaction.atomic():
+                created = _save_instances_in_bulk(xform, instances)
+        except IntegrityError:
+            # leave the whole batch for create_instance
+            continue
+
+        for index, instance in zip(indices, created):
+            results[index] = instance
+            call_post_submission_services(instance.pk)
+
+    return results
+
+
+def safe_create_instances_in_bulk(username, submissions, request):
+    """Create instances in bulk and catch exceptions.
+
+    :param submissions: a list of (xml, media files) pairs.
+    :returns: an [error, instance] list, as returned by
+        safe_create_instance, for each submission.
+    """
+    results = []
+    for (xml, media_files), result in zip(
+            submissions,
+            create_instances_in_bulk(username, submissions, request)):
+        if result is None:
+            results.append(safe_create_instance(
+                username, StringIO(xml), media_files, None, request))
+        elif isinstance(result, DuplicateInstance):
+            results.append([duplicate_submission_response(request), None])
+        else:
+            results.append([None, result])
+
+    return results
+
+
 def report_exception(subject, info, exc_info=None):
     # Add hostname to subject mail
 
@@ -1,6 +1,11 @@
-import gc
 import uuid
 
+from django.conf import settings
+from django.db import connection
+from django.db.models.query import FlatValuesListIterable, \
+    prefetch_related_objects
+from psycopg2 import DatabaseError
+
 
 def generate_uuid_for_form():
     return uuid.uuid4().hex
@@ -14,23 +19,95 @@ def set_uuid(obj):
         obj.uuid = generate_uuid_for_form()
 
 
-def queryset_iterator(queryset, chunksize=100):
-    '''''
-    Iterate over a Django Queryset.
+def queryset_iterator(queryset, chunksize=100, only=None, values=None,
+                      prefetch_related=None):
+    """
+    Iterate over a Django queryset in primary key order, chunksize rows at a
+    time.
 
-    This method loads a maximum of chunksize (default: 100) rows in
-    its memory at the same time while django normally would load all
-    rows in its memory. Using the iterator() method only causes it to
-    not preload all the classes.
-    '''
-    start = 0
-    end = chunksize
-    while start < queryset.count():
-        for row in queryset[start:end]:
+    Each chunk is read with a `pk > last pk` condition instead of an OFFSET
+    so that every row is read once whatever the size of the queryset, and
+    only one chunk is held in memory.
+
+    :param only: load only these fields of the objects.
+    :param values: yield dicts of these fields, with the primary key as pk,
+        instead of objects.
+    :param prefetch_related: related lookups prefetched for each chunk of
+        objects.
+    """
+    queryset = queryset.order_by('pk')
+    if values:
+        queryset = queryset.values(
+            *(list(values) + ([] if 'pk' in values else ['pk'])))
+    elif only:
+        queryset = queryset.only(*only)
+
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else \
+            queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunksize])
+        if not chunk:
+            break
+
+        if prefetch_related and not values:
+            prefetch_related_objects(chunk, prefetch_related)
+
+        for row in chunk:
             yield row
-        start += chunksize
-        end += chunksize
-        gc.collect()
+
+        if len(chunk) < chunksize:
+            break
+
+        last_pk = chunk[-1]['pk'] if values else chunk[-1].pk
+
+
+def server_side_cursor_iterator(sql, params=None, fetch_size=None):
+    """
+    Yield the rows of an SQL query from a named (server side) PostgreSQL
+    cursor, fetching fetch_size rows at a time so that only those rows are
+    held in memory whatever the size of the result.
+    """
+    if fetch_size is None:
+        fetch_size = getattr(settings, 'SERVER_SIDE_CURSOR_FETCH_SIZE', 1000)
+
+    connection.ensure_connection()
+    # outside a transaction the cursor has to be held past the implicit
+    # commit of the DECLARE statement
+    cursor = connection.connection.cursor(
+        name='onadata_%s' % uuid.uuid4().hex,
+        withhold=connection.get_autocommit())
+    cursor.itersize = fetch_size
+
+    try:
+        # raise django.db errors as queries on connection.cursor() would
+        with connection.wrap_database_errors:
+            cursor.execute(sql, params)
+        while True:
+            with connection.wrap_database_errors:
+                rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+    finally:
+        try:
+            cursor.close()
+        except DatabaseError:
+            # the transaction failed, the cursor goes with it
+            pass
+
+
+def queryset_cursor_iterator(queryset, fetch_size=None):
+    """
+    Iterate over a values_list() queryset with a server side cursor, flat
+    querysets yield values and other querysets yield tuples.
+    """
+    sql, params = queryset.query.sql_with_params()
+    flat = queryset._iterable_class is FlatValuesListIterable
+
+    for row in server_side_cursor_iterator(sql, params, fetch_size):
+        yield row[0] if flat else row
 
 
 def get_columns_with_hxl(survey_elements):
@@ -1,22 +1,31 @@
+import json
+from io import BytesIO
+
 from celery import task
 
 from django.contrib.gis.geos import LineString
 from django.contrib.gis.geos import Point
 from django.contrib.gis.geos import Polygon
 from django.contrib.gis.geos import GeometryCollection
-from django.db import IntegrityError
+from django.db import connection
 from django.db import models
+from django.db import transaction
 
 from lxml import etree
 
+from onadata.apps.logger.models.data_version import XFormDataVersion
 from onadata.apps.logger.models.osmdata import OsmData
 from onadata.apps.logger.models.attachment import Attachment
 from onadata.apps.logger.models.instance import Instance
+from onadata.libs.utils.model_tools import queryset_cursor_iterator
+
+
+def _to_bytes(xml):
+    return xml.strip() if isinstance(xml, bytes) else xml.strip().encode()
 
 
 def _get_xml_obj(xml):
-    if not isinstance(xml, bytes):
-        xml = xml.strip().encode()
+    xml = _to_bytes(xml)
     try:
         return etree.fromstring(xml)
     except etree.XMLSyntaxError as e:
@@ -26,15 +35,38 @@ def _get_xml_obj(xml):
             return _get_xml_obj(xml)
 
 
-def _get_node(ref, root):
-    point = None
-    nodes = root.xpath('//node[@id="{}"]'.format(ref))
-    if nodes:
-        node = nodes[0]
-        x, y = float(node.get('lon')), float(node.get('lat'))
-        point = Point(x, y)
+def iter_combined_osm(osm_list):
+    """
+    Yield the combined osm xml of a list or queryset of OsmData objects in
+    chunks, the osm xml of one object at a time is held in memory.
+    """
+    if isinstance(osm_list, models.QuerySet):
+        xmls = queryset_cursor_iterator(
+            osm_list.values_list('xml', flat=True))
+    else:
+        xmls = (osm_data.xml for osm_data in osm_list)
+
+    footer = None
+    for osm_xml in xmls:
+        _osm = _get_xml_obj(osm_xml)
+        if _osm is None:
+            continue
+
+        if footer is None:
+            # the root element of the first osm xml holds all the children
+            root = etree.Element(_osm.tag, attrib=_osm.attrib,
+                                 nsmap=_osm.nsmap)
+            root.text = _osm.text or u''
+            xml = etree.tostring(root, encoding='utf-8', xml_declaration=True)
+            position = xml.rindex(b'</')
+            footer = xml[position:]
+            yield xml[:position]
 
-    return point
+        for child in _osm.iterchildren():
+            yield etree.tostring(child, encoding='utf-8')
+
+    if footer is not None:
+        yield footer
 
 
 def get_combined_osm(osm_list):
@@ -44,22 +76,7 @@ def get_combined_osm(osm_list):
     xml = u""
     if (len(osm_list) and isinstance(osm_list, list)) \
             or isinstance(osm_list, models.QuerySet):
-        osm = None
-        for osm_data in osm_list:
-            osm_xml = osm_data.xml
-            _osm = _get_xml_obj(osm_xml)
-            if _osm is None:
-                continue
-
-            if osm is None:
-                osm = _osm
-                continue
-
-            for child in _osm.getchildren():
-                osm.append(child)
-
-        if osm is not None:
-            xml = etree.tostring(osm, encoding='utf-8', xml_declaration=True)
+        xml = b''.join(iter_combined_osm(osm_list)) or xml
 
     elif isinstance(osm_list, dict):
         if 'detail' in osm_list:
@@ -68,51 +85,77 @@ def get_combined_osm(osm_list):
     return xml
 
 
-def parse_osm_ways(osm_xml, include_osm_id=False):
-    """Converts an OSM XMl to a list of GEOSGeometry objects """
-    items = []
+def _parse_osm(osm_xml, include_osm_id=False):
+    """
+    Parse an OSM XML as a stream, returns lists of its ways and nodes.
+    Elements are dropped once read, only the coordinates of the nodes are
+    kept to build the geometries of the ways.
+    """
+    coordinates = {}
+    nodes = []
+    ways = []
+    for event, element in etree.iterparse(BytesIO(_to_bytes(osm_xml)),
+                                          tag=('node', 'way')):
+        if element.getparent() is None or \
+                element.getparent().getparent() is not None:
+            # not a top level node or way
+            continue
 
-    root = _get_xml_obj(osm_xml)
+        osm_id = element.get('id')
+        tags = parse_osm_tags(element, include_osm_id)
+        if element.tag == 'node':
+            x, y = float(element.get('lon')), float(element.get('lat'))
+            coordinates[osm_id] = (x, y)
+            nodes.append((osm_id, x, y, tags))
+        else:
+            ways.append((osm_id, [nd.get('ref') for nd in element.iterfind(
+                'nd')], tags))
+
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+    return [{
+        'osm_id': way_id,
+        'geom': _get_way_geom([Point(*coordinates[ref])
+                               if ref in coordinates else None
+                               for ref in refs]),
+        'tags': way_tags,
+        'osm_type': 'way'
+    } for way_id, refs, way_tags in ways], [{
+        'osm_id': node_id,
+        'geom': Point(lon, lat),
+        'tags': node_tags,
+        'osm_type': 'node'
+    } for node_id, lon, lat, node_tags in nodes]
+
+
+def _get_way_geom(points):
+    try:
+        return Polygon(points)
+    except:
+        return LineString(points)
 
-    for way in root.findall('way'):
-        geom = None
-        points = []
-        for nd in way.findall('nd'):
-            points.append(_get_node(nd.get('ref'), root))
-        try:
-            geom = Polygon(points)
-        except:
-            geom = LineString(points)
 
-        tags = parse_osm_tags(way, include_osm_id)
-        items.append({
-            'osm_id': way.get('id'),
-            'geom': geom,
-            'tags': tags,
-            'osm_type': 'way'
-        })
+def _parse_osm_with_fixes(osm_xml, include_osm_id=False):
+    try:
+        return _parse_osm(osm_xml, include_osm_id)
+    except etree.XMLSyntaxError as e:
+        if 'Attribute action redefined' not in e.msg:
+            raise
 
-    return items
+        return _parse_osm(_to_bytes(osm_xml).replace(b'action="modify" ', b''),
+                          include_osm_id)
 
 
-def parse_osm_nodes(osm_xml, include_osm_id=False):
+def parse_osm_ways(osm_xml, include_osm_id=False):
     """Converts an OSM XMl to a list of GEOSGeometry objects """
-    items = []
+    return _parse_osm_with_fixes(osm_xml, include_osm_id)[0]
 
-    root = _get_xml_obj(osm_xml)
 
-    for node in root.findall('node'):
-        x, y = float(node.get('lon')), float(node.get('lat'))
-        point = Point(x, y)
-        tags = parse_osm_tags(node, include_osm_id)
-        items.append({
-            'osm_id': node.get('id'),
-            'geom': point,
-            'tags': tags,
-            'osm_type': 'node'
-        })
-
-    return items
+def parse_osm_nodes(osm_xml, include_osm_id=False):
+    """Converts an OSM XMl to a list of GEOSGeometry objects """
+    return _parse_osm_with_fixes(osm_xml, include_osm_id)[1]
 
 
 def parse_osm_tags(node, include_osm_id=False):
@@ -128,13 +171,9 @@ def parse_osm_tags(node, include_osm_id=False):
 
 
 def parse_osm(osm_xml, include_osm_id=False):
-    ways = parse_osm_ways(osm_xml, include_osm_id)
-    if ways:
-        return ways
-
-    nodes = parse_osm_nodes(osm_xml, include_osm_id)
+    ways, nodes = _parse_osm_with_fixes(osm_xml, include_osm_id)
 
-    return nodes
+    return ways or nodes
 
 
 @task()
@@ -142,6 +181,49 @@ def save_osm_data_async(instance_id):
     save_osm_data(instance_id)
 
 
+def _upsert_osm_data(osm_data):
+    """Insert or update the OsmData rows of an instance in one query."""
+    srid = OsmData._meta.get_field('geom').srid
+    params = []
+    for osmd in osm_data:
+        params.extend([
+            osmd.instance_id, osmd.xml, osmd.osm_id, osmd.osm_type,
+            json.dumps(osmd.tags), osmd.geom.hex, srid, osmd.filename,
+            osmd.field_name])
+    values = u"(%s, %s, %s, %s, %s::jsonb, " \
+        u"ST_SetSRID(ST_GeomFromWKB(decode(%s, 'hex')), %s), %s, %s, " \
+        u"now(), now())"
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            u"INSERT INTO logger_osmdata (instance_id, xml, osm_id, "
+            u"osm_type, tags, geom, filename, field_name, date_created, "
+            u"date_modified) VALUES " +
+            u", ".join([values] * len(osm_data)) +
+            u" ON CONFLICT (instance_id, field_name) DO UPDATE SET "
+            u"xml = EXCLUDED.xml, osm_id = EXCLUDED.osm_id, "
+            u"osm_type = EXCLUDED.osm_type, tags = EXCLUDED.tags, "
+            u"geom = EXCLUDED.geom, filename = EXCLUDED.filename, "
+            u"date_modified = EXCLUDED.date_modified", params)
+
+
+def _update_instance_osm_tags(instance, osm_data):
+    """Replace the osm tags of the osm fields in the instance's json."""
+    prefixes = tuple(osmd.field_name + u':' for osmd in osm_data)
+    old_keys = [k for k in instance.json if k.startswith(prefixes)]
+    tags = {}
+    for osmd in osm_data:
+        tags.update(osmd.get_tags_with_prefix())
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            u"UPDATE logger_instance SET json = (json" +
+            u" - %s::text" * len(old_keys) +
+            u") || %s::jsonb, date_modified = now() WHERE id = %s",
+            old_keys + [json.dumps(tags), instance.pk])
+    XFormDataVersion.bump(instance.xform_id)
+
+
 def save_osm_data(instance_id):
     instance = Instance.objects.filter(pk=instance_id).first()
     osm_attachments = instance.attachments.filter(extension=Attachment.OSM) \
@@ -157,8 +239,10 @@ def save_osm_data(instance_id):
             if filename:
                 osm_filenames.update({field: filename})
 
+        # an instance has one OsmData row per field, the last way or node
+        # of the field's osm file
+        osm_data = {}
         for osm in osm_attachments:
-                osm_xml = osm.media_file.read()
                 filename = None
                 field_name = None
                 for k, v in osm_filenames.items():
@@ -170,39 +254,29 @@ def save_osm_data(instance_id):
 
                 if field_name is None:
                     continue
+                osm_xml = osm.media_file.read()
                 filename = osm.filename if filename is None else filename
                 osm_list = parse_osm(osm_xml, include_osm_id=True)
-                for osmd in osm_list:
-                    geom = GeometryCollection(osmd['geom'])
-                    osm_id = osmd['osm_id']
-                    osm_type = osmd['osm_type']
-                    tags = osmd['tags']
-
-                    try:
-                        osm_data = OsmData(
-                            instance=instance,
-                            xml=osm_xml,
-                            osm_id=osm_id,
-                            osm_type=osm_type,
-                            tags=tags,
-                            geom=geom,
-                            filename=filename,
-                            field_name=field_name
-                        )
-                        osm_data.save()
-                    except IntegrityError:
-                        osm_data = OsmData.objects.get(
-                            instance=instance,
-                            field_name=field_name
-                        )
-                        osm_data.xml = osm_xml
-                        osm_data.osm_id = osm_id
-                        osm_data.osm_type = osm_type
-                        osm_data.tags = tags
-                        osm_data.geom = geom
-                        osm_data.filename = filename
-                        osm_data.save()
-        instance.save()
+                if not osm_list:
+                    continue
+
+                osmd = osm_list[-1]
+                osm_data[field_name] = OsmData(
+                    instance=instance,
+                    xml=osm_xml,
+                    osm_id=osmd['osm_id'],
+                    osm_type=osmd['osm_type'],
+                    tags=osmd['tags'],
+                    geom=GeometryCollection(osmd['geom']),
+                    filename=filename,
+                    field_name=field_name
+                )
+                osm_data[field_name]._set_centroid_in_tags()
+
+        if osm_data:
+            with transaction.atomic():
+                _upsert_osm_data(osm_data.values())
+                _update_instance_osm_tags(instance, osm_data.values())
 
 
 def osm_flat_dict(instance_id):
@@ -0,0 +1,182 @@
+"""
+Snapshots of the object permissions of a user.
+
+Guardian reads the permissions of one object per check. A snapshot loads
+a user's permissions on all the objects of a content type at once. It is
+kept on the user object for the rest of the request and in the shared
+cache under the user's permissions version. Any change to the user's
+object permissions or teams bumps that version.
+"""
+import uuid
+
+from django.contrib.auth.models import Group, User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+    pre_delete
+from django.utils.encoding import force_text
+from guardian.models import GroupObjectPermission, UserObjectPermission
+from guardian.utils import get_group_obj_perms_model, \
+    get_user_obj_perms_model
+
+from onadata.apps.api.models.organization_profile import \
+    OrgProfileGroupObjectPermission, OrgProfileUserObjectPermission
+from onadata.apps.api.models.team import Team
+from onadata.apps.logger.models.project import \
+    ProjectGroupObjectPermission, ProjectUserObjectPermission
+from onadata.apps.logger.models.xform import XFormGroupObjectPermission, \
+    XFormUserObjectPermission
+from onadata.apps.main.models.user_profile import \
+    UserProfileGroupObjectPermission, UserProfileUserObjectPermission
+from onadata.libs.utils.cache_tools import USER_OBJECT_PERMS, \
+    USER_PERMS_VERSION
+
+USER_PERMS_MODELS = [
+    UserObjectPermission, OrgProfileUserObjectPermission,
+    ProjectUserObjectPermission, XFormUserObjectPermission,
+    UserProfileUserObjectPermission]
+GROUP_PERMS_MODELS = [
+    GroupObjectPermission, OrgProfileGroupObjectPermission,
+    ProjectGroupObjectPermission, XFormGroupObjectPermission,
+    UserProfileGroupObjectPermission]
+
+# the number of permission changes made by this process, snapshots kept on
+# user objects are only used while it does not change
+_changes = [0]
+
+
+def _get_version_key(user_id):
+    return '{}{}'.format(USER_PERMS_VERSION, user_id)
+
+
+def get_permissions_version(user_id):
+    """The version of a user's object permissions in the shared cache."""
+    key = _get_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+
+    return version
+
+
+def bump_permissions_version(user_ids):
+    """Make the cached snapshots of the users' permissions outdated."""
+    _changes[0] += 1
+
+    def bump():
+        cache.set_many(dict([(_get_version_key(user_id), uuid.uuid4().hex)
+                             for user_id in user_ids]), None)
+
+    bump()
+    # the snapshots taken before the change is committed are outdated too
+    transaction.on_commit(bump)
+
+
+def _load_object_perms(user, content_type):
+    """
+    Read the user's and the user's teams' permissions on all the objects of
+    a content type, returns a {object pk: set of codenames} dict.
+    """
+    model = content_type.model_class()
+    object_perms = {}
+    for perms_model, filters in [
+            (get_user_obj_perms_model(model), {'user': user}),
+            (get_group_obj_perms_model(model), {'group__user': user})]:
+        if perms_model.objects.is_generic():
+            rows = perms_model.objects.filter(
+                content_type=content_type, **filters).values_list(
+                'object_pk', 'permission__codename')
+        else:
+            rows = perms_model.objects.filter(**filters).values_list(
+                'content_object_id', 'permission__codename')
+        for object_pk, codename in rows:
+            object_perms.setdefault(force_text(object_pk), set()).add(
+                codename)
+
+    return object_perms
+
+
+def get_object_perms_snapshot(user, content_type):
+    """
+    Return the user's permissions on the objects of a content type as a
+    {object pk: set of codenames} dict.
+    """
+    snapshot = user.__dict__.get('_object_perms')
+    if snapshot is None or snapshot['changes'] != _changes[0]:
+        snapshot = {'changes': _changes[0], 'content_types': {}}
+        user._object_perms = snapshot
+
+    object_perms = snapshot['content_types'].get(content_type.pk)
+    if object_perms is None:
+        # users recreated with the id of a deleted user have other snapshots
+        key = '{}{}-{:%Y%m%d%H%M%S%f}-{}-{}'.format(
+            USER_OBJECT_PERMS, user.pk, user.date_joined, content_type.pk,
+            get_permissions_version(user.pk))
+        object_perms = cache.get(key)
+        if object_perms is None:
+            object_perms = _load_object_perms(user, content_type)
+            cache.set(key, object_perms)
+        snapshot['content_types'][content_type.pk] = object_perms
+
+    return object_perms
+
+
+def get_object_perms(user, obj):
+    """The codenames of the object permissions a user has on obj."""
+    if not user.is_active:
+        return set()
+
+    content_type = ContentType.objects.get_for_model(obj)
+
+    return get_object_perms_snapshot(user, content_type).get(
+        force_text(obj.pk), set())
+
+
+def user_perms_changed(sender, instance=None, **kwargs):
+    bump_permissions_version([instance.user_id])
+
+
+def group_perms_changed(sender, instance=None, **kwargs):
+    bump_permissions_version(list(User.objects.filter(
+        groups=instance.group_id).values_list('pk', flat=True)))
+
+
+def group_deleted(sender, instance=None, **kwargs):
+    # the memberships are deleted before the group's permissions
+    bump_permissions_version(list(
+        instance.user_set.values_list('pk', flat=True)))
+
+
+def user_groups_changed(sender, instance=None, action=None, reverse=False,
+                        pk_set=None, **kwargs):
+    if action not in ['post_add', 'post_remove', 'pre_clear']:
+        return
+
+    if isinstance(instance, Group):
+        user_ids = pk_set if action != 'pre_clear' else \
+            instance.user_set.values_list('pk', flat=True)
+    else:
+        user_ids = [instance.pk]
+    bump_permissions_version(list(user_ids))
+
+
+for perms_model in USER_PERMS_MODELS:
+    post_save.connect(user_perms_changed, sender=perms_model,
+                      dispatch_uid='user_perms_changed')
+    post_delete.connect(user_perms_changed, sender=perms_model,
+                        dispatch_uid='user_perms_deleted')
+
+for perms_model in GROUP_PERMS_MODELS:
+    post_save.connect(group_perms_changed, sender=perms_model,
+                      dispatch_uid='group_perms_changed')
+    post_delete.connect(group_perms_changed, sender=perms_model,
+                        dispatch_uid='group_perms_deleted')
+
+for group_model in [Group, Team]:
+    pre_delete.connect(group_deleted, sender=group_model,
+                       dispatch_uid='group_deleted')
+
+m2m_changed.connect(user_groups_changed, sender=User.groups.through,
+                    dispatch_uid='user_groups_changed')
@@ -1,7 +1,13 @@
 import os
+import struct
+import threading
+import time
 import traceback
 import zipfile
-from tempfile import NamedTemporaryFile
+import zlib
+from collections import deque
+from multiprocessing.pool import ThreadPool
+from tempfile import NamedTemporaryFile, TemporaryFile
 from urlparse import urljoin
 from xml.dom import minidom
 
@@ -16,6 +22,15 @@ from onadata.libs.utils import common_tags
 
 SLASH = u"/"
 
+# bytes read from an attachment at a time when creating a zip archive
+ZIP_CHUNK_SIZE = 64 * 1024
+# stored without compression in zip archives
+COMPRESSED_FILE_EXTENSIONS = [
+    '.jpg', '.jpeg', '.png', '.gif', '.mp4', '.3gp', '.mov', '.webm',
+    '.mp3', '.m4a', '.amr', '.ogg', '.zip', '.gz', '.pdf']
+
+_local = threading.local()
+
 
 class MyError(Exception):
     pass
@@ -39,7 +54,7 @@ def image_urls(instance):
     urls = []
     suffix = settings.THUMB_CONF['medium']['suffix']
     for a in instance.attachments.all():
-        if default_storage.exists(get_path(a.media_file.name, suffix)):
+        if 'medium' in a.thumbnails:
             url = default_storage.url(get_path(a.media_file.name, suffix))
         else:
             url = a.media_file.url
@@ -225,19 +240,195 @@ def generate_enketo_form_defaults(xform, **kwargs):
     return defaults
 
 
+class ZipStream(zipfile.ZipFile):
+    """
+    A zip archive written as a stream of bytes, e.g. to an HTTP response,
+    without seeking back: files are copied in chunks and their CRC and sizes
+    written after their data.
+    """
+
+    def __init__(self):
+        super(ZipStream, self).__init__(_ZipOutput(), 'w',
+                                        zipfile.ZIP_DEFLATED, allowZip64=True)
+
+    def write_stream(self, arcname, fileobj, compress_type=None):
+        """
+        Copy fileobj to the archive as arcname, generates the bytes of the
+        archive as they are written.
+        """
+        zinfo = zipfile.ZipInfo(arcname, time.localtime(time.time())[:6])
+        zinfo.external_attr = 0600 << 16
+        zinfo.compress_type = self.compression \
+            if compress_type is None else compress_type
+        zinfo.flag_bits |= 0x08
+        zinfo.header_offset = self.fp.tell()
+        self._writecheck(zinfo)
+        self._didModify = True
+        self.fp.write(zinfo.FileHeader(False))
+
+        compressor = None
+        if zinfo.compress_type == zipfile.ZIP_DEFLATED:
+            compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION,
+                                          zlib.DEFLATED, -15)
+        crc = file_size = compress_size = 0
+        for chunk in iter(lambda: fileobj.read(ZIP_CHUNK_SIZE), b''):
+            file_size += len(chunk)
+            crc = zlib.crc32(chunk, crc) & 0xffffffff
+            if compressor:
+                chunk = compressor.compress(chunk)
+            compress_size += len(chunk)
+            self.fp.write(chunk)
+            yield self.fp.pop()
+
+        if compressor:
+            chunk = compressor.flush()
+            compress_size += len(chunk)
+            self.fp.write(chunk)
+
+        zinfo.CRC = crc
+        zinfo.file_size = file_size
+        zinfo.compress_size = compress_size
+        # the central directory has the ZIP64 sizes of large files
+        fmt = '<4sLQQ' if file_size > zipfile.ZIP64_LIMIT or \
+            compress_size > zipfile.ZIP64_LIMIT else '<4sLLL'
+        self.fp.write(struct.pack(fmt, b'PK\x07\x08', crc, compress_size,
+                                  file_size))
+        self.filelist.append(zinfo)
+        self.NameToInfo[zinfo.filename] = zinfo
+
+        yield self.fp.pop()
+
+    def end(self):
+        """Close the archive, returns its last bytes."""
+        output = self.fp
+        self.close()
+
+        return output.pop()
+
+
+class _ZipOutput(object):
+    """The bytes written to a ZipStream since they were last popped."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(data)
+        self._offset += len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+
+        return data
+
+
+def _get_storage():
+    # one storage per thread, storage backends are not all thread safe
+    if not hasattr(_local, 'storage'):
+        _local.storage = get_storage_class()()
+
+    return _local.storage
+
+
+def _fetch_file(name):
+    """
+    Open a storage file for reading, remote files are first copied in
+    chunks to a temporary file. Returns None if the file can not be read.
+    """
+    storage = _get_storage()
+    try:
+        try:
+            return open(storage.path(name), 'rb')
+        except NotImplementedError:
+            pass
+
+        tmp = TemporaryFile()
+        with storage.open(name) as f:
+            for chunk in f.chunks(ZIP_CHUNK_SIZE):
+                tmp.write(chunk)
+        tmp.seek(0)
+
+        return tmp
+    except (IOError, OSError):
+        # missing files are left out of the archive
+        return None
+    except Exception, e:
+        report_exception("Create attachment zip exception", e)
+
+        return None
+
+
+def _fetch_files(names):
+    """
+    Generate (name, file) pairs of storage files, at most
+    ATTACHMENTS_ZIP_FETCH_THREADS files are fetched at the same time ahead
+    of the one being read.
+    """
+    threads = getattr(settings, 'ATTACHMENTS_ZIP_FETCH_THREADS', 4)
+    pool = ThreadPool(threads)
+    pending = deque()
+    try:
+        for name in names:
+            pending.append((name, pool.apply_async(_fetch_file, [name])))
+            if len(pending) > threads:
+                name, result = pending.popleft()
+                yield name, result.get()
+
+        while pending:
+            name, result = pending.popleft()
+            yield name, result.get()
+    finally:
+        pool.terminate()
+
+
+def _get_compress_type(name):
+    if os.path.splitext(name)[1].lower() in COMPRESSED_FILE_EXTENSIONS:
+        return zipfile.ZIP_STORED
+
+    return zipfile.ZIP_DEFLATED
+
+
+def stream_attachments_zip(attachments):
+    """
+    Generate the bytes of a zip archive of the files of an attachments
+    queryset, reading each file in chunks. Files that are already
+    compressed are stored as they are.
+    """
+    # the ids are read in chunks while the files are written
+    from onadata.libs.utils.model_tools import queryset_iterator
+
+    names = (a['media_file'] for a in queryset_iterator(
+        attachments, chunksize=1000, values=['media_file']))
+    archive = ZipStream()
+    for name, f in _fetch_files(names):
+        if f is None:
+            continue
+
+        try:
+            for data in archive.write_stream(name, f,
+                                             _get_compress_type(name)):
+                if data:
+                    yield data
+        finally:
+            f.close()
+
+    yield archive.end()
+
+
 def create_attachments_zipfile(attachments):
     # create zip_file
     tmp = NamedTemporaryFile()
-    with zipfile.ZipFile(tmp, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as z:
-        for attachment in attachments:
-            default_storage = get_storage_class()()
-
-            if default_storage.exists(attachment.media_file.name):
-                try:
-                    with default_storage.open(attachment.media_file.name) as f:
-                        z.writestr(attachment.media_file.name, f.read())
-                except Exception, e:
-                    report_exception("Create attachment zip exception", e)
+    for data in stream_attachments_zip(attachments):
+        tmp.write(data)
+    tmp.flush()
 
     return tmp
 
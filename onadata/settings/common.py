@@ -14,6 +14,7 @@ import os
 import subprocess  # noqa, used by included files
 import sys
 import socket
+from datetime import timedelta
 from urlparse import urljoin
 
 from celery.signals import after_setup_logger
@@ -274,7 +275,7 @@ AUTH_PROFILE_MODULE = 'onadata.apps.main.UserProfile'
 # case insensitive usernames
 AUTHENTICATION_BACKENDS = (
     'onadata.apps.main.backends.ModelBackend',
-    'guardian.backends.ObjectPermissionBackend',
+    'onadata.apps.main.backends.ObjectPermissionBackend',
 )
 
 # Settings for Django Registration
@@ -490,9 +491,50 @@ SUPPORTED_MEDIA_UPLOAD_TYPES = [
 
 CELERY_IMPORTS = ('onadata.libs.utils.csv_import',)
 CSV_ROW_IMPORT_ASYNC_THRESHOLD = 100
+CSV_IMPORT_BATCH_SIZE = 1000
+# attachments fetched from storage at the same time for zip exports
+ATTACHMENTS_ZIP_FETCH_THREADS = 4
+# submissions per part of CSV exports rendered in parallel by celery workers
+EXPORT_PARTITION_SIZE = 100000
 SEND_EMAIL_ACTIVATION_API = False
 METADATA_SEPARATOR = "|"
 
+# parser used for submission XML, 'minidom' or the single pass 'lxml' parser
+XFORM_INSTANCE_PARSER_BACKEND = 'minidom'
+
+# number of submissions created per batch by bulk submission imports
+BULK_SUBMISSION_BATCH_SIZE = 100
+
+# number of compiled form schemas kept in memory by each process
+XFORM_SCHEMA_CACHE_SIZE = 100
+
+# number of rows fetched at a time when streaming query results with server
+# side cursors
+SERVER_SIDE_CURSOR_FETCH_SIZE = 1000
+
+# rest service deliveries: seconds to wait for a response, deliveries sent
+# to one service at the same time, submissions sent in one request to
+# services that accept batches, attempts before a submission is moved to the
+# dead letters and seconds before the first retry, doubled for each retry
+REST_SERVICE_TIMEOUT = 30
+REST_SERVICE_MAX_CONCURRENCY = 4
+REST_SERVICE_BATCH_SIZE = 1
+REST_SERVICE_MAX_ATTEMPTS = 5
+REST_SERVICE_RETRY_DELAY = 60
+# celery beat sends the due deliveries whose task was lost or never sent
+CELERYBEAT_SCHEDULE = {
+    'deliver-due-rest-service-deliveries': {
+        'task': 'onadata.apps.restservice.tasks.deliver_due_async',
+        'schedule': timedelta(minutes=1),
+    },
+}
+
+# audit log records saved together, and seconds between saves
+AUDIT_LOG_BATCH_SIZE = 100
+AUDIT_LOG_FLUSH_INTERVAL = 5
+# queued audit log records above which logging waits for them to be saved
+AUDIT_LOG_QUEUE_SIZE = 10000
+
 PARSED_INSTANCE_DEFAULT_LIMIT = 1000000
 PARSED_INSTANCE_DEFAULT_BATCHSIZE = 1000
 
@@ -34,6 +34,8 @@ if TESTING_MODE:
     CELERY_ALWAYS_EAGER = True
     BROKER_BACKEND = 'memory'
     ENKETO_API_TOKEN = 'abc'
+    # save audit logs in the test's transaction
+    AUDIT_LOG_BATCH_SIZE = 1
 else:
     MEDIA_ROOT = os.path.join(PROJECT_ROOT, 'media/')
 